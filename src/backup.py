@@ -12,6 +12,7 @@
 
 import logging
 import os
+import re
 import shutil
 import sqlite3
 from datetime import datetime, timezone
@@ -25,13 +26,25 @@ logger = logging.getLogger(__name__)
 BACKUP_DIR = Path(getattr(settings, "BACKUP_DIR", "backups"))
 BACKUP_RETAIN_DAYS = int(getattr(settings, "BACKUP_RETAIN_DAYS", 7))
 
-# Извлекаем путь к файлу БД из DATABASE_URL
-_DB_PATH = settings.DATABASE_URL.replace("sqlite+aiosqlite:///", "").replace("sqlite:///", "")
+# Префикс SQLite URL с любым драйвером: sqlite:///, sqlite+aiosqlite:///
+_SQLITE_URL_RE = re.compile(r"^sqlite(?:\+\w+)?:///")
 
 
-def _get_db_path() -> Path:
-    """Возвращает путь к файлу SQLite."""
-    return Path(_DB_PATH)
+def _to_db_path(url: str) -> str | None:
+    """Путь к файлу SQLite из DATABASE_URL (None — БД не SQLite)."""
+    m = _SQLITE_URL_RE.match(url)
+    return url[m.end():] if m else None
+
+
+# Извлекаем путь к файлу БД из DATABASE_URL (один раз при импорте)
+_DB_PATH = _to_db_path(settings.DATABASE_URL)
+if _DB_PATH is None:
+    logger.warning("DATABASE_URL is not SQLite — VACUUM/backup disabled")
+
+
+def _get_db_path() -> Path | None:
+    """Возвращает путь к файлу SQLite (None — БД не SQLite)."""
+    return Path(_DB_PATH) if _DB_PATH is not None else None
 
 
 def vacuum_database() -> bool:
@@ -41,7 +54,7 @@ def vacuum_database() -> bool:
         True если VACUUM выполнен успешно.
     """
     db_path = _get_db_path()
-    if not db_path.exists():
+    if db_path is None or not db_path.exists():
         logger.warning("DB file not found for VACUUM: %s", db_path)
         return False
 
@@ -73,7 +86,7 @@ def create_backup() -> Path | None:
         Путь к файлу бэкапа или None при ошибке.
     """
     db_path = _get_db_path()
-    if not db_path.exists():
+    if db_path is None or not db_path.exists():
         logger.warning("DB file not found for backup: %s", db_path)
         return None
 
@@ -668,7 +668,7 @@ async def enter_ticket_deadline(
 
 
 @router.callback_query(F.data.startswith("ticket_status_"))
-async def update_ticket(callback: CallbackQuery) -> None:
+async def update_ticket(callback: CallbackQuery, google: GoogleSheetsClient) -> None:
     """Обновление статуса тикета."""
     if callback.from_user.id != settings.ADMIN_ID:
         return
@@ -682,7 +682,7 @@ async def update_ticket(callback: CallbackQuery) -> None:
     new_status = parts[3]
 
     from src.bot.utils.ticket_manager import update_ticket_status
-    ok = update_ticket_status(ticket_id, new_status)
+    ok = update_ticket_status(ticket_id, new_status, google=google)
     if ok:
         await callback.answer(f"✅ Тикет {ticket_id} → {new_status}")
     else:
@@ -79,6 +79,11 @@ async def _job_funnel_analysis() -> None:
     await weekly_funnel_analysis(bot=_bot, google=_google, cache=_cache)
 
 
+async def _job_rate_limiter_cleanup() -> None:
+    from src.bot.utils.throttle import cleanup_rate_limiters
+    cleanup_rate_limiters()
+
+
 async def _job_daily_backup() -> None:
     from src.backup import daily_backup
     await daily_backup(bot=_bot)
@@ -376,6 +381,16 @@ async def main() -> None:
         misfire_grace_time=3600,
     )
 
+    # Очистка окон rate limiter'ов от неактивных пользователей каждые 10 минут
+    scheduler.add_job(
+        _job_rate_limiter_cleanup,
+        trigger="interval",
+        minutes=10,
+        id="rate_limiter_cleanup",
+        replace_existing=True,
+        misfire_grace_time=600,
+    )
+
     # ── Middleware (порядок: outer → inner → handler → inner → outer) ──
 
     # P1: Global Error Handler (САМЫЙ ВНЕШНИЙ — ловит всё)
@@ -440,6 +455,14 @@ async def main() -> None:
     from src.bot.utils.healthcheck import start_healthcheck, stop_healthcheck, set_ready
     await start_healthcheck(bot=bot)
 
+    # P5: Фоновый сброс телеметрии в Google Sheets
+    from src.bot.utils.telemetry import start_telemetry_flusher, stop_telemetry_flusher
+    start_telemetry_flusher(google)
+
+    # L7: Тикеты юристов живут в памяти — восстанавливаем из листа «Tasks»
+    from src.bot.utils.ticket_manager import load_tickets_from_sheets
+    await load_tickets_from_sheets(google)
+
     # P10: Аудит безопасности при старте (логируем результат)
     try:
         from src.bot.utils.security_audit import run_security_audit
@@ -473,6 +496,14 @@ async def main() -> None:
         await stop_healthcheck()
         await ai.close()
         logger.info("AI сессия закрыта")
+        from src.bot.utils.retargeting import close_fb_session, flush_fb_events
+        await flush_fb_events()
+        await close_fb_session()
+        from src.bot.utils.telegraph_client import close_telegraph_session
+        await close_telegraph_session()
+        from src.bot.utils.ticket_manager import flush_ticket_writes
+        await flush_ticket_writes(google)
+        await stop_telemetry_flusher(google)
         if scheduler.running:
             scheduler.shutdown(wait=False)
             logger.info("APScheduler остановлен")
@@ -8,8 +8,10 @@
 - Email-сниппетов
 """
 
-import html
+import functools
 import logging
+import re
+from io import StringIO
 from typing import Optional
 
 logger = logging.getLogger(__name__)
@@ -33,6 +35,7 @@ _CATEGORY_HOOKS: dict[str, str] = {
 _DEFAULT_HOOK = "Юридическая ошибка может стоить бизнесу миллионы. Мы собрали практические решения в одном документе."
 
 
+@functools.lru_cache(maxsize=256)
 def _get_category_hook(category: str) -> str:
     """Подбирает вовлекающий хук по категории гайда."""
     low = category.lower()
@@ -42,8 +45,22 @@ def _get_category_hook(category: str) -> str:
     return _DEFAULT_HOOK
 
 
+_UNSAFE_HTML = re.compile(r'[&<>"\']')
+
+# Та же замена, что и в html.escape(quote=True), но за один проход.
+_ESC_TABLE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&#x27;",
+})
+
+
 def _esc(text: str) -> str:
-    return html.escape(str(text))
+    """HTML-экранирование; строки без спецсимволов возвращаются как есть."""
+    s = str(text)
+    return s.translate(_ESC_TABLE) if _UNSAFE_HTML.search(s) is not None else s
 
 
 def build_guide_promo(
@@ -71,20 +88,70 @@ def build_guide_promo(
         - ``deep_link``     — Deep link на гайд с UTM
         - ``short_cta``     — Короткая строка CTA для соцсетей
     """
+    return _build_guide_promo(
+        guide,
+        f"https://t.me/{bot_username}?start=guide_",
+        utm_source,
+        download_count,
+    )
+
+
+def build_guide_promos(
+    guides: list[dict],
+    bot_username: str,
+    *,
+    utm_source: str = "",
+    downloads: Optional[dict[str, int]] = None,
+) -> dict[str, dict[str, str]]:
+    """Генерирует промо-материалы сразу для набора гайдов.
+
+    Результат для каждого гайда совпадает с :func:`build_guide_promo`;
+    базовый URL бота собирается один раз, а хуки по категориям берутся
+    из общего кеша.
+
+    Args:
+        guides: Гайды из каталога.
+        bot_username: Username бота (без @).
+        utm_source: Источник для UTM-метки.
+        downloads: Количество скачиваний по ``guide_id``.
+
+    Returns:
+        Словарь ``{guide_id: promo}``.
+    """
+    base_url = f"https://t.me/{bot_username}?start=guide_"
+    downloads = downloads or {}
+    results: dict[str, dict[str, str]] = {}
+    for guide in guides:
+        gid = guide.get("id", "")
+        results[gid] = _build_guide_promo(
+            guide, base_url, utm_source, downloads.get(gid, 0),
+        )
+    return results
+
+
+def _build_guide_promo(
+    guide: dict,
+    base_url: str,
+    utm_source: str,
+    download_count: int,
+) -> dict[str, str]:
+    """Сборка промо для гайда по готовому базовому URL бота."""
     gid = guide.get("id", "")
     title = guide.get("title", gid)
     desc = guide.get("description", "")
     preview = guide.get("preview_text", "") or guide.get("preview", "")
     highlights = guide.get("highlights", "")
-    pages = str(guide.get("pages", "")).strip()
+    pages = str(guide.get("pages") or "").strip()
     category = guide.get("category", "")
     social_proof = guide.get("social_proof", "")
     excerpt = guide.get("excerpt", "") or guide.get("key_quote", "")
     key_stat = guide.get("key_stat", "") or guide.get("statistic", "")
 
-    # Deep link с UTM
-    utm_suffix = f"--{utm_source}" if utm_source else ""
-    deep_link = f"https://t.me/{bot_username}?start=guide_{gid}{utm_suffix}"
+    # Deep link с UTM (для LinkedIn / email источник фиксирован)
+    base_link = f"{base_url}{gid}"
+    deep_link = f"{base_link}--{utm_source}" if utm_source else base_link
+    linkedin_link = f"{base_link}--linkedin"
+    email_link = f"{base_link}--email"
 
     # ── Разбираем highlights ──────────────────────────────────────────
     highlight_items = _parse_highlights(highlights)
@@ -92,43 +159,56 @@ def build_guide_promo(
     # Хук по категории
     hook = _get_category_hook(category)
 
+    # HTML-экранируем общие поля один раз — HTML-билдеры получают готовые строки.
+    # Пустые (None, 0 из Sheets) оставляем пустыми: _esc превратил бы их в "None"/"0",
+    # и проверки ``if desc:`` в билдерах стали бы истинными
+    e_title = _esc(title)
+    e_desc = _esc(desc) if desc else ""
+    e_preview = _esc(preview) if preview else ""
+    e_pages = _esc(pages) if pages else ""
+    e_excerpt = _esc(excerpt) if excerpt else ""
+    e_key_stat = _esc(key_stat) if key_stat else ""
+    e_highlights = [_esc(item) for item in highlight_items[:6]]
+    e_deep_link = _esc(deep_link)
+
     # ── Channel post ──────────────────────────────────────────────────
     channel_post = _build_channel_post(
-        title=title,
-        desc=desc,
-        highlights=highlight_items,
-        preview=preview,
-        pages=pages,
-        category=category,
-        deep_link=deep_link,
+        title=e_title,
+        desc=e_desc,
+        highlights=e_highlights,
+        preview=e_preview,
+        pages=e_pages,
+        category=_esc(category) if category else "",
+        deep_link=e_deep_link,
         download_count=download_count,
-        social_proof=social_proof,
-        hook=hook,
-        excerpt=excerpt,
-        key_stat=key_stat,
+        social_proof=_esc(social_proof) if social_proof else "",
+        hook=_esc(hook) if hook else "",
+        excerpt=e_excerpt,
+        key_stat=e_key_stat,
+        cta_value=_get_cta_value(title),
     )
 
     # ── Article block (вставка в статью) ─────────────────────────────
     article_block = _build_article_block(
-        title=title,
-        desc=desc,
-        highlights=highlight_items,
-        preview=preview,
-        pages=pages,
-        deep_link=deep_link,
-        excerpt=excerpt,
-        key_stat=key_stat,
+        title=e_title,
+        desc=e_desc,
+        highlights=e_highlights,
+        preview=e_preview,
+        pages=e_pages,
+        deep_link=e_deep_link,
+        excerpt=e_excerpt,
+        key_stat=e_key_stat,
         download_count=download_count,
     )
 
     # ── Telegraph CTA block ──────────────────────────────────────────
     telegraph_cta = _build_telegraph_cta(
-        title=title,
-        highlights=highlight_items,
-        preview=preview,
-        pages=pages,
+        title=e_title,
+        highlights=e_highlights,
+        preview=e_preview,
+        pages=e_pages,
         deep_link=deep_link,
-        excerpt=excerpt,
+        excerpt=e_excerpt,
         download_count=download_count,
     )
 
@@ -139,18 +219,18 @@ def build_guide_promo(
         highlights=highlight_items,
         hook=hook,
         key_stat=key_stat,
-        deep_link=deep_link.replace(utm_suffix, "--linkedin") if utm_suffix else deep_link + "--linkedin",
+        deep_link=linkedin_link,
         download_count=download_count,
     )
 
     # ── Email snippet ─────────────────────────────────────────────────
     email_snippet = _build_email_snippet(
-        title=title,
-        desc=desc,
-        highlights=highlight_items,
-        excerpt=excerpt,
-        pages=pages,
-        deep_link=deep_link.replace(utm_suffix, "--email") if utm_suffix else deep_link + "--email",
+        title=e_title,
+        desc=e_desc,
+        highlights=e_highlights,
+        excerpt=e_excerpt,
+        pages=e_pages,
+        deep_link=_esc(email_link),
         download_count=download_count,
     )
 
@@ -179,17 +259,36 @@ def _parse_highlights(raw: str) -> list[str]:
     - Разделитель запятой: ``пункт1, пункт2``
     - Разделитель точки с запятой: ``пункт1; пункт2``
     """
-    if not raw or not raw.strip():
+    if not raw or not (stripped := raw.strip()):
         return []
 
     for sep in ("\n", ";"):
         if sep in raw:
-            return [item.strip() for item in raw.split(sep) if item.strip()]
+            return [s for item in raw.split(sep) if (s := item.strip())]
+
+    if raw.count(",") >= 2:
+        return [s for item in raw.split(",") if (s := item.strip())]
 
-    if "," in raw and raw.count(",") >= 2:
-        return [item.strip() for item in raw.split(",") if item.strip()]
+    return [stripped]
 
-    return [raw.strip()] if raw.strip() else []
+
+# Ценность CTA по ключевым словам в заголовке (первое совпадение побеждает)
+_CTA_RULES: tuple[tuple[tuple[str, ...], str], ...] = (
+    (("налог", "tax"), "с расчётами, примерами и чек-листами"),
+    (("труд", "labor", "кадр"), "с образцами документов и порядком действий"),
+    (("it", "ит", "цифр"), "со схемами оптимизации и примерами"),
+)
+
+_DEFAULT_CTA_VALUE = "с шаблонами договоров и чек-листами"
+
+
+def _get_cta_value(title: str) -> str:
+    """Подбирает ценность CTA по ключевым словам в заголовке."""
+    title_low = title.lower()
+    for keywords, value in _CTA_RULES:
+        if any(kw in title_low for kw in keywords):
+            return value
+    return _DEFAULT_CTA_VALUE
 
 
 def _build_channel_post(
@@ -206,67 +305,59 @@ def _build_channel_post(
     hook: str = "",
     excerpt: str = "",
     key_stat: str = "",
+    cta_value: str = _DEFAULT_CTA_VALUE,
 ) -> str:
-    """Пост для Telegram-канала: хук → выдержка → выгода → CTA."""
-    parts: list[str] = []
+    """Пост для Telegram-канала: хук → выдержка → выгода → CTA.
+
+    Текстовые аргументы передаются уже HTML-экранированными.
+    """
+    buf = StringIO()
+    w = buf.write
 
     # Вовлекающий хук (статистика / вопрос)
     if hook:
-        parts.append(f"💡 <i>{_esc(hook)}</i>")
-        parts.append("")
+        w(f"💡 <i>{hook}</i>\n\n")
 
     # Заголовок
     if category:
-        parts.append(f"📂 {_esc(category)}")
-    parts.append(f"📚 <b>{_esc(title)}</b>")
+        w(f"📂 {category}\n")
+    w(f"📚 <b>{title}</b>\n")
 
     # Описание
     if desc:
-        parts.append(f"\n{_esc(desc)}")
+        w(f"\n{desc}\n")
 
     # Ключевая цитата / выдержка из гайда
     if excerpt:
-        parts.append(f"\n<blockquote>«{_esc(excerpt)}»</blockquote>")
+        w(f"\n<blockquote>«{excerpt}»</blockquote>\n")
     elif key_stat:
-        parts.append(f"\n📊 <b>{_esc(key_stat)}</b>")
+        w(f"\n📊 <b>{key_stat}</b>\n")
 
     # Выдержки / что внутри
     if highlights:
-        parts.append("\n📋 <b>Что внутри:</b>")
+        w("\n📋 <b>Что внутри:</b>\n")
         for item in highlights[:6]:
-            parts.append(f"  ✓ {_esc(item)}")
+            w(f"  ✓ {item}\n")
     elif preview:
-        parts.append(f"\n📋 <b>Что внутри:</b>\n{_esc(preview)}")
+        w(f"\n📋 <b>Что внутри:</b>\n{preview}\n")
 
     # Метаданные
-    meta: list[str] = []
-    if pages:
-        meta.append(f"{_esc(pages)} стр.")
-    meta.append("PDF с шаблонами")
-    meta.append("бесплатно")
-    parts.append(f"\n📎 {' · '.join(meta)}")
+    pages_meta = f"{pages} стр. · " if pages else ""
+    w(f"\n📎 {pages_meta}PDF с шаблонами · бесплатно\n")
 
     # Social proof
     if download_count > 10:
-        parts.append(f"\n👥 Уже скачали {download_count}+ предпринимателей")
+        w(f"\n👥 Уже скачали {download_count}+ предпринимателей\n")
     elif social_proof:
-        parts.append(f"\n✅ {_esc(social_proof)}")
+        w(f"\n✅ {social_proof}\n")
 
     # CTA — конкретная ценность перехода
-    cta_value = "с шаблонами договоров и чек-листами"
-    if any(kw in title.lower() for kw in ("налог", "tax")):
-        cta_value = "с расчётами, примерами и чек-листами"
-    elif any(kw in title.lower() for kw in ("труд", "labor", "кадр")):
-        cta_value = "с образцами документов и порядком действий"
-    elif any(kw in title.lower() for kw in ("it", "ит", "цифр")):
-        cta_value = "со схемами оптимизации и примерами"
-
-    parts.append(
+    w(
         f"\n📥 <b>Полную версию {cta_value} скачивайте бесплатно:</b>\n"
-        f"👉 <a href=\"{_esc(deep_link)}\">Получить гайд в боте</a>"
+        f"👉 <a href=\"{deep_link}\">Получить гайд в боте</a>"
     )
 
-    return "\n".join(parts)
+    return buf.getvalue()
 
 
 def _build_article_block(
@@ -284,65 +375,66 @@ def _build_article_block(
     """HTML-блок для вставки в статью на сайте.
 
     Включает превью контента (выдержку/цитату) для повышения
-    ценности перехода.
+    ценности перехода. Текстовые аргументы передаются уже
+    HTML-экранированными.
     """
-    parts: list[str] = [
+    buf = StringIO()
+    w = buf.write
+
+    w(
         '<div style="background:#f8f9fa;border-left:4px solid #2563eb;'
-        'padding:20px;margin:24px 0;border-radius:8px;">',
+        'padding:20px;margin:24px 0;border-radius:8px;">\n'
         f'<p style="margin:0 0 12px;font-size:18px;font-weight:bold;">'
-        f'📚 {_esc(title)}</p>',
-    ]
+        f'📚 {title}</p>\n'
+    )
 
     if desc:
-        parts.append(f'<p style="margin:0 0 12px;color:#555;">{_esc(desc)}</p>')
+        w(f'<p style="margin:0 0 12px;color:#555;">{desc}</p>\n')
 
     # Выдержка из гайда — повышает ценность перехода
     if excerpt:
-        parts.append(
+        w(
             f'<blockquote style="margin:12px 0;padding:10px 16px;'
             f'border-left:3px solid #94a3b8;color:#475569;font-style:italic;">'
-            f'«{_esc(excerpt)}»</blockquote>'
+            f'«{excerpt}»</blockquote>\n'
         )
     elif key_stat:
-        parts.append(
+        w(
             f'<p style="margin:0 0 12px;font-size:15px;font-weight:600;'
-            f'color:#2563eb;">📊 {_esc(key_stat)}</p>'
+            f'color:#2563eb;">📊 {key_stat}</p>\n'
         )
 
     if highlights:
-        parts.append('<p style="margin:0 0 8px;font-weight:600;">Что внутри:</p>')
-        parts.append('<ul style="margin:0 0 12px;padding-left:20px;">')
+        w('<p style="margin:0 0 8px;font-weight:600;">Что внутри:</p>\n')
+        w('<ul style="margin:0 0 12px;padding-left:20px;">\n')
         for item in highlights[:6]:
-            parts.append(f"<li>{_esc(item)}</li>")
-        parts.append("</ul>")
+            w(f"<li>{item}</li>\n")
+        w("</ul>\n")
     elif preview:
-        parts.append(
+        w(
             f'<p style="margin:0 0 12px;color:#555;">'
-            f'<b>Что внутри:</b> {_esc(preview)}</p>'
+            f'<b>Что внутри:</b> {preview}</p>\n'
         )
 
-    meta: list[str] = []
-    if pages:
-        meta.append(f"{_esc(pages)} страниц")
-    meta.append("PDF")
-    meta.append("бесплатно")
-    if download_count > 10:
-        meta.append(f"скачали {download_count}+ человек")
-    parts.append(
+    pages_meta = f"{pages} страниц · " if pages else ""
+    downloads_meta = (
+        f" · скачали {download_count}+ человек" if download_count > 10 else ""
+    )
+    w(
         f'<p style="margin:0 0 12px;font-size:13px;color:#888;">'
-        f'{" · ".join(meta)}</p>'
+        f'{pages_meta}PDF · бесплатно{downloads_meta}</p>\n'
     )
 
-    parts.append(
-        f'<a href="{_esc(deep_link)}" '
+    w(
+        f'<a href="{deep_link}" '
         f'style="display:inline-block;background:#2563eb;color:#fff;'
         f'padding:12px 28px;border-radius:6px;text-decoration:none;'
         f'font-weight:bold;font-size:15px;">'
-        f'📥 Скачать полную версию с шаблонами</a>'
+        f'📥 Скачать полную версию с шаблонами</a>\n'
+        "</div>"
     )
-    parts.append("</div>")
 
-    return "\n".join(parts)
+    return buf.getvalue()
 
 
 def _build_telegraph_cta(
@@ -357,42 +449,36 @@ def _build_telegraph_cta(
 ) -> str:
     """CTA-блок для вставки в конец Telegraph-статьи.
 
-    Включает превью контента для мотивации перехода.
+    Включает превью контента для мотивации перехода. Текстовые
+    аргументы (кроме ``deep_link``) передаются уже HTML-экранированными.
     """
-    parts: list[str] = [
-        "─" * 30,
-        "",
-        f"📚 <b>Скачайте полный гайд: «{_esc(title)}»</b>",
-    ]
+    buf = StringIO()
+    w = buf.write
+
+    w(f"{'─' * 30}\n\n📚 <b>Скачайте полный гайд: «{title}»</b>\n")
 
     # Превью — цитата из гайда прямо в статье
     if excerpt:
-        parts.append(f"\n<i>«{_esc(excerpt)}»</i>")
-        parts.append("\n↑ Это лишь фрагмент. В полной версии — "
-                     "пошаговые инструкции и шаблоны.")
+        w(f"\n<i>«{excerpt}»</i>\n")
+        w("\n↑ Это лишь фрагмент. В полной версии — "
+          "пошаговые инструкции и шаблоны.\n")
 
     if highlights:
-        parts.append("\nВнутри вы найдёте:")
+        w("\nВнутри вы найдёте:\n")
         for item in highlights[:5]:
-            parts.append(f"✓ {_esc(item)}")
+            w(f"✓ {item}\n")
     elif preview:
-        parts.append(f"\nВнутри: {_esc(preview)}")
+        w(f"\nВнутри: {preview}\n")
 
-    meta = []
-    if pages:
-        meta.append(f"{_esc(pages)} страниц")
-    meta.append("шаблоны документов")
-    meta.append("чек-листы")
-    parts.append(f"\n📎 {' · '.join(meta)}")
+    pages_meta = f"{pages} страниц · " if pages else ""
+    w(f"\n📎 {pages_meta}шаблоны документов · чек-листы\n")
 
     if download_count > 10:
-        parts.append(f"\n👥 Уже скачали {download_count}+ предпринимателей")
+        w(f"\n👥 Уже скачали {download_count}+ предпринимателей\n")
 
-    parts.append(
-        f"\n👉 Скачать бесплатно: {deep_link}"
-    )
+    w(f"\n👉 Скачать бесплатно: {deep_link}")
 
-    return "\n".join(parts)
+    return buf.getvalue()
 
 
 def _build_linkedin_post(
@@ -406,37 +492,35 @@ def _build_linkedin_post(
     download_count: int = 0,
 ) -> str:
     """Текст для LinkedIn / Facebook поста (plain text, без HTML)."""
-    parts: list[str] = []
+    buf = StringIO()
+    w = buf.write
 
     # Хук — первая строка видна в ленте
     if key_stat:
-        parts.append(f"📊 {key_stat}")
+        w(f"📊 {key_stat}\n")
     elif hook:
-        parts.append(f"💡 {hook}")
+        w(f"💡 {hook}\n")
 
-    parts.append("")
-    parts.append(f"Мы подготовили бесплатный гайд: «{title}»")
-    parts.append("")
+    w(f"\nМы подготовили бесплатный гайд: «{title}»\n\n")
 
     if desc:
-        parts.append(desc)
-        parts.append("")
+        w(f"{desc}\n\n")
 
     if highlights:
-        parts.append("Что внутри:")
+        w("Что внутри:\n")
         for item in highlights[:4]:
-            parts.append(f"→ {item}")
-        parts.append("")
+            w(f"→ {item}\n")
+        w("\n")
 
     if download_count > 10:
-        parts.append(f"Уже скачали {download_count}+ предпринимателей.")
-        parts.append("")
+        w(f"Уже скачали {download_count}+ предпринимателей.\n\n")
 
-    parts.append(f"📥 Скачать бесплатно → {deep_link}")
-    parts.append("")
-    parts.append("#юридическаяконсультация #бизнесвказахстане #гайд #чеклист")
+    w(
+        f"📥 Скачать бесплатно → {deep_link}\n\n"
+        "#юридическаяконсультация #бизнесвказахстане #гайд #чеклист"
+    )
 
-    return "\n".join(parts)
+    return buf.getvalue()
 
 
 def _build_email_snippet(
@@ -449,50 +533,50 @@ def _build_email_snippet(
     deep_link: str,
     download_count: int = 0,
 ) -> str:
-    """HTML-сниппет для email-рассылки."""
-    parts: list[str] = [
-        '<table style="width:100%;border-collapse:collapse;margin:20px 0;">',
-        '<tr><td style="padding:20px;background:#f8f9fa;border-radius:8px;">',
-        f'<h3 style="margin:0 0 10px;color:#1e293b;">📚 {_esc(title)}</h3>',
-    ]
+    """HTML-сниппет для email-рассылки.
+
+    Текстовые аргументы передаются уже HTML-экранированными.
+    """
+    buf = StringIO()
+    w = buf.write
+
+    w(
+        '<table style="width:100%;border-collapse:collapse;margin:20px 0;">\n'
+        '<tr><td style="padding:20px;background:#f8f9fa;border-radius:8px;">\n'
+        f'<h3 style="margin:0 0 10px;color:#1e293b;">📚 {title}</h3>\n'
+    )
 
     if desc:
-        parts.append(f'<p style="margin:0 0 10px;color:#64748b;">{_esc(desc)}</p>')
+        w(f'<p style="margin:0 0 10px;color:#64748b;">{desc}</p>\n')
 
     if excerpt:
-        parts.append(
+        w(
             f'<p style="margin:10px 0;padding:10px 15px;border-left:3px solid #2563eb;'
-            f'color:#475569;font-style:italic;">«{_esc(excerpt)}»</p>'
+            f'color:#475569;font-style:italic;">«{excerpt}»</p>\n'
         )
 
     if highlights:
-        parts.append('<ul style="margin:0 0 10px;padding-left:18px;color:#334155;">')
+        w('<ul style="margin:0 0 10px;padding-left:18px;color:#334155;">\n')
         for item in highlights[:4]:
-            parts.append(f"<li>{_esc(item)}</li>")
-        parts.append("</ul>")
-
-    meta: list[str] = []
-    if pages:
-        meta.append(f"{_esc(pages)} стр.")
-    meta.append("PDF")
-    meta.append("бесплатно")
-    if download_count > 10:
-        meta.append(f"{download_count}+ скачиваний")
+            w(f"<li>{item}</li>\n")
+        w("</ul>\n")
 
-    parts.append(
+    pages_meta = f"{pages} стр. · " if pages else ""
+    downloads_meta = f" · {download_count}+ скачиваний" if download_count > 10 else ""
+    w(
         f'<p style="margin:0 0 12px;font-size:12px;color:#94a3b8;">'
-        f'{" · ".join(meta)}</p>'
+        f'{pages_meta}PDF · бесплатно{downloads_meta}</p>\n'
     )
 
-    parts.append(
-        f'<a href="{_esc(deep_link)}" '
+    w(
+        f'<a href="{deep_link}" '
         f'style="display:inline-block;background:#2563eb;color:#ffffff;'
         f'padding:10px 24px;border-radius:6px;text-decoration:none;'
-        f'font-weight:bold;">Скачать гайд →</a>'
+        f'font-weight:bold;">Скачать гайд →</a>\n'
+        "</td></tr></table>"
     )
 
-    parts.append("</td></tr></table>")
-    return "\n".join(parts)
+    return buf.getvalue()
 
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -513,6 +597,16 @@ _TARGET_AUDIENCES: dict[str, str] = {
 _DEFAULT_AUDIENCE = "предприниматели в Казахстане; интересы: бизнес, юридические услуги, консалтинг"
 
 
+@functools.lru_cache(maxsize=256)
+def _get_audience(category: str) -> str:
+    """Подбирает рекомендуемую аудиторию по категории гайда."""
+    low = category.lower()
+    for key, aud in _TARGET_AUDIENCES.items():
+        if key in low:
+            return aud
+    return _DEFAULT_AUDIENCE
+
+
 def build_ad_creatives(
     guide: dict,
     bot_username: str,
@@ -607,12 +701,7 @@ def build_ad_creatives(
         tg_ad = tg_ad[:157] + "..."
 
     # ── Target audience recommendation ────────────────────────────────
-    cat_lower = category.lower()
-    audience = _DEFAULT_AUDIENCE
-    for key, aud in _TARGET_AUDIENCES.items():
-        if key in cat_lower:
-            audience = aud
-            break
+    audience = _get_audience(category)
 
     # ── UTM note ──────────────────────────────────────────────────────
     utm_note = (
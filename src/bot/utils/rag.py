@@ -8,8 +8,10 @@
     answer = await ask_legal(question, context=context)
 """
 
+import asyncio
 import logging
 import re
+import time
 
 from src.bot.utils.cache import TTLCache
 from src.bot.utils.google_sheets import GoogleSheetsClient
@@ -26,24 +28,107 @@ _STOP_WORDS = frozenset({
 })
 
 
+_TOKEN_RE = re.compile(r"[a-zA-Zа-яА-ЯёЁ]{3,}")
+
+
 def _tokenize(text: str) -> set[str]:
     """Разбивает текст на уникальные слова (lowercase, без стоп-слов)."""
-    words = re.findall(r"[a-zA-Zа-яА-ЯёЁ]{3,}", text.lower())
-    return {w for w in words if w not in _STOP_WORDS}
+    return set(_TOKEN_RE.findall(text.lower())).difference(_STOP_WORDS)
+
+
+# Короткий запрос только из букв и пробелов — токены совпадут с обычным split()
+_SIMPLE_QUERY_RE = re.compile(r"^[a-zA-Zа-яА-ЯёЁ\s]+$")
+_SIMPLE_QUERY_MAX_LEN = 80
+
+
+def _tokenize_query(query: str) -> set[str]:
+    """Токенизация запроса пользователя с быстрым путём для коротких фраз."""
+    low = query.lower()
+    if len(low) < _SIMPLE_QUERY_MAX_LEN and _SIMPLE_QUERY_RE.match(low):
+        return {w for w in low.split() if len(w) >= 3}.difference(_STOP_WORDS)
+    return set(_TOKEN_RE.findall(low)).difference(_STOP_WORDS)
+
+
+# Кеш AI query expansion: нормализованный запрос → (время, токены)
+_EXPANSION_CACHE: dict[str, tuple[float, frozenset[str]]] = {}
+_EXPANSION_TTL = 3600
+_EXPANSION_CACHE_MAX = 1000
+
+
+# Инвертированный индекс: (тексты записей для контекста, токен → номера записей)
+_Index = tuple[list[str], dict[str, list[int]]]
+
+
+def _build_index(docs: list[tuple[str, str]]) -> _Index:
+    """Строит инвертированный индекс по парам (текст для поиска, запись)."""
+    entries: list[str] = []
+    postings: dict[str, list[int]] = {}
+    for i, (full_text, entry) in enumerate(docs):
+        entries.append(entry)
+        for token in _tokenize(full_text):
+            postings.setdefault(token, []).append(i)
+    return entries, postings
+
 
+def _data_room_index(data_room: list[dict]) -> _Index:
+    docs = []
+    for item in data_room:
+        title = item.get("title", item.get("Заголовок", ""))
+        content = item.get("content", item.get("Описание", ""))
+        category = item.get("category", item.get("Категория", ""))
+        docs.append((
+            f"{category} {title} {content}",
+            f"[{category}] {title}: {content[:300]}",
+        ))
+    return _build_index(docs)
 
-def _score_entry(query_tokens: set[str], entry_text: str) -> int:
-    """Считает количество совпадений токенов запроса с текстом записи."""
-    entry_tokens = _tokenize(entry_text)
-    return len(query_tokens & entry_tokens)
+
+def _articles_index(articles: list[dict]) -> _Index:
+    docs = []
+    for art in articles:
+        title = art.get("title", art.get("Заголовок", ""))
+        desc = art.get("description", art.get("Описание", ""))
+        cat = art.get("category", art.get("Категория", ""))
+        docs.append((
+            f"{cat} {title} {desc}",
+            f"[Статья: {cat}] {title}: {desc[:200]}",
+        ))
+    return _build_index(docs)
+
+
+def _score_index(
+    index: _Index,
+    query_tokens: set[str],
+    extra_tokens: set[str],
+) -> list[tuple[int, str]]:
+    """Скоринг записей индекса: 2 балла за токен запроса, 1 — за расширенный.
+
+    Returns:
+        Пары (score, запись) с ненулевым score в порядке записей в индексе.
+    """
+    entries, postings = index
+    scores: dict[int, int] = {}
+    get = scores.get
+    for tokens, weight in ((query_tokens, 2), (extra_tokens, 1)):
+        for token in tokens:
+            for i in postings.get(token, ()):
+                scores[i] = get(i, 0) + weight
+    return [(scores[i], entries[i]) for i in sorted(scores)]
 
 
 async def _expand_query_with_ai(query: str) -> set[str]:
     """AI Query Expansion: расширяет запрос семантически связанными ключами.
 
     Бот сам формулирует дополнительные поисковые ключи для максимального
-    извлечения контекста из Data Room.
+    извлечения контекста из Data Room. Успешные результаты кешируются
+    на ``_EXPANSION_TTL`` секунд, повторные запросы не ходят в Gemini.
     """
+    key = query.strip().lower()
+    now = time.monotonic()
+    cached = _EXPANSION_CACHE.get(key)
+    if cached is not None and now - cached[0] < _EXPANSION_TTL:
+        return set(cached[1])
+
     try:
         from src.bot.utils.ai_client import get_orchestrator
 
@@ -72,7 +157,14 @@ async def _expand_query_with_ai(query: str) -> set[str]:
             tokens = _tokenize(part)
             extra_tokens.update(tokens)
 
-        logger.info("RAG query expansion: +%d tokens for '%s'", len(extra_tokens), query[:50])
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("RAG query expansion: +%d tokens for '%s'", len(extra_tokens), query[:50])
+
+        if len(_EXPANSION_CACHE) >= _EXPANSION_CACHE_MAX:
+            # Вытесняем самую старую запись (dict сохраняет порядок вставки)
+            _EXPANSION_CACHE.pop(next(iter(_EXPANSION_CACHE)))
+        _EXPANSION_CACHE.pop(key, None)
+        _EXPANSION_CACHE[key] = (now, frozenset(extra_tokens))
         return extra_tokens
 
     except Exception as e:
@@ -100,52 +192,51 @@ async def find_relevant_context(
     Returns:
         Форматированная строка с релевантными записями.
     """
-    query_tokens = _tokenize(query)
+    query_tokens = _tokenize_query(query)
     if not query_tokens:
         return ""
 
-    # AI Query Expansion — расширяем набор токенов
+    async def _fetch_data_room_index() -> _Index:
+        return _data_room_index(await google.get_data_room())
+
+    # Data Room, статьи и AI query expansion независимы — запрашиваем параллельно;
+    # ошибки каждого источника обрабатываются отдельно ниже.
+    # Индекс строится в той же выборке, что и Data Room, и кешируется вместо
+    # сырых записей — один TTL, индекс не переживает данные, по которым построен.
+    fetches = [
+        cache.get_or_fetch("data_room", _fetch_data_room_index),
+        google.get_articles_list(limit=30),
+    ]
     if expand:
-        expanded_tokens = await _expand_query_with_ai(query)
-        # Оригинальные токены имеют вес 2x (добавляем дубль)
-        all_tokens = query_tokens | expanded_tokens
+        fetches.append(_expand_query_with_ai(query))
+    data_room_index, articles, *expansion = await asyncio.gather(
+        *fetches, return_exceptions=True,
+    )
+
+    # AI Query Expansion — расширяем набор токенов
+    # (оригинальные токены имеют вес 2x)
+    if expand and isinstance(expansion[0], set):
+        extra_tokens = expansion[0] - query_tokens
     else:
-        all_tokens = query_tokens
+        extra_tokens = set()
 
-    scored: list[tuple[int, str, str]] = []  # (score, source, text)
+    scored: list[tuple[int, str]] = []  # (score, text)
 
     # 1. Data Room
     try:
-        data_room = await cache.get_or_fetch("data_room", google.get_data_room)
-        for item in data_room:
-            title = item.get("title", item.get("Заголовок", ""))
-            content = item.get("content", item.get("Описание", ""))
-            category = item.get("category", item.get("Категория", ""))
-            full_text = f"{category} {title} {content}"
-            # Двойной вес для оригинальных токенов
-            base_score = _score_entry(query_tokens, full_text) * 2
-            expanded_score = _score_entry(all_tokens - query_tokens, full_text) if expand else 0
-            total_score = base_score + expanded_score
-            if total_score > 0:
-                entry = f"[{category}] {title}: {content[:300]}"
-                scored.append((total_score, "Data Room", entry))
+        if isinstance(data_room_index, BaseException):
+            raise data_room_index
+        scored.extend(_score_index(data_room_index, query_tokens, extra_tokens))
     except Exception as e:
         logger.warning("RAG: ошибка загрузки Data Room: %s", e)
 
     # 2. Статьи сайта
     try:
-        articles = await google.get_articles_list(limit=30)
-        for art in articles:
-            title = art.get("title", art.get("Заголовок", ""))
-            desc = art.get("description", art.get("Описание", ""))
-            cat = art.get("category", art.get("Категория", ""))
-            full_text = f"{cat} {title} {desc}"
-            base_score = _score_entry(query_tokens, full_text) * 2
-            expanded_score = _score_entry(all_tokens - query_tokens, full_text) if expand else 0
-            total_score = base_score + expanded_score
-            if total_score > 0:
-                entry = f"[Статья: {cat}] {title}: {desc[:200]}"
-                scored.append((total_score, "Статьи", entry))
+        if isinstance(articles, BaseException):
+            raise articles
+        scored.extend(
+            _score_index(_articles_index(articles), query_tokens, extra_tokens),
+        )
     except Exception as e:
         logger.warning("RAG: ошибка загрузки статей: %s", e)
 
@@ -156,5 +247,5 @@ async def find_relevant_context(
     scored.sort(key=lambda x: x[0], reverse=True)
     top = scored[:top_k]
 
-    lines = [f"- {entry}" for _, _, entry in top]
+    lines = [f"- {entry}" for _, entry in top]
     return "\n".join(lines)
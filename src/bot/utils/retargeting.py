@@ -11,11 +11,19 @@
     BOT_USERNAME     — username бота (автоматически из main.py)
 """
 
+import asyncio
+import csv
+import functools
 import hashlib
 import logging
+import os
 import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
 from typing import Any
 
+import aiohttp
+
 logger = logging.getLogger(__name__)
 
 # Кэш bot username (заполняется при старте бота)
@@ -26,12 +34,16 @@ def set_bot_username(username: str) -> None:
     """Устанавливается один раз при старте бота (main.py)."""
     global _bot_username
     _bot_username = username
+    make_deep_link.cache_clear()
     logger.info("Retargeting: bot username set to @%s", username)
 
 
 # ── UTM Deep Link Builder ────────────────────────────────────────────
 
 
+# Ссылки для рассылок повторяются (одна кампания → тысячи получателей);
+# кеш сбрасывается в set_bot_username().
+@functools.lru_cache(maxsize=1024)
 def make_deep_link(
     payload: str,
     *,
@@ -61,16 +73,14 @@ def make_deep_link(
         logger.warning("Bot username not set — using placeholder")
         username = "SOLIS_law_bot"
 
-    parts = [payload]
+    url = f"https://t.me/{username}?start={payload}"
     if source:
-        parts.append(f"src_{source}")
+        url += f"--src_{source}"
     if medium:
-        parts.append(f"med_{medium}")
+        url += f"--med_{medium}"
     if campaign:
-        parts.append(f"cmp_{campaign}")
-
-    start_param = "--".join(parts)
-    return f"https://t.me/{username}?start={start_param}"
+        url += f"--cmp_{campaign}"
+    return url
 
 
 def make_guide_deep_link(
@@ -122,20 +132,178 @@ def make_bot_link(
 # ── Facebook Conversions API ─────────────────────────────────────────
 
 
-def _get_fb_config() -> tuple[str, str]:
-    """Возвращает (pixel_id, access_token) из env."""
-    import os
+@functools.lru_cache(maxsize=1)
+def _get_fb_config() -> tuple[str, str, str]:
+    """Возвращает (pixel_id, access_token, events_url) из env.
+
+    Env читается один раз; для перечитывания — :func:`reload_fb_config`.
+    """
+    pixel_id = os.getenv("FB_PIXEL_ID", "")
     return (
-        os.getenv("FB_PIXEL_ID", ""),
+        pixel_id,
         os.getenv("FB_ACCESS_TOKEN", ""),
+        f"https://graph.facebook.com/v18.0/{pixel_id}/events",
     )
 
 
-def _hash_for_fb(value: str) -> str:
+def reload_fb_config() -> None:
+    """Сбрасывает закешированную конфигурацию Conversions API (для тестов)."""
+    _get_fb_config.cache_clear()
+
+
+# Общая HTTP-сессия для Conversions API (keep-alive, пул соединений)
+_fb_session: aiohttp.ClientSession | None = None
+
+
+async def _get_fb_session() -> aiohttp.ClientSession:
+    global _fb_session
+    if _fb_session is None or _fb_session.closed:
+        _fb_session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=50,
+                limit_per_host=20,
+                keepalive_timeout=75,
+                ttl_dns_cache=300,
+            ),
+            timeout=aiohttp.ClientTimeout(total=10),
+        )
+    return _fb_session
+
+
+async def close_fb_session() -> None:
+    """Закрыть HTTP-сессию Conversions API (при остановке бота)."""
+    global _fb_session
+    if _fb_session and not _fb_session.closed:
+        await _fb_session.close()
+    _fb_session = None
+
+
+def _hash_for_fb_uncached(value: str) -> str:
     """SHA-256 хэш для Facebook (нормализация + lowercase)."""
     return hashlib.sha256(value.strip().lower().encode()).hexdigest()
 
 
+# Для событий одни и те же email / user_id повторяются — кешируем хэши
+_hash_for_fb = functools.lru_cache(maxsize=20_000)(_hash_for_fb_uncached)
+
+
+# Очередь событий Conversions API: отправляются пачками ({"data": [...]}),
+# фоновый flusher стартует при первом событии.
+_FB_BATCH_SIZE = 100        # событий в одном запросе (лимит API — 1000)
+_FB_MAX_LINGER = 2.0        # сек ожидания добора пачки
+_FB_QUEUE_MAX = 10_000      # защита от роста памяти при недоступности API
+_FB_ERROR_BODY_MAX = 512    # байт тела ответа с ошибкой, читаемых для лога
+
+_fb_queue: asyncio.Queue | None = None
+_fb_flusher_task: asyncio.Task | None = None
+# Остановка flusher-а: флаг + маркер в очереди (будит ожидающий get()).
+# Задачу не отменяем — отмена посреди POST оборвала бы запрос и потеряла пачку.
+_fb_stop: asyncio.Event | None = None
+_FB_STOP = object()
+
+
+def _get_fb_queue() -> asyncio.Queue:
+    global _fb_queue, _fb_flusher_task, _fb_stop
+    loop = asyncio.get_running_loop()
+    if _fb_flusher_task is not None and _fb_flusher_task.get_loop() is not loop:
+        # Очередь и flusher привязаны к старому event loop — пересоздаём
+        _fb_queue = None
+        _fb_flusher_task = None
+    if _fb_queue is None:
+        _fb_queue = asyncio.Queue(maxsize=_FB_QUEUE_MAX)
+    if _fb_flusher_task is None or _fb_flusher_task.done():
+        _fb_stop = asyncio.Event()
+        _fb_flusher_task = loop.create_task(_run_fb_flusher(_fb_stop))
+    return _fb_queue
+
+
+async def _post_fb_events(events: list[dict[str, Any]]) -> bool:
+    """Отправляет пачку событий одним запросом в Conversions API."""
+    _, access_token, url = _get_fb_config()
+
+    try:
+        session = await _get_fb_session()
+        async with session.post(
+            url,
+            params={"access_token": access_token},
+            json={"data": events},
+        ) as resp:
+            if resp.status == 200:
+                logger.info(
+                    "FB events sent: %d (%s)",
+                    len(events),
+                    ", ".join(sorted({e["event_name"] for e in events})),
+                )
+                return True
+            # Только начало тела: при сбоях FB отдаёт большие HTML-страницы
+            err = await resp.content.read(_FB_ERROR_BODY_MAX)
+            logger.warning(
+                "FB event error %d: %s",
+                resp.status, err.decode("utf-8", "replace")[:200],
+            )
+            return False
+
+    except Exception as e:
+        logger.warning("FB Conversions API error: %s", e)
+        return False
+
+
+async def _run_fb_flusher(stop: asyncio.Event) -> None:
+    """Фоновая отправка: ждёт событие, добирает пачку и отправляет её.
+
+    После ``stop`` отправляет всё, что осталось в очереди, и завершается.
+    """
+    queue = _fb_queue
+    while True:
+        if stop.is_set() and queue.empty():
+            return
+        item = await queue.get()
+        if item is _FB_STOP:
+            continue
+        batch = [item]
+        if not stop.is_set() and queue.qsize() < _FB_BATCH_SIZE - 1:
+            # Ждём добора пачки; остановка бота прерывает ожидание сразу
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=_FB_MAX_LINGER)
+            except asyncio.TimeoutError:
+                pass
+        while len(batch) < _FB_BATCH_SIZE and not queue.empty():
+            item = queue.get_nowait()
+            if item is not _FB_STOP:
+                batch.append(item)
+        await _post_fb_events(batch)
+
+
+async def flush_fb_events() -> None:
+    """Останавливает фоновый flusher и отправляет оставшиеся события.
+
+    Вызывается при остановке бота (main.py).
+    """
+    global _fb_queue, _fb_flusher_task, _fb_stop
+    if _fb_flusher_task is not None:
+        if not _fb_flusher_task.done():
+            _fb_stop.set()
+            try:
+                _fb_queue.put_nowait(_FB_STOP)
+            except asyncio.QueueFull:
+                pass  # Очередь непуста — flusher не спит в get() и увидит флаг сам
+            await _fb_flusher_task
+        _fb_flusher_task = None
+        _fb_stop = None
+
+    # Flusher не запускался или упал — отправляем остаток сами
+    if _fb_queue is None:
+        return
+    pending: list[dict[str, Any]] = []
+    while not _fb_queue.empty():
+        item = _fb_queue.get_nowait()
+        if item is not _FB_STOP:
+            pending.append(item)
+    _fb_queue = None
+    for i in range(0, len(pending), _FB_BATCH_SIZE):
+        await _post_fb_events(pending[i:i + _FB_BATCH_SIZE])
+
+
 async def send_fb_event(
     event_name: str,
     *,
@@ -152,6 +320,9 @@ async def send_fb_event(
         - ViewContent   — просмотр превью гайда
         - CompleteRegistration — регистрация (email + consent)
 
+    Событие ставится в очередь и уходит в API пачкой вместе с
+    другими (см. ``_run_fb_flusher``).
+
     Args:
         event_name: Название события (Lead, Schedule и т.д.)
         email: Email пользователя (хэшируется перед отправкой)
@@ -160,15 +331,13 @@ async def send_fb_event(
         custom_data: Дополнительные параметры
 
     Returns:
-        True если событие отправлено успешно.
+        True если событие принято в очередь на отправку.
     """
-    pixel_id, access_token = _get_fb_config()
+    pixel_id, access_token, _ = _get_fb_config()
     if not pixel_id or not access_token:
         return False
 
     try:
-        import aiohttp
-
         user_data: dict[str, Any] = {}
         if email:
             user_data["em"] = [_hash_for_fb(email)]
@@ -182,33 +351,21 @@ async def send_fb_event(
             "user_data": user_data,
         }
 
-        cd = dict(custom_data or {})
         if guide_id:
-            cd["content_ids"] = [guide_id]
-            cd["content_type"] = "product"
-        if cd:
-            event_data["custom_data"] = cd
-
-        payload = {"data": [event_data]}
-
-        url = f"https://graph.facebook.com/v18.0/{pixel_id}/events"
-
-        async with aiohttp.ClientSession() as session:
-            resp = await session.post(
-                url,
-                params={"access_token": access_token},
-                json=payload,
-            )
-            if resp.status == 200:
-                logger.info(
-                    "FB event sent: %s email=%s guide=%s",
-                    event_name, email[:15] if email else "-", guide_id or "-",
-                )
-                return True
-            err = await resp.text()
-            logger.warning("FB event error %d: %s", resp.status, err[:200])
-            return False
-
+            event_data["custom_data"] = {
+                **(custom_data or {}),
+                "content_ids": [guide_id],
+                "content_type": "product",
+            }
+        elif custom_data:
+            event_data["custom_data"] = custom_data
+
+        _get_fb_queue().put_nowait(event_data)
+        return True
+
+    except asyncio.QueueFull:
+        logger.warning("FB events queue is full — dropping %s", event_name)
+        return False
     except Exception as e:
         logger.warning("FB Conversions API error: %s", e)
         return False
@@ -266,17 +423,54 @@ def build_audience_csv(
     Формат: email (один на строку), первая строка — заголовок.
     Facebook принимает как plain email, так и хэшированный SHA-256.
     """
-    lines = []
-    if include_header:
-        lines.append("email")
-    for email in sorted(emails):
-        lines.append(email.strip().lower())
+    lines = ["email"] if include_header else []
+    lines += [email.strip().lower() for email in sorted(emails)]
     return "\n".join(lines)
 
 
+# С какого размера аудитории хэширование раскладывается по процессам
+# (на меньших объёмах запуск пула дороже самого хэширования)
+_PARALLEL_HASH_THRESHOLD = 100_000
+
+
+def _hash_batch(chunk: list[str]) -> list[str]:
+    """Хэширует пачку email (top-level — для ProcessPoolExecutor)."""
+    return [
+        hashlib.sha256(email.strip().lower().encode()).hexdigest()
+        for email in chunk
+    ]
+
+
 def build_audience_csv_hashed(emails: set[str]) -> str:
     """CSV с SHA-256 хэшированными email (повышенная безопасность)."""
-    lines = ["email_hash"]
-    for email in sorted(emails):
-        lines.append(_hash_for_fb(email))
-    return "\n".join(lines)
+    ordered = sorted(emails)
+    workers = os.cpu_count() or 1
+    if len(ordered) > _PARALLEL_HASH_THRESHOLD and workers > 1:
+        size = max(1, len(ordered) // (workers * 4))
+        chunks = [ordered[i:i + size] for i in range(0, len(ordered), size)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            hashes = [h for part in pool.map(_hash_batch, chunks) for h in part]
+    else:
+        # Выгрузка — разовый проход по уникальным email, кеш не засоряем
+        hashes = _hash_batch(ordered)
+    return "\n".join(["email_hash", *hashes])
+
+
+def build_audience_csv_to_file(
+    emails: set[str],
+    path: str | Path,
+    *,
+    hashed: bool = False,
+) -> None:
+    """Пишет CSV аудитории построчно в файл (для больших выгрузок).
+
+    Формат совпадает с :func:`build_audience_csv` / :func:`build_audience_csv_hashed`,
+    но строки не собираются целиком в памяти.
+    """
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["email_hash" if hashed else "email"])
+        for email in sorted(emails):
+            writer.writerow([
+                _hash_for_fb_uncached(email) if hashed else email.strip().lower(),
+            ])
@@ -24,10 +24,32 @@ logger = logging.getLogger(__name__)
 # Минимум дней неактивности
 SLEEP_THRESHOLD_DAYS = 14
 
-# Cooldown между re-engagement (не чаще 1 раза в 30 дней)
-_last_reengaged: dict[int, float] = {}
+# Cooldown между re-engagement (не чаще 1 раза в 30 дней),
+# хранится в users.last_reengaged_at
 REENGAGE_COOLDOWN_DAYS = 30
 
+# Одновременных отправок (лимит Telegram — ~30 сообщений/сек на бота,
+# пачка цикла — 20 пользователей)
+_SEND_CONCURRENCY = 20
+
+# Клавиатура re-engagement одинакова для всех пользователей
+_REENGAGE_KEYBOARD = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [InlineKeyboardButton(
+            text="🤖 Задать вопрос AI-юристу",
+            callback_data="start_consult",
+        )],
+        [InlineKeyboardButton(
+            text="📚 Новые гайды",
+            callback_data="show_all_guides",
+        )],
+        [InlineKeyboardButton(
+            text="🔕 Не напоминать",
+            callback_data="retention_optout",
+        )],
+    ]
+)
+
 
 async def check_sleeping_users(
     bot: Bot,
@@ -40,7 +62,7 @@ async def check_sleeping_users(
         {"checked": N, "sleeping": N, "reengaged": N, "skipped": N}
     """
     from src.database.models import async_session, User
-    from sqlalchemy import select
+    from sqlalchemy import func, or_, select, update
 
     now = datetime.now(timezone.utc)
     threshold = now - timedelta(days=SLEEP_THRESHOLD_DAYS)
@@ -51,57 +73,73 @@ async def check_sleeping_users(
     try:
         async with async_session() as session:
             # Пользователи, которые не заходили > SLEEP_THRESHOLD_DAYS
-            stmt = select(User).where(
+            is_sleeping = (
                 User.last_activity < threshold,
                 User.last_activity.isnot(None),
             )
+            stats["sleeping"] = await session.scalar(
+                select(func.count()).select_from(User).where(*is_sleeping)
+            ) or 0
+
+            # ...и не получали re-engagement в течение cooldown.
+            # Грузим только пачку цикла, начиная с самых давно неактивных.
+            stmt = (
+                select(User)
+                .where(
+                    *is_sleeping,
+                    or_(
+                        User.last_reengaged_at.is_(None),
+                        User.last_reengaged_at < cooldown_ts,
+                    ),
+                )
+                .order_by(User.last_activity)
+                .limit(20)  # Лимит 20 за цикл
+            )
             result = await session.execute(stmt)
             sleeping_users = list(result.scalars().all())
 
         stats["checked"] = len(sleeping_users)
-        stats["sleeping"] = len(sleeping_users)
 
-        for user in sleeping_users[:20]:  # Лимит 20 за цикл
-            uid = user.user_id
+        # Интересы всех пользователей — одним запросом к Google Sheets
+        interests_by_uid = await _load_interests(google) if sleeping_users else {}
+
+        # Генерируем сообщения (AI — пачками по _AI_BATCH_SIZE пользователей)
+        profiles = [
+            (user.full_name or "", interests_by_uid.get(str(user.user_id), []))
+            for user in sleeping_users
+        ]
+        texts = await _generate_reengage_messages(profiles)
 
-            # Проверяем cooldown
-            last = _last_reengaged.get(uid, 0)
-            if last > cooldown_ts.timestamp():
-                stats["skipped"] += 1
-                continue
+        sem = asyncio.Semaphore(_SEND_CONCURRENCY)
 
-            # Генерируем сообщение
-            text = await _generate_reengage_message(uid, user.full_name or "", google, cache)
+        async def _send(uid: int, text: str | None) -> bool:
             if not text:
-                stats["skipped"] += 1
-                continue
-
-            # Отправляем
-            try:
-                keyboard = InlineKeyboardMarkup(
-                    inline_keyboard=[
-                        [InlineKeyboardButton(
-                            text="🤖 Задать вопрос AI-юристу",
-                            callback_data="start_consult",
-                        )],
-                        [InlineKeyboardButton(
-                            text="📚 Новые гайды",
-                            callback_data="show_all_guides",
-                        )],
-                        [InlineKeyboardButton(
-                            text="🔕 Не напоминать",
-                            callback_data="retention_optout",
-                        )],
-                    ]
+                return False
+            async with sem:
+                try:
+                    await bot.send_message(
+                        chat_id=uid, text=text, reply_markup=_REENGAGE_KEYBOARD,
+                    )
+                    return True
+                except Exception as e:
+                    logger.debug("Retention send failed for %s: %s", uid, e)
+                    return False
+
+        # Отправляем параллельно (не больше _SEND_CONCURRENCY одновременно)
+        uids = [user.user_id for user in sleeping_users]
+        sent = await asyncio.gather(*(_send(uid, text) for uid, text in zip(uids, texts)))
+        reengaged_ids = [uid for uid, ok in zip(uids, sent) if ok]
+        stats["reengaged"] = len(reengaged_ids)
+        stats["skipped"] = len(uids) - len(reengaged_ids)
+
+        if reengaged_ids:
+            async with async_session() as session:
+                await session.execute(
+                    update(User)
+                    .where(User.user_id.in_(reengaged_ids))
+                    .values(last_reengaged_at=now)
                 )
-                await bot.send_message(chat_id=uid, text=text, reply_markup=keyboard)
-                _last_reengaged[uid] = now.timestamp()
-                stats["reengaged"] += 1
-            except Exception as e:
-                logger.debug("Retention send failed for %s: %s", uid, e)
-                stats["skipped"] += 1
-
-            await asyncio.sleep(0.1)  # Rate limit
+                await session.commit()
 
     except Exception as e:
         logger.error("Retention check error: %s", e)
@@ -110,56 +148,103 @@ async def check_sleeping_users(
     return stats
 
 
-async def _generate_reengage_message(
-    user_id: int,
-    name: str,
-    google=None,
-    cache=None,
-) -> str | None:
-    """AI генерирует персонализированное сообщение для спящего пользователя."""
+# Сколько пользователей обрабатывает один AI-запрос
+_AI_BATCH_SIZE = 10
 
-    # Получаем интересы пользователя
-    interests = []
+# Разделитель сообщений в ответе AI
+_AI_MESSAGE_SEPARATOR = "---"
+
+
+async def _load_interests(google=None) -> dict[str, list[str]]:
+    """Индекс «user_id → скачанные гайды» по лидам из Google Sheets."""
+    interests_by_uid: dict[str, list[str]] = {}
     if google:
         try:
-            leads = await google.get_recent_leads(limit=200)
+            leads = await google.get_recent_leads(limit=1000)
             for lead in leads:
-                if str(lead.get("user_id", "")) == str(user_id):
-                    guide = lead.get("guide", lead.get("selected_guide", ""))
-                    if guide:
-                        interests.append(guide)
+                guide = lead.get("guide", lead.get("selected_guide", ""))
+                if guide:
+                    uid = str(lead.get("user_id", ""))
+                    interests_by_uid.setdefault(uid, []).append(guide)
         except Exception:
             pass
+    return interests_by_uid
 
-    greeting = f"👋 {name}! " if name else "👋 "
 
-    if interests:
-        # Персонализированное сообщение на основе интересов
-        guides_text = ", ".join(set(interests))
-        try:
-            from src.bot.utils.ai_client import ask_marketing
+def _greeting(name: str) -> str:
+    return f"👋 {name}! " if name else "👋 "
+
+
+async def _generate_reengage_messages(
+    profiles: list[tuple[str, list[str]]],
+) -> list[str]:
+    """AI генерирует персонализированные сообщения для спящих пользователей.
+
+    Пользователи с интересами обрабатываются пачками: один AI-запрос
+    возвращает сообщения для всей пачки через разделитель ``---``.
 
+    Args:
+        profiles: Пары (имя, скачанные гайды).
+
+    Returns:
+        Тексты сообщений в том же порядке, что и ``profiles``.
+    """
+    # Fallback без AI
+    texts = [
+        f"{_greeting(name)}Давно не виделись!\n\n"
+        "У нас появились новые материалы по юридическим вопросам "
+        "для бизнеса в Казахстане.\n\n"
+        "Посмотрите, что нового? 👇"
+        for name, _ in profiles
+    ]
+
+    # Персонализированные сообщения на основе интересов
+    personalized = [
+        (i, name, interests)
+        for i, (name, interests) in enumerate(profiles)
+        if interests
+    ]
+    if not personalized:
+        return texts
+
+    from src.bot.utils.ai_client import ask_marketing
+
+    for start in range(0, len(personalized), _AI_BATCH_SIZE):
+        batch = personalized[start:start + _AI_BATCH_SIZE]
+        # Лиды в таблице идут от старых к новым — в промпт сначала свежие гайды
+        users_text = "\n".join(
+            f"{n}. {name or 'Пользователь'} — скачивал гайды: {', '.join(dict.fromkeys(reversed(interests)))}"
+            for n, (_, name, interests) in enumerate(batch, 1)
+        )
+        try:
             result = await ask_marketing(
                 prompt=(
-                    f"Пользователь {name} скачивал гайды: {guides_text}.\n"
-                    "Он не заходил в бот 2 недели.\n"
-                    "Напиши КОРОТКОЕ (2-3 предложения) дружеское сообщение:\n"
+                    "Эти пользователи не заходили в бот 2 недели:\n"
+                    f"{users_text}\n\n"
+                    "Для КАЖДОГО напиши КОРОТКОЕ (2-3 предложения) дружеское сообщение:\n"
                     "1. Упомяни, что появились обновления по его теме\n"
                     "2. Задай вопрос, связанный с его интересами\n"
                     "3. Предложи посмотреть новые материалы\n"
-                    "Формат: чистый текст без HTML-тегов."
+                    "Формат: чистый текст без HTML-тегов и без нумерации, "
+                    f"сообщения в том же порядке, разделённые строкой «{_AI_MESSAGE_SEPARATOR}»."
                 ),
-                max_tokens=200,
+                max_tokens=200 * len(batch),
                 temperature=0.8,
             )
-            return f"{greeting}{result.strip()}"
         except Exception as e:
             logger.warning("Retention AI failed: %s", e)
+            continue
+
+        messages = [
+            m.strip() for m in result.split(_AI_MESSAGE_SEPARATOR) if m.strip()
+        ]
+        if len(messages) != len(batch):
+            logger.warning(
+                "Retention AI: expected %d messages, got %d — using fallback",
+                len(batch), len(messages),
+            )
+            continue
+        for (i, name, _), message in zip(batch, messages):
+            texts[i] = f"{_greeting(name)}{message}"
 
-    # Fallback без AI
-    return (
-        f"{greeting}Давно не виделись!\n\n"
-        "У нас появились новые материалы по юридическим вопросам "
-        "для бизнеса в Казахстане.\n\n"
-        "Посмотрите, что нового? 👇"
-    )
+    return texts
@@ -2,9 +2,15 @@
 
 Архитектура:
 - ``schedule_followup_series()`` записывает 3 задачи в таблицу ``scheduled_tasks``.
-- ``TaskRunner`` — async-цикл, который каждые ``poll_interval`` секунд
-  проверяет базу на due-задачи (status=pending, run_at <= now) и исполняет их.
+- ``TaskRunner`` — async-цикл, который проверяет базу на due-задачи
+  (status=pending, run_at <= now) и исполняет их. Между проверками спит до
+  ближайшего ``run_at`` (но не дольше ``poll_interval``); новые задачи
+  будят его через ``notify_task_runner()``.
 - Задачи переживают рестарт бота — при старте runner подхватит все просроченные.
+
+Поиск due-задач опирается на составной индекс ``(status, run_at)``
+(``ix_scheduled_tasks_status_run_at`` в ``ScheduledTask``) — без него каждый
+poll сканирует всю таблицу, включая историю выполненных задач.
 """
 
 import asyncio
@@ -15,8 +21,9 @@ from typing import Any, Callable, Coroutine
 from src.database.crud import (
     create_scheduled_task,
     get_due_tasks,
-    mark_task_done,
-    mark_task_failed,
+    get_next_run_at,
+    mark_tasks_done,
+    mark_tasks_failed,
 )
 
 logger = logging.getLogger(__name__)
@@ -38,6 +45,18 @@ def get_scheduler():
 # Тип обработчика: async (task_dto) -> None
 TaskHandler = Callable[..., Coroutine[Any, Any, None]]
 
+# Минимальная пауза между проверками (защита от busy-loop)
+_MIN_SLEEP = 1.0
+
+# Запущенный TaskRunner — его будит notify_task_runner()
+_active_runner: "TaskRunner | None" = None
+
+
+def notify_task_runner() -> None:
+    """Будит запущенный TaskRunner, чтобы он пересчитал время сна."""
+    if _active_runner is not None:
+        _active_runner.notify()
+
 
 # ─────────────────── Планирование follow-up серии ─────────────────────
 
@@ -66,6 +85,8 @@ async def schedule_followup_series(user_id: int, guide_id: str) -> None:
             payload={"guide_id": guide_id, "step": step},
         )
 
+    notify_task_runner()
+
     logger.info(
         "Follow-up series scheduled: user_id=%s, guide=%s (3 tasks)",
         user_id, guide_id,
@@ -82,28 +103,39 @@ class TaskRunner:
     Запускайте ``start()`` и останавливайте ``stop()``.
     """
 
-    def __init__(self, poll_interval: int = 60) -> None:
+    def __init__(self, poll_interval: int = 60, max_concurrency: int = 10) -> None:
         self._poll_interval = poll_interval
+        self._max_concurrency = max_concurrency
         self._handlers: dict[str, TaskHandler] = {}
         self._task: asyncio.Task | None = None
         self._running = False
+        self._wake = asyncio.Event()
 
     def register(self, task_type: str, handler: TaskHandler) -> None:
         """Регистрирует async-обработчик для типа задачи."""
         self._handlers[task_type] = handler
         logger.info("TaskRunner: handler registered for '%s'", task_type)
 
+    def notify(self) -> None:
+        """Прерывает сон цикла (появилась новая задача)."""
+        self._wake.set()
+
     def start(self) -> None:
         """Запускает фоновый polling-цикл."""
+        global _active_runner
         if self._running:
             return
         self._running = True
+        _active_runner = self
         self._task = asyncio.create_task(self._loop(), name="task_runner_poll")
         logger.info("TaskRunner started (poll every %ds)", self._poll_interval)
 
     def stop(self) -> None:
         """Останавливает polling."""
+        global _active_runner
         self._running = False
+        if _active_runner is self:
+            _active_runner = None
         if self._task and not self._task.done():
             self._task.cancel()
         logger.info("TaskRunner stopped")
@@ -113,19 +145,27 @@ class TaskRunner:
         return self._running
 
     async def _loop(self) -> None:
-        """Основной цикл: sleep → poll → execute → repeat."""
+        """Основной цикл: poll → execute → sleep до ближайшей задачи → repeat."""
         while self._running:
+            sleep_for = self._poll_interval
             try:
                 await self._poll_and_execute()
+                next_run = await get_next_run_at()
+                if next_run is not None:
+                    delay = (next_run - datetime.now(timezone.utc)).total_seconds()
+                    sleep_for = min(sleep_for, max(_MIN_SLEEP, delay))
             except asyncio.CancelledError:
                 break
             except Exception as exc:
                 logger.error("TaskRunner poll error: %s", exc, exc_info=True)
 
             try:
-                await asyncio.sleep(self._poll_interval)
+                await asyncio.wait_for(self._wake.wait(), timeout=sleep_for)
+            except asyncio.TimeoutError:
+                pass
             except asyncio.CancelledError:
                 break
+            self._wake.clear()
 
     async def _poll_and_execute(self) -> None:
         """Забирает due-задачи и исполняет."""
@@ -135,18 +175,30 @@ class TaskRunner:
 
         logger.info("TaskRunner: %d due tasks found", len(tasks))
 
-        for task in tasks:
+        sem = asyncio.Semaphore(self._max_concurrency)
+        done_ids: list[int] = []
+        failed: list[tuple[int, str]] = []
+
+        async def _run_one(task) -> None:
             handler = self._handlers.get(task.task_type)
             if handler is None:
                 logger.warning("No handler for task type '%s' (id=%s)", task.task_type, task.id)
-                await mark_task_failed(task.id, error=f"No handler for '{task.task_type}'")
-                continue
-
-            try:
-                await handler(task)
-                await mark_task_done(task.id)
-            except Exception as exc:
-                logger.error(
-                    "Task %s failed: %s", task.id, exc, exc_info=True,
-                )
-                await mark_task_failed(task.id, error=str(exc))
+                failed.append((task.id, f"No handler for '{task.task_type}'"))
+                return
+
+            async with sem:
+                try:
+                    await handler(task)
+                    done_ids.append(task.id)
+                except Exception as exc:
+                    logger.error(
+                        "Task %s failed: %s", task.id, exc, exc_info=True,
+                    )
+                    failed.append((task.id, str(exc)))
+
+        # Задачи независимы — исполняем параллельно (не больше max_concurrency)
+        await asyncio.gather(*(_run_one(task) for task in tasks))
+
+        # Статусы — пачкой после цикла, а не UPDATE на каждую задачу
+        await mark_tasks_done(done_ids)
+        await mark_tasks_failed(failed)
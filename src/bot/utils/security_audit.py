@@ -13,10 +13,16 @@
     report = run_security_audit()
 """
 
+import hashlib
+import json
 import logging
 import os
 import re
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
 from pathlib import Path
+from typing import Iterator
 
 logger = logging.getLogger(__name__)
 
@@ -26,19 +32,35 @@ AUDIT_DIRS = [
     Path("tests"),
 ]
 
+# Кэш результатов scan_file по хэшу содержимого (файлы старше 48 ч
+# удаляет log_manager.cleanup_cache)
+AUDIT_CACHE_DIR = Path("data/cache")
+
+# Версия сканера в ключе кэша: любая правка этого модуля (паттерны,
+# фильтры) сбрасывает кэш
+_AUDIT_VERSION = hashlib.sha256(Path(__file__).read_bytes()).hexdigest()
+
 # Файлы, которые пропускаем
-SKIP_FILES = {
+# Имена директорий и файлов (компоненты пути), которые не сканируем.
+# .pyc отсекается проверкой расширения в _should_skip.
+SKIP_FILES = frozenset({
     "__pycache__",
-    ".pyc",
     "node_modules",
     ".git",
     "security_audit.py",  # себя пропускаем
-}
-
-# Паттерны уязвимостей
+})
+
+# Паттерны уязвимостей.
+# "keywords" — подстроки (в нижнем регистре), хотя бы одна из которых
+# есть в любой строке, где паттерн совпадает: по ним строки отсеиваются
+# до запуска самих паттернов.
+# Паттерны без lookaround и обратных ссылок: совместимы с RE2 и не дают
+# сверхлинейного перебора; условия «после совпадения» проверяет
+# _is_false_positive.
 VULNERABILITY_PATTERNS = {
     "SQL_INJECTION": {
         "pattern": re.compile(r'f["\'].*?(SELECT|INSERT|UPDATE|DELETE|DROP|ALTER)\s', re.IGNORECASE),
+        "keywords": ("f\"", "f'"),
         "severity": "CRITICAL",
         "description": "Потенциальная SQL-инъекция через f-string",
         "fix": "Используйте SQLAlchemy ORM или параметризованные запросы",
@@ -48,111 +70,251 @@ VULNERABILITY_PATTERNS = {
             r'(api_key|secret|password|token)\s*=\s*["\'][A-Za-z0-9_\-]{20,}["\']',
             re.IGNORECASE,
         ),
+        "keywords": ("api_key", "secret", "password", "token"),
         "severity": "HIGH",
         "description": "Возможно, захардкоженный секрет",
         "fix": "Вынесите секрет в .env и используйте settings.VARIABLE",
     },
     "EXEC_EVAL": {
         "pattern": re.compile(r'\b(exec|eval)\s*\('),
+        "keywords": ("exec", "eval"),
         "severity": "HIGH",
         "description": "Использование exec/eval — потенциальная RCE",
         "fix": "Замените на безопасную альтернативу",
     },
     "PICKLE_LOAD": {
         "pattern": re.compile(r'pickle\.loads?\('),
+        "keywords": ("pickle.",),
         "severity": "HIGH",
         "description": "pickle.load — потенциальная десериализация вредоносных данных",
         "fix": "Используйте JSON для десериализации",
     },
     "OPEN_WITHOUT_ENCODING": {
-        "pattern": re.compile(r'open\([^)]*\)\s*(?!.*encoding)'),
+        "pattern": re.compile(r'open\([^)]*\)'),
+        "keywords": ("open(",),
         "severity": "LOW",
         "description": "open() без явного encoding — возможны проблемы на разных ОС",
         "fix": "Добавьте encoding='utf-8'",
     },
     "SUBPROCESS_SHELL": {
         "pattern": re.compile(r'subprocess\.(run|Popen|call)\(.*shell\s*=\s*True'),
+        "keywords": ("subprocess.",),
         "severity": "HIGH",
         "description": "subprocess с shell=True — риск инъекции команд",
         "fix": "Используйте shell=False и список аргументов",
     },
     "LOG_SENSITIVE": {
+        # Секрет после «(» и «)» после него проверяет _is_false_positive:
+        # .*?(...).*?\) в regex давал квадратичный перебор на длинных строках
         "pattern": re.compile(
-            r'log(ger)?\.(info|debug|warning|error)\(.*?(password|secret|token|api_key).*?\)',
+            r'log(ger)?\.(info|debug|warning|error)\(',
             re.IGNORECASE,
         ),
+        "keywords": ("log",),
         "severity": "MEDIUM",
         "description": "Возможно, чувствительные данные в логах",
         "fix": "Маскируйте секреты перед логированием",
     },
 }
 
+# Порядок severity в отчёте и его эмодзи
+_SEVERITY_RANK = {"CRITICAL": 0, "HIGH": 1, "MEDIUM": 2, "LOW": 3}
+_SEVERITY_EMOJI = {"CRITICAL": "🔴", "HIGH": "🟠", "MEDIUM": "🟡", "LOW": "🟢"}
+
+# Ранг считаем один раз — при сканировании он копируется в каждую проблему
+for _vuln in VULNERABILITY_PATTERNS.values():
+    _vuln["sev_rank"] = _SEVERITY_RANK[_vuln["severity"]]
+del _vuln
+
+
+# Один regex по ключевым словам всех паттернов: строки без совпадений
+# (подавляющее большинство) отсекаются одним поиском вместо семи.
+# Объединять сами паттерны в одну альтернацию медленнее — движок re
+# теряет быстрый поиск по литеральному префиксу и перебирает все ветки
+# на каждой позиции. Ключевые слова — чистые литералы без IGNORECASE:
+# ищем по тексту в нижнем регистре, и движок идёт по первому символу.
+_TRIGGER_RE = re.compile("|".join(
+    re.escape(keyword)
+    for vuln in VULNERABILITY_PATTERNS.values()
+    for keyword in vuln["keywords"]
+))
 
-def _should_skip(filepath: Path) -> bool:
+# Чувствительные слова в аргументах логирования (LOG_SENSITIVE)
+_SENSITIVE_WORDS_RE = re.compile(r"password|secret|token|api_key", re.IGNORECASE)
+
+# Символы, которые IGNORECASE в re сопоставляет с ASCII-буквами, а
+# str.lower() — нет («İ» к тому же меняет длину строки, сдвигая позиции)
+_CASE_FOLDS = (("ſ", "s"), ("ı", "i"), ("İ", "i"))
+
+# Разделители строк str.splitlines(), кроме \n (\r уже заменён на \n)
+_EXTRA_LINE_BREAKS_RE = re.compile("[\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]")
+
+
+def _should_skip(filepath: str | Path) -> bool:
     """Проверяет, нужно ли пропустить файл."""
-    for skip in SKIP_FILES:
-        if skip in str(filepath):
+    path = os.fspath(filepath)
+    if not path.endswith(".py"):
+        return True
+    return not SKIP_FILES.isdisjoint(path.split(os.sep))
+
+
+def _iter_py_files(root: str) -> Iterator[str]:
+    """Рекурсивно обходит директорию (порядок — как у Path.rglob).
+
+    os.scandir отдаёт строки путей и тип записи без лишних stat и
+    без создания Path на каждый файл.
+    """
+    subdirs = []
+    with os.scandir(root) as entries:
+        for entry in entries:
+            if entry.is_dir():
+                if not entry.is_symlink():
+                    subdirs.append(entry.path)
+            elif entry.name.endswith(".py"):
+                yield entry.path
+    for subdir in subdirs:
+        yield from _iter_py_files(subdir)
+
+
+def _is_false_positive(vuln_id: str, line: str, filepath: str | Path) -> bool:
+    """Дополнительные фильтры для ложных срабатываний."""
+    if vuln_id == "HARDCODED_SECRET":
+        # Пропускаем значения из settings
+        if "settings." in line:
+            return True
+        # Пропускаем пустые строки и значения по умолчанию
+        if '""' in line or "''" in line or '= ""' in line:
+            return True
+        # Пропускаем тестовые файлы
+        if "test" in str(filepath).lower():
             return True
-    return not filepath.suffix == ".py"
 
+    elif vuln_id == "OPEN_WITHOUT_ENCODING":
+        # encoding после последнего open(...) — кодировка указана
+        *_, last = VULNERABILITY_PATTERNS[vuln_id]["pattern"].finditer(line)
+        if "encoding" in line[last.end():]:
+            return True
+        # Пропускаем бинарные режимы
+        if '"rb"' in line or '"wb"' in line or "'rb'" in line or "'wb'" in line:
+            return True
 
-def scan_file(filepath: Path) -> list[dict]:
+    elif vuln_id == "LOG_SENSITIVE":
+        # В аргументах вызова нет секрета (или за ним нет «)»)
+        call = VULNERABILITY_PATTERNS[vuln_id]["pattern"].search(line)
+        secret = _SENSITIVE_WORDS_RE.search(line, call.end())
+        if secret is None or ")" not in line[secret.end():]:
+            return True
+        # Пропускаем если уже маскировано
+        if "mask" in line.lower() or "***" in line:
+            return True
+
+    return False
+
+
+def scan_file(filepath: str | Path) -> list[dict]:
     """Сканирует один файл на уязвимости.
 
+    Результат кэшируется на диске по хэшу содержимого: неизменённые
+    файлы при повторном аудите не сканируются.
+
     Returns:
         Список найденных проблем.
     """
-    issues = []
-
     try:
-        content = filepath.read_text(encoding="utf-8", errors="ignore")
-        lines = content.splitlines()
+        with open(filepath, "rb") as f:
+            data = f.read()
     except Exception:
-        return issues
+        return []
+
+    digest = hashlib.sha256(f"{_AUDIT_VERSION}:{filepath}:".encode())
+    digest.update(data)
+    key = digest.hexdigest()
+    cache_path = AUDIT_CACHE_DIR / f"security_audit_{key}.json"
+    try:
+        return json.loads(cache_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        pass
+
+    # Как read_text: universal newlines
+    content = data.decode("utf-8", errors="ignore")
+    content = content.replace("\r\n", "\n").replace("\r", "\n")
+    issues = _scan_content(content, filepath)
+
+    try:
+        AUDIT_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_text(json.dumps(issues, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp_path, cache_path)
+    except OSError as e:
+        logger.debug("Security audit cache write failed: %s", e)
+
+    return issues
+
+
+def _scan_content(content: str, filepath: str | Path) -> list[dict]:
+    """Ищет уязвимости в тексте файла."""
+    issues = []
+
+    # Нумерация строк — как у str.splitlines(): редкие разделители
+    # (\f, \v, \u2028, ...) приводим к \n
+    if _EXTRA_LINE_BREAKS_RE.search(content):
+        content = "\n".join(content.splitlines())
+
+    # Ищем ключевые слова сразу по всему файлу: Python-итерация только
+    # на строках с совпадениями, а не на каждой строке. Позиции в
+    # haystack совпадают с content (_CASE_FOLDS убирает «İ»)
+    haystack = content
+    for char, ascii_char in _CASE_FOLDS:
+        haystack = haystack.replace(char, ascii_char)
+    haystack = haystack.lower()
+    search = _TRIGGER_RE.search
+    pos = 0
+    line_num = 1
+    line_start = 0
+    while (m := search(haystack, pos)) is not None:
+        start = content.rfind("\n", 0, m.start()) + 1
+        end = content.find("\n", m.end())
+        if end == -1:
+            end = len(content)
+        line_num += content.count("\n", line_start, start)
+        line_start = start
+        pos = end + 1
+        line = content[start:end]
 
-    for line_num, line in enumerate(lines, 1):
         # Пропускаем комментарии
         stripped = line.strip()
         if stripped.startswith("#"):
             continue
 
+        # Полные паттерны — только те, чьи ключевые слова есть в строке
+        low_line = haystack[start:end]
         for vuln_id, vuln in VULNERABILITY_PATTERNS.items():
-            if vuln["pattern"].search(line):
-                # Дополнительные фильтры для ложных срабатываний
-                if vuln_id == "HARDCODED_SECRET":
-                    # Пропускаем значения из settings
-                    if "settings." in line:
-                        continue
-                    # Пропускаем пустые строки и значения по умолчанию
-                    if '""' in line or "''" in line or '= ""' in line:
-                        continue
-                    # Пропускаем тестовые файлы
-                    if "test" in str(filepath).lower():
-                        continue
-
-                if vuln_id == "OPEN_WITHOUT_ENCODING":
-                    # Пропускаем бинарные режимы
-                    if '"rb"' in line or '"wb"' in line or "'rb'" in line or "'wb'" in line:
-                        continue
-
-                if vuln_id == "LOG_SENSITIVE":
-                    # Пропускаем если уже маскировано
-                    if "mask" in line.lower() or "***" in line:
-                        continue
-
-                issues.append({
-                    "file": str(filepath),
-                    "line": line_num,
-                    "vuln_id": vuln_id,
-                    "severity": vuln["severity"],
-                    "description": vuln["description"],
-                    "fix": vuln["fix"],
-                    "code": stripped[:120],
-                })
+            if not any(keyword in low_line for keyword in vuln["keywords"]):
+                continue
+            if not vuln["pattern"].search(line):
+                continue
+            if _is_false_positive(vuln_id, line, filepath):
+                continue
+
+            issues.append({
+                "file": str(filepath),
+                "line": line_num,
+                "vuln_id": vuln_id,
+                "severity": vuln["severity"],
+                "sev_rank": vuln["sev_rank"],
+                "description": vuln["description"],
+                "fix": vuln["fix"],
+                "code": stripped[:120],
+            })
 
     return issues
 
 
+# С какого числа файлов сканирование раскладывается по процессам
+# (на меньших проектах запуск пула дороже самого сканирования)
+_PARALLEL_SCAN_THRESHOLD = 500
+
+
 def run_security_audit() -> dict:
     """Запускает полный аудит безопасности кодовой базы.
 
@@ -168,26 +330,31 @@ def run_security_audit() -> dict:
             "summary": str
         }
     """
-    all_issues = []
-    total_files = 0
-
-    for audit_dir in AUDIT_DIRS:
-        if not audit_dir.exists():
-            continue
-
-        for filepath in audit_dir.rglob("*.py"):
-            if _should_skip(filepath):
-                continue
+    filepaths = [
+        filepath
+        for audit_dir in AUDIT_DIRS
+        if audit_dir.exists()
+        for filepath in _iter_py_files(os.fspath(audit_dir))
+        if not _should_skip(filepath)
+    ]
+    total_files = len(filepaths)
 
-            total_files += 1
-            issues = scan_file(filepath)
-            all_issues.extend(issues)
+    all_issues = []
+    workers = os.cpu_count() or 1
+    if total_files > _PARALLEL_SCAN_THRESHOLD and workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for issues in pool.map(scan_file, filepaths, chunksize=16):
+                all_issues.extend(issues)
+    else:
+        for filepath in filepaths:
+            all_issues.extend(scan_file(filepath))
 
-    # Подсчёт по severity
-    critical = sum(1 for i in all_issues if i["severity"] == "CRITICAL")
-    high = sum(1 for i in all_issues if i["severity"] == "HIGH")
-    medium = sum(1 for i in all_issues if i["severity"] == "MEDIUM")
-    low = sum(1 for i in all_issues if i["severity"] == "LOW")
+    # Подсчёт по severity — один проход
+    severities = Counter(map(itemgetter("severity"), all_issues))
+    critical = severities["CRITICAL"]
+    high = severities["HIGH"]
+    medium = severities["MEDIUM"]
+    low = severities["LOW"]
 
     # Формируем summary
     if critical > 0:
@@ -231,29 +398,28 @@ def format_audit_report(audit: dict) -> str:
     Returns:
         HTML-форматированный отчёт.
     """
+    # Строки без хвостовых \n: пустая строка в списке — явный отступ
     lines = [
-        f"🔒 <b>Аудит безопасности</b>\n",
-        f"Статус: {audit['grade']}\n",
-        f"📂 Файлов: {audit['total_files']} | ⚠️ Проблем: {audit['total_issues']}\n",
+        "🔒 <b>Аудит безопасности</b>",
+        "",
+        f"Статус: {audit['grade']}",
+        f"📂 Файлов: {audit['total_files']} | ⚠️ Проблем: {audit['total_issues']}",
+        "",
     ]
 
     if audit["issues"]:
-        lines.append("\n<b>Найденные проблемы:</b>\n")
+        lines.append("<b>Найденные проблемы:</b>")
         # Показываем до 10 самых критичных
-        sorted_issues = sorted(
-            audit["issues"],
-            key=lambda x: {"CRITICAL": 0, "HIGH": 1, "MEDIUM": 2, "LOW": 3}[x["severity"]],
+        sorted_issues = sorted(audit["issues"], key=itemgetter("sev_rank"))
+        lines.extend(
+            f"{_SEVERITY_EMOJI[issue['severity']]} <code>{issue['file']}:{issue['line']}</code>\n"
+            f"   {issue['description']}"
+            for issue in sorted_issues[:10]
         )
-        for issue in sorted_issues[:10]:
-            emoji = {"CRITICAL": "🔴", "HIGH": "🟠", "MEDIUM": "🟡", "LOW": "🟢"}[issue["severity"]]
-            lines.append(
-                f"{emoji} <code>{issue['file']}:{issue['line']}</code>\n"
-                f"   {issue['description']}\n"
-            )
 
         if len(audit["issues"]) > 10:
             lines.append(f"\n... и ещё {len(audit['issues']) - 10} проблем")
     else:
-        lines.append("\n✅ Проблем не обнаружено!")
+        lines.append("✅ Проблем не обнаружено!")
 
     return "\n".join(lines)
@@ -15,6 +15,8 @@ from typing import Optional
 logger = logging.getLogger(__name__)
 
 _sentry_enabled = False
+# Модуль sentry_sdk после успешной инициализации (None — Sentry не подключен)
+_sentry_sdk = None
 
 
 def init_sentry() -> bool:
@@ -23,7 +25,7 @@ def init_sentry() -> bool:
     Returns:
         True если Sentry инициализирован.
     """
-    global _sentry_enabled
+    global _sentry_enabled, _sentry_sdk
 
     try:
         from src.config import settings
@@ -50,6 +52,7 @@ def init_sentry() -> bool:
             before_send=_before_send,
         )
 
+        _sentry_sdk = sentry_sdk
         _sentry_enabled = True
         logger.info("Sentry: инициализирован (DSN: %s...)", dsn[:30])
         return True
@@ -80,42 +83,42 @@ def capture_exception(exc: Exception, **extra) -> None:
         exc: Исключение для трекинга.
         **extra: Дополнительный контекст (user_id, action, etc.)
     """
-    if not _sentry_enabled:
+    sdk = _sentry_sdk
+    if sdk is None:
         return
 
     try:
-        import sentry_sdk
-        with sentry_sdk.push_scope() as scope:
+        with sdk.push_scope() as scope:
             for key, value in extra.items():
                 scope.set_extra(key, value)
-            sentry_sdk.capture_exception(exc)
+            sdk.capture_exception(exc)
     except Exception:
         pass  # Sentry не должен ломать бота
 
 
 def capture_message(message: str, level: str = "info", **extra) -> None:
     """Отправляет сообщение в Sentry."""
-    if not _sentry_enabled:
+    sdk = _sentry_sdk
+    if sdk is None:
         return
 
     try:
-        import sentry_sdk
-        with sentry_sdk.push_scope() as scope:
+        with sdk.push_scope() as scope:
             for key, value in extra.items():
                 scope.set_extra(key, value)
-            sentry_sdk.capture_message(message, level=level)
+            sdk.capture_message(message, level=level)
     except Exception:
         pass
 
 
 def set_user_context(user_id: int, username: str = "") -> None:
     """Устанавливает контекст пользователя для Sentry."""
-    if not _sentry_enabled:
+    sdk = _sentry_sdk
+    if sdk is None:
         return
 
     try:
-        import sentry_sdk
-        sentry_sdk.set_user({"id": str(user_id), "username": username})
+        sdk.set_user({"id": str(user_id), "username": username})
     except Exception:
         pass
 
@@ -12,8 +12,11 @@
 """
 
 import asyncio
+import functools
 import logging
 import time
+from heapq import nlargest
+from operator import itemgetter
 
 logger = logging.getLogger(__name__)
 
@@ -23,6 +26,8 @@ _DEFAULT_TTL = 6 * 3600  # 6 часов
 _SPHERE_BOOST = 1.5
 # Штраф за гайд, который скачали >30 дней назад (давность)
 _RECENCY_BOOST = 1.2
+# Размер LRU-кеша ранжирования по (guide_id, сфера, исключения)
+_RANK_CACHE_SIZE = 4096
 
 
 class SmartRecommender:
@@ -48,6 +53,17 @@ class SmartRecommender:
         self._weighted_matrix: dict[str, list[tuple[str, float]]] = {}
         # Аффинность гайд → сфера: {guide_id: {sphere: count}}
         self._sphere_affinity: dict[str, dict[str, int]] = {}
+        # Кандидаты для выдачи (SoA): guide_id → ((other_id, ...), (score, ...)).
+        # Выбор «взвешенная или базовая матрица» сделан один раз при обновлении.
+        self._candidates: dict[str, tuple[tuple[str, ...], tuple[float, ...]]] = {}
+        # Доля пользователей сферы среди скачавших гайд: (guide_id, sphere) → ratio
+        self._sphere_ratio: dict[tuple[str, str], float] = {}
+        # Кеш на экземпляр: между обновлениями матрицы ранжирование детерминировано
+        self._rank = functools.lru_cache(maxsize=_RANK_CACHE_SIZE)(self._rank_uncached)
+        # Предрасчитанный лучший кандидат без исключений: guide_id → other_id
+        self._top1: dict[str, str] = {}
+        # То же с бустом за сферу: (guide_id, sphere) → other_id; сфера "" — без буста
+        self._top1_by_sphere: dict[tuple[str, str], str] = {}
 
         self._last_refresh: float = 0.0
         self._ttl = ttl_seconds
@@ -86,6 +102,7 @@ class SmartRecommender:
                 self._matrix = basic
                 self._weighted_matrix = weighted
                 self._sphere_affinity = sphere
+                self._rebuild_index()
                 self._last_refresh = time.monotonic()
 
                 total_pairs = sum(len(v) for v in self._matrix.values()) // 2
@@ -97,6 +114,49 @@ class SmartRecommender:
             except Exception as e:
                 logger.error("SmartRecommender refresh failed: %s", e)
 
+    def _rebuild_index(self) -> None:
+        """Раскладывает пары в кортежи id/скоров и предрасчитывает топ-1.
+
+        Матрицы неизменны до следующего обновления, поэтому лучший кандидат
+        для каждого гайда (и для каждой известной сферы) считается один раз.
+        """
+        candidates: dict[str, tuple[tuple[str, ...], tuple[float, ...]]] = {}
+        for guide_id in self._matrix.keys() | self._weighted_matrix.keys():
+            pairs = self._weighted_matrix.get(guide_id) or self._matrix.get(guide_id)
+            if pairs:
+                # Порядок по убыванию скора фиксируем здесь, а не на каждом запросе
+                ids, scores = zip(*sorted(pairs, key=itemgetter(1), reverse=True))
+                candidates[guide_id] = (ids, tuple(map(float, scores)))
+        self._candidates = candidates
+
+        sphere_ratio: dict[tuple[str, str], float] = {}
+        for gid, affinity in self._sphere_affinity.items():
+            total_sphere_users = sum(affinity.values())
+            if total_sphere_users > 0:
+                for sphere, same_sphere_users in affinity.items():
+                    # Пустая сфера — «не знаем», буст не даём
+                    if sphere and same_sphere_users > 0:
+                        sphere_ratio[(gid, sphere)] = same_sphere_users / total_sphere_users
+        self._sphere_ratio = sphere_ratio
+        self._rank.cache_clear()
+
+        spheres = {""}
+        for affinity in self._sphere_affinity.values():
+            spheres.update(affinity)
+        no_exclude: frozenset[str] = frozenset()
+        top1: dict[str, str] = {}
+        top1_by_sphere: dict[tuple[str, str], str] = {}
+        for guide_id, (ids, _scores) in candidates.items():
+            best = next((other_id for other_id in ids if other_id != guide_id), None)
+            if best is not None:
+                top1[guide_id] = best
+            for sphere in spheres:
+                ranked = self._rank_uncached(guide_id, sphere, no_exclude)
+                if ranked:
+                    top1_by_sphere[(guide_id, sphere)] = ranked[0]
+        self._top1 = top1
+        self._top1_by_sphere = top1_by_sphere
+
     async def get_recommendation(
         self,
         guide_id: str,
@@ -115,20 +175,21 @@ class SmartRecommender:
         await self._ensure_fresh()
         self._stats["requests"] += 1
 
-        # Предпочитаем взвешенную матрицу
-        pairs = self._weighted_matrix.get(guide_id) or self._matrix.get(guide_id, [])
-        if not pairs:
-            self._stats["misses"] += 1
-            return None
-
         skip = exclude or set()
-        for other_id, _score in pairs:
-            if other_id not in skip and other_id != guide_id:
-                self._stats["hits"] += 1
-                return other_id
-
-        self._stats["misses"] += 1
-        return None
+        # Быстрый путь: предрасчитанный лучший кандидат не исключён
+        top = self._top1.get(guide_id)
+        if top is not None and top not in skip:
+            self._stats["hits"] += 1
+            return top
+
+        # Кандидаты уже из взвешенной матрицы (или базовой, если взвешенной нет)
+        ids, _scores = self._candidates.get(guide_id, ((), ()))
+        best = next(
+            (other_id for other_id in ids if other_id not in skip and other_id != guide_id),
+            None,
+        )
+        self._stats["hits" if best is not None else "misses"] += 1
+        return best
 
     async def get_personalized_recommendation(
         self,
@@ -168,40 +229,43 @@ class SmartRecommender:
             except Exception:
                 pass
 
-        pairs = self._weighted_matrix.get(guide_id) or self._matrix.get(guide_id, [])
-        if not pairs:
+        # Исключение других кандидатов не меняет лучшего, если он сам не исключён
+        skip = exclude or set()
+        top = self._top1_by_sphere.get((guide_id, sphere))
+        if top is not None and top not in skip:
+            self._stats["hits"] += 1
+            return top
+
+        ranked = self._rank(guide_id, sphere, frozenset(skip))
+        if not ranked:
             self._stats["misses"] += 1
             return None
 
-        skip = exclude or set()
+        self._stats["hits"] += 1
+        return ranked[0]
+
+    def _rank_uncached(
+        self, guide_id: str, sphere: str, exclude: frozenset[str],
+    ) -> tuple[str, ...]:
+        """Кандидаты для гайда по убыванию скора с бустом за сферу."""
+        ids, scores = self._candidates.get(guide_id, ((), ()))
+        sphere_ratio_get = self._sphere_ratio.get
 
-        # Скоринг кандидатов
         scored: list[tuple[str, float]] = []
-        for other_id, base_score in pairs:
-            if other_id in skip or other_id == guide_id:
+        for other_id, score in zip(ids, scores):
+            if other_id in exclude or other_id == guide_id:
                 continue
 
-            score = float(base_score)
-
-            # Буст за совпадение сферы
-            if sphere and self._sphere_affinity.get(other_id):
-                affinity = self._sphere_affinity[other_id]
-                total_sphere_users = sum(affinity.values())
-                same_sphere_users = affinity.get(sphere, 0)
-
-                if total_sphere_users > 0 and same_sphere_users > 0:
-                    sphere_ratio = same_sphere_users / total_sphere_users
-                    score *= (1 + sphere_ratio * _SPHERE_BOOST)
+            # Буст за совпадение сферы (доли посчитаны при обновлении)
+            sphere_ratio = sphere_ratio_get((other_id, sphere))
+            if sphere_ratio is not None:
+                score *= (1 + sphere_ratio * _SPHERE_BOOST)
 
             scored.append((other_id, score))
 
-        if not scored:
-            self._stats["misses"] += 1
-            return None
-
-        scored.sort(key=lambda x: -x[1])
-        self._stats["hits"] += 1
-        return scored[0][0]
+        # reverse=True сохраняет устойчивость: из равных первым идёт более ранний
+        scored.sort(key=itemgetter(1), reverse=True)
+        return tuple(other_id for other_id, _score in scored)
 
     async def get_top_pairs(self, limit: int = 20) -> list[tuple[str, str, int]]:
         """Топ пар «часто скачивают вместе» для админки.
@@ -211,18 +275,14 @@ class SmartRecommender:
         """
         await self._ensure_fresh()
 
-        seen: set[tuple[str, str]] = set()
-        result: list[tuple[str, str, int]] = []
-
-        for guide_a, pairs in self._matrix.items():
-            for guide_b, shared in pairs:
-                key = (min(guide_a, guide_b), max(guide_a, guide_b))
-                if key not in seen:
-                    seen.add(key)
-                    result.append((guide_a, guide_b, shared))
-
-        result.sort(key=lambda x: -x[2])
-        return result[:limit]
+        # Матрица симметрична: каждую пару берём один раз — при guide_a < guide_b
+        pairs_iter = (
+            (guide_a, guide_b, shared)
+            for guide_a, pairs in self._matrix.items()
+            for guide_b, shared in pairs
+            if guide_a < guide_b
+        )
+        return nlargest(limit, pairs_iter, key=itemgetter(2))
 
     async def get_top_weighted_pairs(self, limit: int = 20) -> list[tuple[str, str, float]]:
         """Топ пар по взвешенному скору (свежие скачивания весят больше).
@@ -232,18 +292,14 @@ class SmartRecommender:
         """
         await self._ensure_fresh()
 
-        seen: set[tuple[str, str]] = set()
-        result: list[tuple[str, str, float]] = []
-
-        for guide_a, pairs in self._weighted_matrix.items():
-            for guide_b, score in pairs:
-                key = (min(guide_a, guide_b), max(guide_a, guide_b))
-                if key not in seen:
-                    seen.add(key)
-                    result.append((guide_a, guide_b, score))
-
-        result.sort(key=lambda x: -x[2])
-        return result[:limit]
+        # Матрица симметрична: каждую пару берём один раз — при guide_a < guide_b
+        pairs_iter = (
+            (guide_a, guide_b, score)
+            for guide_a, pairs in self._weighted_matrix.items()
+            for guide_b, score in pairs
+            if guide_a < guide_b
+        )
+        return nlargest(limit, pairs_iter, key=itemgetter(2))
 
     async def get_sphere_report(self) -> dict[str, list[tuple[str, int]]]:
         """Отчёт: какие сферы скачивают какие гайды.
@@ -277,6 +333,11 @@ class SmartRecommender:
         self._matrix.clear()
         self._weighted_matrix.clear()
         self._sphere_affinity.clear()
+        self._candidates.clear()
+        self._sphere_ratio.clear()
+        self._rank.cache_clear()
+        self._top1.clear()
+        self._top1_by_sphere.clear()
 
     @property
     def is_loaded(self) -> bool:
@@ -9,6 +9,7 @@
     from src.bot.utils.stories_publisher import publish_story, auto_stories_check
 """
 
+import asyncio
 import logging
 from datetime import datetime, timezone
 
@@ -19,6 +20,9 @@ from src.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Сколько статей обрабатываем одновременно (генерация обложки + пост в канал)
+_STORIES_CONCURRENCY = 4
+
 
 async def publish_story(
     bot: Bot,
@@ -96,44 +100,57 @@ async def auto_stories_check(
     if not google:
         return stats
 
+    async def _process_one(article: dict, sem: asyncio.Semaphore) -> bool:
+        title = article.get("title", "")
+        summary = article.get("description", article.get("content", ""))[:200]
+        url = article.get("telegraph_url", article.get("url", ""))
+
+        async with sem:
+            # Генерируем обложку если нет
+            image_url = article.get("cover_url", "")
+            if not image_url:
+                try:
+                    from src.bot.utils.ai_client import generate_post_image
+                    image_url = await generate_post_image(title) or ""
+                except Exception:
+                    pass
+
+            success = await publish_story(
+                bot=bot,
+                title=title,
+                summary=summary,
+                url=url,
+                image_url=image_url,
+            )
+
+        if success:
+            # Помечаем как отправленное (если Google Sheets поддерживает)
+            logger.info("Auto-story published: '%s'", title[:40])
+        return success
+
     try:
         articles = await google.get_articles_list()
         stats["checked"] = len(articles)
 
-        for article in articles:
-            status = str(article.get("status", "")).lower()
-            story_sent = str(article.get("story_sent", "")).lower()
-
-            # Только опубликованные статьи, для которых ещё не отправляли Story
-            if status == "published" and story_sent not in ("true", "yes", "1"):
-                title = article.get("title", "")
-                summary = article.get("description", article.get("content", ""))[:200]
-                url = article.get("telegraph_url", article.get("url", ""))
-
-                if not title:
-                    continue
-
-                # Генерируем обложку если нет
-                image_url = article.get("cover_url", "")
-                if not image_url:
-                    try:
-                        from src.bot.utils.ai_client import generate_post_image
-                        image_url = await generate_post_image(title) or ""
-                    except Exception:
-                        pass
-
-                success = await publish_story(
-                    bot=bot,
-                    title=title,
-                    summary=summary,
-                    url=url,
-                    image_url=image_url,
-                )
-
-                if success:
-                    stats["published"] += 1
-                    # Помечаем как отправленное (если Google Sheets поддерживает)
-                    logger.info("Auto-story published: '%s'", title[:40])
+        # Только опубликованные статьи с заголовком, для которых ещё не отправляли Story
+        pending = [
+            article for article in articles
+            if str(article.get("status", "")).lower() == "published"
+            and str(article.get("story_sent", "")).lower() not in ("true", "yes", "1")
+            and article.get("title", "")
+        ]
+
+        # Обложки и посты — I/O: обрабатываем несколько статей параллельно
+        sem = asyncio.Semaphore(_STORIES_CONCURRENCY)
+        results = await asyncio.gather(
+            *(_process_one(article, sem) for article in pending),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.error("Auto story error: %s", result)
+            elif result:
+                stats["published"] += 1
 
     except Exception as e:
         logger.error("Auto stories check error: %s", e)
@@ -1,6 +1,7 @@
 """Утилита проверки подписки пользователя на канал."""
 
 import logging
+import time
 
 from aiogram import Bot
 from aiogram.enums import ChatMemberStatus
@@ -9,10 +10,25 @@ from src.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Кеш подтверждённых подписок: user_id → момент истечения (time.monotonic).
+# Отрицательный результат не кешируем: после «Подписаться» пользователь
+# сразу жмёт «Проверить», и ответ должен прийти из Telegram.
+_SUB_TTL = 90.0
+_SUB_CACHE_MAX = 10_000
+_sub_cache: dict[int, float] = {}
+
+
+def invalidate_subscription(user_id: int) -> None:
+    """Сбрасывает закешированную подписку (например, после выхода из канала)."""
+    _sub_cache.pop(user_id, None)
+
 
 async def check_subscription(user_id: int, bot: Bot) -> bool:
     """Проверяет, подписан ли пользователь на канал.
 
+    Подтверждённая подписка кешируется на ``_SUB_TTL`` секунд, чтобы
+    не дёргать ``get_chat_member`` на каждое нажатие кнопки.
+
     Args:
         user_id: Telegram ID пользователя.
         bot: Экземпляр бота.
@@ -20,6 +36,11 @@ async def check_subscription(user_id: int, bot: Bot) -> bool:
     Returns:
         True если пользователь является участником канала.
     """
+    now = time.monotonic()
+    expires_at = _sub_cache.get(user_id)
+    if expires_at is not None and expires_at > now:
+        return True
+
     try:
         member = await bot.get_chat_member(
             chat_id=settings.CHANNEL_USERNAME,
@@ -36,6 +57,14 @@ async def check_subscription(user_id: int, bot: Bot) -> bool:
             is_subscribed,
             member.status,
         )
+        if is_subscribed:
+            if len(_sub_cache) >= _SUB_CACHE_MAX:
+                # Выбрасываем истёкшие записи, чтобы кеш не рос бесконечно
+                for uid in [uid for uid, exp in _sub_cache.items() if exp <= now]:
+                    del _sub_cache[uid]
+            _sub_cache[user_id] = now + _SUB_TTL
+        else:
+            _sub_cache.pop(user_id, None)
         return is_subscribed
     except Exception as e:
         logger.error("Ошибка проверки подписки user_id=%s: %s", user_id, e)
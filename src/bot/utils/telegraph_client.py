@@ -1,5 +1,7 @@
 """Простой клиент Telegraph API — публикация статей для Instant View."""
 
+import functools
+import json
 import logging
 from typing import Optional
 
@@ -11,21 +13,51 @@ logger = logging.getLogger(__name__)
 
 TELEGRAPH_API = "https://api.telegra.ph"
 
+# Статьи на русском: без ensure_ascii кириллица уходит UTF-8 (2 байта),
+# а не \uXXXX-эскейпами (6 байт) — тело createPage в ~2–3 раза меньше
+_json_dumps = functools.partial(json.dumps, ensure_ascii=False)
+
+# Общая HTTP-сессия для Telegraph API (keep-alive, без TLS-рукопожатия на каждую статью)
+_session: aiohttp.ClientSession | None = None
+
+
+async def _get_session() -> aiohttp.ClientSession:
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(
+                limit=32,
+                keepalive_timeout=60,
+                ttl_dns_cache=300,
+            ),
+            timeout=aiohttp.ClientTimeout(total=30),
+            json_serialize=_json_dumps,
+        )
+    return _session
+
+
+async def close_telegraph_session() -> None:
+    """Закрыть HTTP-сессию Telegraph (при остановке бота)."""
+    global _session
+    if _session and not _session.closed:
+        await _session.close()
+    _session = None
+
 
 async def create_account(short_name: str = "SOLIS Partners") -> str | None:
     """Создаёт аккаунт Telegraph и возвращает access_token."""
-    async with aiohttp.ClientSession() as session:
-        resp = await session.post(
-            f"{TELEGRAPH_API}/createAccount",
-            json={"short_name": short_name, "author_name": short_name},
-        )
+    session = await _get_session()
+    async with session.post(
+        f"{TELEGRAPH_API}/createAccount",
+        json={"short_name": short_name, "author_name": short_name},
+    ) as resp:
         data = await resp.json()
-        if data.get("ok"):
-            token = data["result"]["access_token"]
-            logger.info("Telegraph account created, token=%s...", token[:10])
-            return token
-        logger.error("Telegraph createAccount failed: %s", data)
-        return None
+    if data.get("ok"):
+        token = data["result"]["access_token"]
+        logger.info("Telegraph account created, token=%s...", token[:10])
+        return token
+    logger.error("Telegraph createAccount failed: %s", data)
+    return None
 
 
 async def publish_article(
@@ -54,27 +86,27 @@ async def publish_article(
     if guide_cta:
         content.extend(_build_guide_cta_nodes(guide_cta))
 
-    async with aiohttp.ClientSession() as session:
-        resp = await session.post(
-            f"{TELEGRAPH_API}/createPage",
-            json={
-                "access_token": token,
-                "title": title,
-                "author_name": author_name,
-                "author_url": author_url,
-                "content": content,
-                "return_content": False,
-            },
-        )
+    session = await _get_session()
+    async with session.post(
+        f"{TELEGRAPH_API}/createPage",
+        json={
+            "access_token": token,
+            "title": title,
+            "author_name": author_name,
+            "author_url": author_url,
+            "content": content,
+            "return_content": False,
+        },
+    ) as resp:
         data = await resp.json()
 
-        if data.get("ok"):
-            url = data["result"]["url"]
-            logger.info("Статья опубликована: %s", url)
-            return url
+    if data.get("ok"):
+        url = data["result"]["url"]
+        logger.info("Статья опубликована: %s", url)
+        return url
 
-        logger.error("Telegraph createPage failed: %s", data)
-        return None
+    logger.error("Telegraph createPage failed: %s", data)
+    return None
 
 
 def _html_to_telegraph_nodes(html: str) -> list:
@@ -83,14 +115,12 @@ def _html_to_telegraph_nodes(html: str) -> list:
     Telegraph принимает массив Node-объектов. Для простоты разбиваем текст
     по абзацам и оборачиваем в <p> теги.
     """
-    paragraphs = [p.strip() for p in html.split("\n") if p.strip()]
     nodes = []
-    for p in paragraphs:
-        if p.startswith("<"):
-            nodes.append({"tag": "p", "children": [p]})
-        else:
-            nodes.append({"tag": "p", "children": [p]})
-    return nodes if nodes else [{"tag": "p", "children": ["(пустая статья)"]}]
+    for line in html.split("\n"):
+        paragraph = line.strip()
+        if paragraph:
+            nodes.append({"tag": "p", "children": [paragraph]})
+    return nodes or [{"tag": "p", "children": ["(пустая статья)"]}]
 
 
 def _build_guide_cta_nodes(cta: dict) -> list:
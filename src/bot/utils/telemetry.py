@@ -10,16 +10,41 @@
 
 import asyncio
 import logging
+import sys
 import time
-from collections import defaultdict
+from collections import Counter, deque
+from itertools import islice
 from datetime import datetime, timezone
-from typing import Any, Optional
+from typing import Any, NamedTuple, Optional
 
 logger = logging.getLogger(__name__)
 
-# In-memory event storage (+ periodic flush to Google Sheets)
-_events: list[dict] = []
-_funnel_counters: dict[str, int] = defaultdict(int)
+
+class _Event(NamedTuple):
+    """Событие телеметрии (кортеж компактнее dict при десятках тысяч событий)."""
+
+    ts: float           # epoch seconds; в ISO-8601 форматируем только при выдаче
+    user_id: int
+    event: str
+    metadata: dict
+
+
+# In-memory event storage (+ periodic flush to Google Sheets).
+# deque: O(1) append справа и popleft при сбросе; maxlen — защита памяти,
+# если Google Sheets долго недоступен (вытесняются самые старые события).
+_EVENTS_MAX = 50_000
+_FLUSH_BATCH_SIZE = 500
+_events: deque[_Event] = deque(maxlen=_EVENTS_MAX)
+
+# Фоновый сброс в Sheets: будим при накоплении _FLUSH_HIGH_WATERMARK событий,
+# иначе сбрасываем раз в _FLUSH_DEBOUNCE секунд; при ошибках — экспоненциальная пауза.
+_FLUSH_HIGH_WATERMARK = 100
+_FLUSH_DEBOUNCE = 10.0
+_FLUSH_BACKOFF_MAX = 300.0
+_flush_wakeup: asyncio.Event | None = None
+_flush_stop: asyncio.Event | None = None
+_flusher_task: asyncio.Task | None = None
+_funnel_counters: Counter[str] = Counter()
 
 # Стандартные этапы воронки (в порядке прохождения)
 FUNNEL_STAGES = [
@@ -40,6 +65,9 @@ FUNNEL_STAGES = [
     "payment_completed",    # Оплатил
 ]
 
+# Соседние пары этапов для расчёта конверсии (этапы статичны — считаем один раз)
+_STAGE_PAIRS = tuple(zip(FUNNEL_STAGES, FUNNEL_STAGES[1:]))
+
 # Промежуточные события
 EXTRA_EVENTS = [
     "button_clicked",
@@ -62,13 +90,12 @@ def track_event_sync(
     metadata: dict | None = None,
 ) -> None:
     """Синхронная запись события (для использования без await)."""
-    _events.append({
-        "timestamp": datetime.now(timezone.utc).isoformat(),
-        "user_id": user_id,
-        "event": event_name,
-        "metadata": metadata or {},
-    })
+    # Имена из f-строк/JSON не интернированы — сводим к одному объекту для dict-lookup
+    event_name = sys.intern(event_name)
+    _events.append(_Event(time.time(), user_id, event_name, metadata or {}))
     _funnel_counters[event_name] += 1
+    if _flush_wakeup is not None and len(_events) >= _FLUSH_HIGH_WATERMARK:
+        _flush_wakeup.set()
 
 
 async def track_event(
@@ -99,11 +126,10 @@ def get_funnel_drop_rates() -> list[dict]:
         [{"from": "guide_selected", "to": "consent_given", "rate": 85.5, "drop": 14.5}, ...]
     """
     result = []
-    for i in range(len(FUNNEL_STAGES) - 1):
-        stage_from = FUNNEL_STAGES[i]
-        stage_to = FUNNEL_STAGES[i + 1]
-        count_from = _funnel_counters.get(stage_from, 0)
-        count_to = _funnel_counters.get(stage_to, 0)
+    for stage_from, stage_to in _STAGE_PAIRS:
+        # Counter отдаёт 0 для отсутствующего этапа без вставки ключа
+        count_from = _funnel_counters[stage_from]
+        count_to = _funnel_counters[stage_to]
 
         if count_from > 0:
             rate = round(count_to / count_from * 100, 1)
@@ -121,9 +147,22 @@ def get_funnel_drop_rates() -> list[dict]:
     return result
 
 
+def _format_ts(ts: float) -> str:
+    """Epoch seconds → ISO-8601 (UTC), как раньше хранилось в событии."""
+    return datetime.fromtimestamp(ts, timezone.utc).isoformat()
+
+
 def get_recent_events(limit: int = 100) -> list[dict]:
-    """Возвращает последние N событий."""
-    return _events[-limit:]
+    """Возвращает последние N событий (с полем ``timestamp`` в ISO-8601)."""
+    return [
+        {
+            "timestamp": _format_ts(ev.ts),
+            "user_id": ev.user_id,
+            "event": ev.event,
+            "metadata": ev.metadata,
+        }
+        for ev in reversed(list(islice(reversed(_events), limit)))
+    ]
 
 
 async def flush_to_sheets(google) -> int:
@@ -135,37 +174,116 @@ async def flush_to_sheets(google) -> int:
     if not _events:
         return 0
 
-    # Берём пакет событий
-    batch = _events[:500]
+    # Забираем пакет событий из головы очереди ДО первого await: события,
+    # добавленные во время записи в Sheets, остаются в _events и не теряются.
+    # Между await корутины не вытесняют друг друга, поэтому блокировка не нужна.
+    batch = [_events.popleft() for _ in range(min(_FLUSH_BATCH_SIZE, len(_events)))]
+    writing = False
 
     try:
-        rows = []
-        for ev in batch:
-            rows.append([
-                ev["timestamp"],
-                str(ev["user_id"]),
-                ev["event"],
-                str(ev.get("metadata", {})),
-            ])
+        rows = [
+            [_format_ts(ts), str(user_id), event, str(metadata)]
+            for ts, user_id, event, metadata in batch
+        ]
 
         ws = await asyncio.to_thread(
             google._open_worksheet, "Log_Events"
         )
         if ws:
+            writing = True
             await asyncio.to_thread(ws.append_rows, rows)
-            # Удаляем записанные
-            del _events[:len(batch)]
             logger.info("Telemetry: flushed %d events to Google Sheets", len(batch))
             return len(batch)
         else:
             logger.warning("Telemetry: лист 'Log_Events' не найден")
+            _requeue(batch)
             return 0
 
+    except asyncio.CancelledError:
+        # Отмена не останавливает поток с append_rows — начатый пакет всё равно
+        # будет записан, возвращаем в очередь только ещё не отправленный
+        if not writing:
+            _requeue(batch)
+        raise
     except Exception as e:
         logger.error("Telemetry flush failed: %s", e)
+        _requeue(batch)
         return 0
 
 
+def _requeue(batch: list[_Event]) -> None:
+    """Возвращает неотправленный пакет в голову очереди в исходном порядке.
+
+    extendleft в заполненный deque вытеснил бы справа самые новые события —
+    поэтому при нехватке места отбрасываем самые старые события пакета.
+    """
+    free = _events.maxlen - len(_events)
+    if len(batch) > free:
+        logger.warning("Telemetry: буфер заполнен, отброшено %d старых событий", len(batch) - free)
+        batch = batch[len(batch) - free:]
+    _events.extendleft(reversed(batch))
+
+
+async def _run_flusher(google, stop: asyncio.Event) -> None:
+    """Фоновый сброс: ждёт порога или таймаута и выгружает все накопленные события.
+
+    После ``stop`` дописывает начатый пакет и завершается — остаток
+    выгружает ``stop_telemetry_flusher``.
+    """
+    wakeup = _flush_wakeup
+    delay = 0.0
+    while not stop.is_set():
+        try:
+            if delay:
+                # После ошибки не реагируем на порог — иначе долбим недоступный Sheets
+                await asyncio.wait_for(stop.wait(), timeout=delay)
+            else:
+                await asyncio.wait_for(wakeup.wait(), timeout=_FLUSH_DEBOUNCE)
+        except asyncio.TimeoutError:
+            pass
+        wakeup.clear()
+        if stop.is_set():
+            return
+
+        ok = True
+        while _events and not stop.is_set():
+            if not await flush_to_sheets(google):
+                ok = False
+                break
+        delay = 0.0 if ok else min(max(delay * 2, _FLUSH_DEBOUNCE), _FLUSH_BACKOFF_MAX)
+
+
+def start_telemetry_flusher(google) -> None:
+    """Запускает фоновый сброс событий в Google Sheets (при старте бота)."""
+    global _flush_wakeup, _flush_stop, _flusher_task
+    if _flusher_task is not None and not _flusher_task.done():
+        return
+    _flush_wakeup = asyncio.Event()
+    _flush_stop = asyncio.Event()
+    _flusher_task = asyncio.get_running_loop().create_task(_run_flusher(google, _flush_stop))
+
+
+async def stop_telemetry_flusher(google) -> None:
+    """Останавливает фоновый сброс и выгружает остаток (при остановке бота).
+
+    Flusher не отменяется: отмена не прерывает запись в Sheets, идущую в потоке,
+    и пакет ушёл бы повторно при финальной выгрузке — ждём, пока он допишет.
+    """
+    global _flush_wakeup, _flush_stop, _flusher_task
+    if _flusher_task is not None:
+        if not _flusher_task.done():
+            _flush_stop.set()
+            _flush_wakeup.set()
+            await _flusher_task
+        _flusher_task = None
+    _flush_wakeup = None
+    _flush_stop = None
+
+    while _events:
+        if not await flush_to_sheets(google):
+            break
+
+
 async def analyze_funnel(ai_client=None) -> str:
     """AI-анализ воронки: где теряем людей.
 
@@ -226,7 +344,9 @@ async def analyze_funnel(ai_client=None) -> str:
 
 
 async def scheduled_telemetry_flush(google, cache) -> None:
-    """Плановый сброс телеметрии (каждые 6 часов)."""
+    """Плановый сброс телеметрии (каждые 6 часов) — страховка без фонового flusher'а."""
+    if _flusher_task is not None and not _flusher_task.done():
+        return
     await flush_to_sheets(google)
 
 
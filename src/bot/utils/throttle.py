@@ -13,9 +13,12 @@
    Вызывается вручную из обработчиков.
 """
 
+import asyncio
+import bisect
 import logging
+import sys
 import time
-from collections import defaultdict, deque
+from collections import OrderedDict
 from typing import Any, Callable
 
 from aiogram import BaseMiddleware
@@ -25,6 +28,18 @@ from src.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Ниже этого числа отслеживаемых ключей cleanup() не сканирует окна — память мизерная
+_CLEANUP_MIN_KEYS = 1_000
+
+# Жёсткий потолок окон CriticalRateLimiter — при переполнении вытесняется самое давнее (LRU)
+_CRITICAL_MAX_KEYS = 10_000
+
+# Предупреждения о троттлинге уходят фоном; одновременно — не больше N
+# (при всплеске это те же исходящие вызовы Telegram API, что и ответы бота)
+_WARNING_CONCURRENCY = 5
+_warning_sem = asyncio.Semaphore(_WARNING_CONCURRENCY)
+_warning_tasks: set[asyncio.Task] = set()
+
 
 # ─────────────────── Per-User Sliding Window ──────────────────────────
 
@@ -35,17 +50,20 @@ class _SlidingWindow:
     __slots__ = ("_timestamps", "_max_size")
 
     def __init__(self, max_size: int = 200) -> None:
-        self._timestamps: deque[float] = deque(maxlen=max_size)
+        # Список отсортирован по времени (monotonic растёт) — режем по bisect
+        self._timestamps: list[float] = []
         self._max_size = max_size
 
     def add(self, now: float) -> None:
         self._timestamps.append(now)
+        if len(self._timestamps) > self._max_size:
+            del self._timestamps[:-self._max_size]
 
     def count_in_window(self, now: float, window: float) -> int:
-        cutoff = now - window
-        # Отсекаем старые (deque отсортирован по времени)
-        while self._timestamps and self._timestamps[0] < cutoff:
-            self._timestamps.popleft()
+        # Отсекаем все старые одним срезом вместо popleft по одному
+        expired = bisect.bisect_left(self._timestamps, now - window)
+        if expired:
+            del self._timestamps[:expired]
         return len(self._timestamps)
 
 
@@ -76,7 +94,9 @@ class ThrottleMiddleware(BaseMiddleware):
         self._period = period
         self._silent = silent
         self._warn_cooldown = warn_cooldown
-        self._windows: dict[int, _SlidingWindow] = defaultdict(_SlidingWindow)
+        self._admin_id = settings.ADMIN_ID
+        # Окно создаётся только при первом пропущенном событии пользователя
+        self._windows: dict[int, _SlidingWindow] = {}
         self._last_warn: dict[int, float] = {}
 
         # Счётчики для мониторинга
@@ -94,12 +114,12 @@ class ThrottleMiddleware(BaseMiddleware):
             return await handler(event, data)
 
         # Админ не ограничивается
-        if user_id == settings.ADMIN_ID:
+        if user_id == self._admin_id:
             return await handler(event, data)
 
         now = time.monotonic()
-        window = self._windows[user_id]
-        count = window.count_in_window(now, self._period)
+        window = self._windows.get(user_id)
+        count = window.count_in_window(now, self._period) if window is not None else 0
 
         if count >= self._rate:
             self.total_throttled += 1
@@ -109,7 +129,10 @@ class ThrottleMiddleware(BaseMiddleware):
                 last = self._last_warn.get(user_id, 0)
                 if now - last >= self._warn_cooldown:
                     self._last_warn[user_id] = now
-                    await _send_throttle_warning(event)
+                    # Не держим middleware на исходящем запросе к Telegram
+                    task = asyncio.create_task(_send_throttle_warning(event))
+                    _warning_tasks.add(task)
+                    task.add_done_callback(_warning_tasks.discard)
 
             logger.warning(
                 "Throttled user_id=%s (%d/%d in %ds)",
@@ -117,12 +140,16 @@ class ThrottleMiddleware(BaseMiddleware):
             )
             return  # Дропаем событие
 
+        if window is None:
+            window = self._windows[user_id] = _SlidingWindow()
         window.add(now)
         self.total_passed += 1
         return await handler(event, data)
 
     def cleanup(self) -> None:
         """Удаляет данные неактивных пользователей (вызывать периодически)."""
+        if len(self._windows) < _CLEANUP_MIN_KEYS:
+            return
         now = time.monotonic()
         stale = [
             uid for uid, w in self._windows.items()
@@ -149,18 +176,24 @@ class CriticalRateLimiter:
     def __init__(self, rate: int = 3, period: int = 60) -> None:
         self._rate = rate
         self._period = period
-        self._windows: dict[str, _SlidingWindow] = defaultdict(_SlidingWindow)
+        self._admin_id = settings.ADMIN_ID
+        # LRU: свежие ключи в конце, при переполнении выталкиваем голову
+        self._windows: OrderedDict[tuple[int, str], _SlidingWindow] = OrderedDict()
         self.total_blocked: int = 0
 
     def allow(self, user_id: int, action: str) -> bool:
         """Возвращает True если действие разрешено."""
-        if user_id == settings.ADMIN_ID:
+        if user_id == self._admin_id:
             return True
 
-        key = f"{user_id}:{action}"
+        key = (user_id, sys.intern(action))
         now = time.monotonic()
-        window = self._windows[key]
-        count = window.count_in_window(now, self._period)
+        window = self._windows.get(key)
+        if window is not None:
+            self._windows.move_to_end(key)
+            count = window.count_in_window(now, self._period)
+        else:
+            count = 0
 
         if count >= self._rate:
             self.total_blocked += 1
@@ -171,35 +204,74 @@ class CriticalRateLimiter:
             )
             return False
 
+        if window is None:
+            window = self._windows[key] = _SlidingWindow()
+            if len(self._windows) > _CRITICAL_MAX_KEYS:
+                self._windows.popitem(last=False)
         window.add(now)
         return True
 
+    def cleanup(self) -> None:
+        """Удаляет окна без событий за последний период (вызывать периодически)."""
+        if len(self._windows) < _CLEANUP_MIN_KEYS:
+            return
+        now = time.monotonic()
+        stale = [
+            key for key, w in self._windows.items()
+            if w.count_in_window(now, self._period) == 0
+        ]
+        for key in stale:
+            del self._windows[key]
+
 
 # Глобальные экземпляры
 throttle_mw = ThrottleMiddleware(rate=8, period=60, silent=False, warn_cooldown=30)
 critical_limiter = CriticalRateLimiter(rate=3, period=60)
 
 
+def cleanup_rate_limiters() -> None:
+    """Чистит окна неактивных пользователей у глобальных лимитеров (из scheduler)."""
+    throttle_mw.cleanup()
+    critical_limiter.cleanup()
+
+
 # ─────────────────── Helpers ──────────────────────────────────────────
 
 
+def _from_user_id(event: Message | CallbackQuery) -> int | None:
+    return event.from_user.id if event.from_user else None
+
+
+# Тип события → извлечение user_id (точный тип — один dict lookup)
+_USER_ID_GETTERS: dict[type, Callable[[Any], int | None]] = {
+    Message: _from_user_id,
+    CallbackQuery: _from_user_id,
+}
+
+
 def _extract_user_id(event: TelegramObject) -> int | None:
     """Извлекает user_id из Message или CallbackQuery."""
-    if isinstance(event, Message):
-        return event.from_user.id if event.from_user else None
-    if isinstance(event, CallbackQuery):
-        return event.from_user.id if event.from_user else None
-    return None
+    getter = _USER_ID_GETTERS.get(type(event))
+    if getter is None:
+        # Подклассы и моки — через isinstance
+        for event_type, type_getter in _USER_ID_GETTERS.items():
+            if isinstance(event, event_type):
+                getter = type_getter
+                break
+        else:
+            return None
+    return getter(event)
 
 
 async def _send_throttle_warning(event: TelegramObject) -> None:
     """Отправляет пользователю короткое предупреждение."""
     text = "⏳ Пожалуйста, не так быстро. Подождите немного."
     try:
-        if isinstance(event, Message):
-            await event.answer(text)
-        elif isinstance(event, CallbackQuery):
-            await event.answer(text, show_alert=True)
+        async with _warning_sem:
+            if isinstance(event, Message):
+                await event.answer(text)
+            elif isinstance(event, CallbackQuery):
+                await event.answer(text, show_alert=True)
     except Exception:
         pass
 
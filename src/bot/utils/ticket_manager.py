@@ -10,10 +10,18 @@ L10. Ассистент по дедлайнам — напоминания о ю
     ticket = await create_ticket(...)
 """
 
+import asyncio
+import bisect
+import itertools
 import logging
+import re
+import time
+from collections import deque
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
+from src.config import settings
+
 logger = logging.getLogger(__name__)
 
 # In-memory хранилище тикетов (+ запись в Google Sheets)
@@ -22,6 +30,18 @@ _ticket_counter = 0
 
 # Статусы тикетов
 TICKET_STATUSES = ["new", "in_progress", "review", "done", "cancelled"]
+_OPEN_STATUSES = frozenset({"new", "in_progress", "review"})
+_OVERDUE_STATUSES = frozenset({"new", "in_progress"})
+
+# Открытые тикеты, отсортированные по дедлайну: (deadline_epoch, ticket_id).
+# Поддерживается create_ticket / update_ticket_status — запросы админки не сканируют
+# все тикеты и не сортируют их заново; просроченные — префикс списка (bisect).
+_open_by_deadline: list[tuple[float, str]] = []
+
+# Закрытые тикеты (done/cancelled) уже записаны в Sheets — в памяти держим
+# не больше _CLOSED_TICKETS_MAX последних, более старые вытесняются (FIFO).
+_CLOSED_TICKETS_MAX = 5_000
+_closed_ticket_ids: deque[str] = deque()
 
 # Приоритеты
 TICKET_PRIORITIES = {
@@ -30,6 +50,35 @@ TICKET_PRIORITIES = {
     "normal": "🟡 Обычный",
     "low": "🟢 Низкий",
 }
+# В лист пишется подпись приоритета — обратное отображение для загрузки
+_PRIORITY_BY_LABEL = {label: key for key, label in TICKET_PRIORITIES.items()}
+
+
+# Запись в лист «Tasks» пачками: новые строки (list) и смены статуса
+# (tuple ticket_id, status) копятся в очереди, фоновый flusher
+# раз в _TICKET_FLUSH_INTERVAL секунд (или при _TICKET_BATCH_SIZE строк)
+# отправляет их одним append_rows — квота Sheets на запись не расходуется на каждый тикет.
+_TICKET_FLUSH_INTERVAL = 5.0
+_TICKET_BATCH_SIZE = 50
+_TICKET_QUEUE_MAX = 5_000
+_TASKS_HEADER = ["ID", "Title", "Description", "Assignee",
+                 "Priority", "Status", "UserID", "Created", "Deadline"]
+_TASKS_STATUS_COL = "F"
+# Дата/время в листе: пишем с минутами; USER_ENTERED может вернуть их с секундами,
+# старые строки содержат только дату дедлайна
+_SHEET_DT_FORMATS = ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d")
+
+_ticket_queue: asyncio.Queue | None = None
+_ticket_flusher_task: asyncio.Task | None = None
+# Остановка flusher-а: флаг + маркер в очереди (будит ожидающий get()).
+# Задачу не отменяем — прерванная запись в Sheets потеряла бы пачку.
+_ticket_stop: asyncio.Event | None = None
+_FLUSH_STOP = object()
+
+# Хэндл листа «Tasks»: worksheet() — отдельный запрос метаданных, резолвим один раз.
+# Сбрасывается при ошибке записи — следующая пачка найдёт лист заново.
+_tasks_ws = None
+_tasks_ws_lock: asyncio.Lock | None = None
 
 
 def _gen_ticket_id() -> str:
@@ -78,37 +127,25 @@ async def create_ticket(
         "lead_id": lead_id,
         "created_at": now.isoformat(),
         "deadline": deadline.isoformat(),
+        "deadline_epoch": deadline.timestamp(),
         "deadline_display": deadline.strftime("%d.%m.%Y"),
         "updated_at": now.isoformat(),
         "comments": [],
     }
 
     _tickets[ticket_id] = ticket
+    bisect.insort(_open_by_deadline, (ticket["deadline_epoch"], ticket_id))
 
-    # Запись в Google Sheets (лист «Tasks»)
+    # Запись в Google Sheets (лист «Tasks») — через очередь, пачкой
     if google:
         try:
-            import asyncio
-
-            def _write_ticket():
-                try:
-                    ws = google._get_spreadsheet().worksheet("Tasks")
-                except Exception:
-                    # Лист не существует — создаём
-                    try:
-                        sp = google._get_spreadsheet()
-                        ws = sp.add_worksheet("Tasks", rows=500, cols=10)
-                        ws.append_row(["ID", "Title", "Description", "Assignee",
-                                       "Priority", "Status", "UserID", "Created", "Deadline"])
-                    except Exception:
-                        return
-                ws.append_row([
-                    ticket_id, title, description[:200], assignee,
-                    TICKET_PRIORITIES.get(priority, priority), "new",
-                    str(user_id), now.strftime("%Y-%m-%d %H:%M"), deadline.strftime("%Y-%m-%d"),
-                ], value_input_option="USER_ENTERED")
-
-            await asyncio.to_thread(_write_ticket)
+            _get_ticket_queue(google).put_nowait([
+                ticket_id, title, description[:200], assignee,
+                TICKET_PRIORITIES.get(priority, priority), "new",
+                str(user_id), now.strftime("%Y-%m-%d %H:%M"), deadline.strftime("%Y-%m-%d %H:%M"),
+            ])
+        except asyncio.QueueFull:
+            logger.warning("Ticket write queue is full — %s not written to Sheets", ticket_id)
         except Exception as e:
             logger.warning("Failed to write ticket to Sheets: %s", e)
 
@@ -116,8 +153,222 @@ async def create_ticket(
     return ticket
 
 
-def update_ticket_status(ticket_id: str, status: str, comment: str = "") -> bool:
-    """Обновляет статус тикета."""
+def _get_ticket_queue(google) -> asyncio.Queue:
+    global _ticket_queue, _ticket_flusher_task, _ticket_stop
+    loop = asyncio.get_running_loop()
+    if _ticket_flusher_task is not None and _ticket_flusher_task.get_loop() is not loop:
+        # Очередь и flusher привязаны к старому event loop — пересоздаём
+        _ticket_queue = None
+        _ticket_flusher_task = None
+    if _ticket_queue is None:
+        _ticket_queue = asyncio.Queue(maxsize=_TICKET_QUEUE_MAX)
+    if _ticket_flusher_task is None or _ticket_flusher_task.done():
+        _ticket_stop = asyncio.Event()
+        _ticket_flusher_task = loop.create_task(_run_ticket_flusher(google, _ticket_stop))
+    return _ticket_queue
+
+
+def _open_tasks_ws(google):
+    """Находит лист «Tasks» (создаёт при отсутствии)."""
+    sp = google._get_spreadsheet()
+    try:
+        return sp.worksheet("Tasks")
+    except Exception:
+        # Лист не существует — создаём
+        ws = sp.add_worksheet("Tasks", rows=500, cols=10)
+        ws.append_row(_TASKS_HEADER)
+        return ws
+
+
+async def _get_tasks_ws(google):
+    """Возвращает закэшированный хэндл листа «Tasks»."""
+    global _tasks_ws, _tasks_ws_lock
+    if _tasks_ws is not None:
+        return _tasks_ws
+    if _tasks_ws_lock is None:
+        _tasks_ws_lock = asyncio.Lock()
+    async with _tasks_ws_lock:
+        if _tasks_ws is None:
+            _tasks_ws = await asyncio.to_thread(_open_tasks_ws, google)
+    return _tasks_ws
+
+
+def _apply_ticket_batch(ws, rows: list[list], statuses: dict[str, str]) -> None:
+    """Дописывает новые строки, затем проставляет статусы (после — чтобы
+    тикет, созданный и закрытый в одной пачке, уже был в листе)."""
+    if rows:
+        ws.append_rows(rows, value_input_option="USER_ENTERED")
+    if not statuses:
+        return
+    row_by_id = {tid: n for n, tid in enumerate(ws.col_values(1), start=1)}
+    cells = []
+    for ticket_id, status in statuses.items():
+        row_num = row_by_id.get(ticket_id)
+        if row_num is None:
+            logger.debug("Ticket %s not found in Sheets — status not written", ticket_id)
+            continue
+        cells.append({"range": f"{_TASKS_STATUS_COL}{row_num}", "values": [[status]]})
+    if cells:
+        ws.batch_update(cells, value_input_option="RAW")
+
+
+async def _write_ticket_batch(google, items: list) -> None:
+    global _tasks_ws
+    rows = [item for item in items if isinstance(item, list)]
+    statuses: dict[str, str] = {}
+    for item in items:
+        if isinstance(item, tuple):
+            ticket_id, status = item
+            statuses[ticket_id] = status  # последняя смена статуса побеждает
+    try:
+        ws = await _get_tasks_ws(google)
+        await asyncio.to_thread(_apply_ticket_batch, ws, rows, statuses)
+        logger.info("Tickets written to Sheets: %d new, %d status", len(rows), len(statuses))
+    except Exception as e:
+        # Лист могли удалить/переименовать — резолвим заново при следующей записи
+        _tasks_ws = None
+        logger.warning("Failed to write %d ticket update(s) to Sheets: %s", len(items), e)
+
+
+async def _run_ticket_flusher(google, stop: asyncio.Event) -> None:
+    """Фоновая запись: ждёт строку, добирает пачку и пишет её в Sheets.
+
+    После ``stop`` дописывает всё, что осталось в очереди, и завершается —
+    пачки уходят строго в порядке создания тикетов.
+    """
+    queue = _ticket_queue
+    while True:
+        if stop.is_set() and queue.empty():
+            return
+        item = await queue.get()
+        if item is _FLUSH_STOP:
+            continue
+        batch = [item]
+        if not stop.is_set() and queue.qsize() < _TICKET_BATCH_SIZE - 1:
+            # Ждём добора пачки; остановка бота прерывает ожидание сразу
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=_TICKET_FLUSH_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+        while len(batch) < _TICKET_BATCH_SIZE and not queue.empty():
+            item = queue.get_nowait()
+            if item is not _FLUSH_STOP:
+                batch.append(item)
+        await _write_ticket_batch(google, batch)
+
+
+async def flush_ticket_writes(google) -> None:
+    """Останавливает фоновый flusher и дописывает оставшиеся тикеты.
+
+    Вызывается при остановке бота (main.py).
+    """
+    global _ticket_queue, _ticket_flusher_task, _ticket_stop
+    if _ticket_flusher_task is not None:
+        if not _ticket_flusher_task.done():
+            _ticket_stop.set()
+            try:
+                _ticket_queue.put_nowait(_FLUSH_STOP)
+            except asyncio.QueueFull:
+                pass  # Очередь непуста — flusher не спит в get() и увидит флаг сам
+            await _ticket_flusher_task
+        _ticket_flusher_task = None
+        _ticket_stop = None
+
+    # Flusher не запускался или упал — дописываем остаток сами
+    if _ticket_queue is None:
+        return
+    pending: list = []
+    while not _ticket_queue.empty():
+        item = _ticket_queue.get_nowait()
+        if item is not _FLUSH_STOP:
+            pending.append(item)
+    _ticket_queue = None
+    if pending:
+        await _write_ticket_batch(google, pending)
+
+
+def _parse_sheet_dt(value: str) -> datetime | None:
+    for fmt in _SHEET_DT_FORMATS:
+        try:
+            return datetime.strptime(value.strip(), fmt).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+    return None
+
+
+def _ticket_from_row(row: list[str]) -> dict | None:
+    """Собирает тикет из строки листа «Tasks» (формат — как в create_ticket)."""
+    row = row + [""] * (len(_TASKS_HEADER) - len(row))
+    ticket_id, title, description, assignee, priority_label, status, uid, created, deadline = (
+        row[:len(_TASKS_HEADER)]
+    )
+    if not ticket_id.startswith("T-"):
+        return None
+    created_at = _parse_sheet_dt(created)
+    deadline_at = _parse_sheet_dt(deadline)
+    if created_at is None or deadline_at is None:
+        return None
+    return {
+        "id": ticket_id,
+        "title": title,
+        "description": description,
+        "assignee": assignee,
+        "priority": _PRIORITY_BY_LABEL.get(priority_label, priority_label),
+        "status": status if status in TICKET_STATUSES else "new",
+        "user_id": int(uid) if uid.isdigit() else 0,
+        "lead_id": "",
+        "created_at": created_at.isoformat(),
+        "deadline": deadline_at.isoformat(),
+        "deadline_epoch": deadline_at.timestamp(),
+        "deadline_display": deadline_at.strftime("%d.%m.%Y"),
+        "updated_at": created_at.isoformat(),
+        "comments": [],
+    }
+
+
+async def load_tickets_from_sheets(google) -> int:
+    """Восстанавливает тикеты из листа «Tasks» после рестарта.
+
+    Весь лист читается одним запросом (get_all_values); заполняются
+    ``_tickets``, счётчик ID и индекс открытых тикетов.
+
+    Returns:
+        Число загруженных тикетов.
+    """
+    global _ticket_counter
+    try:
+        ws = await _get_tasks_ws(google)
+        rows = await asyncio.to_thread(ws.get_all_values)
+    except Exception as e:
+        logger.warning("Failed to load tickets from Sheets: %s", e)
+        return 0
+
+    loaded = 0
+    for row in rows[1:]:
+        ticket = _ticket_from_row(row)
+        if ticket is None or ticket["id"] in _tickets:
+            continue
+        _tickets[ticket["id"]] = ticket
+        if ticket["status"] in _OPEN_STATUSES:
+            _open_by_deadline.append((ticket["deadline_epoch"], ticket["id"]))
+        else:
+            _remember_closed(ticket["id"])
+        num = ticket["id"][2:]
+        if num.isdigit():
+            _ticket_counter = max(_ticket_counter, int(num))
+        loaded += 1
+    _open_by_deadline.sort()
+
+    logger.info("Tickets loaded from Sheets: %d", loaded)
+    return loaded
+
+
+def update_ticket_status(ticket_id: str, status: str, comment: str = "", google=None) -> bool:
+    """Обновляет статус тикета (и ячейку «Status» в листе «Tasks», если передан google).
+
+    Лист — источник правды при рестарте (``load_tickets_from_sheets``),
+    поэтому статус туда пишется через ту же очередь, что и новые тикеты.
+    """
     ticket = _tickets.get(ticket_id)
     if not ticket:
         return False
@@ -125,7 +376,20 @@ def update_ticket_status(ticket_id: str, status: str, comment: str = "") -> bool
     if status not in TICKET_STATUSES:
         return False
 
+    was_open = ticket["status"] in _OPEN_STATUSES
+    is_open = status in _OPEN_STATUSES
+    if was_open != is_open:
+        entry = (ticket["deadline_epoch"], ticket_id)
+        if is_open:
+            bisect.insort(_open_by_deadline, entry)
+        else:
+            idx = bisect.bisect_left(_open_by_deadline, entry)
+            if idx < len(_open_by_deadline) and _open_by_deadline[idx] == entry:
+                del _open_by_deadline[idx]
+
     ticket["status"] = status
+    if was_open and not is_open:
+        _remember_closed(ticket_id)
     ticket["updated_at"] = datetime.now(timezone.utc).isoformat()
     if comment:
         ticket["comments"].append({
@@ -133,18 +397,36 @@ def update_ticket_status(ticket_id: str, status: str, comment: str = "") -> bool
             "time": datetime.now(timezone.utc).isoformat(),
         })
 
+    if google:
+        try:
+            _get_ticket_queue(google).put_nowait((ticket_id, status))
+        except asyncio.QueueFull:
+            logger.warning("Ticket write queue is full — %s status not written to Sheets", ticket_id)
+        except Exception as e:
+            logger.warning("Failed to queue ticket status for Sheets: %s", e)
+
     logger.info("Ticket %s → %s", ticket_id, status)
     return True
 
 
+def _remember_closed(ticket_id: str) -> None:
+    """Учитывает закрытый тикет и вытесняет самые давние закрытые сверх лимита."""
+    _closed_ticket_ids.append(ticket_id)
+    while len(_closed_ticket_ids) > _CLOSED_TICKETS_MAX:
+        old_id = _closed_ticket_ids.popleft()
+        old = _tickets.get(old_id)
+        # Тикет могли переоткрыть — открытые не трогаем
+        if old is not None and old["status"] not in _OPEN_STATUSES:
+            del _tickets[old_id]
+
+
 def get_open_tickets(assignee: str = "") -> list[dict]:
     """Возвращает открытые тикеты (опционально фильтр по ответственному)."""
-    result = []
-    for t in _tickets.values():
-        if t["status"] in ("new", "in_progress", "review"):
-            if not assignee or t["assignee"] == assignee:
-                result.append(t)
-    return sorted(result, key=lambda x: x.get("deadline", ""))
+    # Индекс уже упорядочен по дедлайну
+    tickets = [_tickets[tid] for _, tid in _open_by_deadline]
+    if assignee:
+        return [t for t in tickets if t["assignee"] == assignee]
+    return tickets
 
 
 def get_ticket(ticket_id: str) -> Optional[dict]:
@@ -154,10 +436,11 @@ def get_ticket(ticket_id: str) -> Optional[dict]:
 
 def get_overdue_tickets() -> list[dict]:
     """Тикеты с просроченным дедлайном."""
-    now = datetime.now(timezone.utc).isoformat()
+    # Дедлайн хранится и как epoch — сравниваем float, без datetime/isoformat
+    end = bisect.bisect_left(_open_by_deadline, (time.time(),))
     return [
-        t for t in _tickets.values()
-        if t["status"] in ("new", "in_progress") and t["deadline"] < now
+        t for t in (_tickets[tid] for _, tid in _open_by_deadline[:end])
+        if t["status"] in _OVERDUE_STATUSES
     ]
 
 
@@ -210,8 +493,17 @@ def format_ticket_list(tickets: list[dict]) -> str:
 #  L10: Ассистент по дедлайнам
 # ═══════════════════════════════════════════════════════════════════════════
 
-# In-memory хранилище напоминаний
+# In-memory хранилище напоминаний; сработавшие удаляются при превышении лимита
 _reminders: list[dict] = []
+_REMINDERS_MAX = 5_000
+_reminder_seq = itertools.count()
+
+# Паттерны разбора запроса на напоминание (текст уже в нижнем регистре)
+_DEADLINE_RELATIVE_RE = re.compile(r'через\s+(\d+)\s+(день|дня|дней|месяц|месяца|месяцев|недел)')
+_DEADLINE_DATE_RE = re.compile(r'(\d{1,2})[./](\d{1,2})[./](\d{4})')
+_NAPOMNI_RE = re.compile(r'напомн\w*\s+')
+_RELATIVE_TAIL_RE = re.compile(r'через\s+\d+\s+\S+\s*')
+_DATE_TAIL_RE = re.compile(r'\d{1,2}[./]\d{1,2}[./]\d{4}\s*')
 
 
 def parse_deadline_request(text: str) -> dict | None:
@@ -225,12 +517,10 @@ def parse_deadline_request(text: str) -> dict | None:
     Returns:
         {"task": str, "days": int, "date": datetime | None}
     """
-    import re
-
     text_lower = text.lower().strip()
 
     # Паттерн: "через N дней/месяцев/недель"
-    match = re.search(r'через\s+(\d+)\s+(день|дня|дней|месяц|месяца|месяцев|недел)', text_lower)
+    match = _DEADLINE_RELATIVE_RE.search(text_lower)
     if match:
         num = int(match.group(1))
         unit = match.group(2)
@@ -242,15 +532,15 @@ def parse_deadline_request(text: str) -> dict | None:
             days = num
 
         # Извлекаем задачу (убираем "напомни" и время)
-        task = re.sub(r'напомн\w*\s+', '', text_lower)
-        task = re.sub(r'через\s+\d+\s+\S+\s*', '', task).strip()
+        task = _NAPOMNI_RE.sub('', text_lower)
+        task = _RELATIVE_TAIL_RE.sub('', task).strip()
         if not task:
             task = text_lower
 
         return {"task": task.capitalize(), "days": days, "date": None}
 
     # Паттерн: дата dd.mm.yyyy
-    date_match = re.search(r'(\d{1,2})[./](\d{1,2})[./](\d{4})', text_lower)
+    date_match = _DEADLINE_DATE_RE.search(text_lower)
     if date_match:
         try:
             day = int(date_match.group(1))
@@ -260,8 +550,8 @@ def parse_deadline_request(text: str) -> dict | None:
             now = datetime.now(timezone.utc)
             days = max(1, (target - now).days)
 
-            task = re.sub(r'напомн\w*\s+', '', text_lower)
-            task = re.sub(r'\d{1,2}[./]\d{1,2}[./]\d{4}\s*', '', task).strip()
+            task = _NAPOMNI_RE.sub('', text_lower)
+            task = _DATE_TAIL_RE.sub('', task).strip()
             if not task:
                 task = text_lower
 
@@ -272,6 +562,32 @@ def parse_deadline_request(text: str) -> dict | None:
     return None
 
 
+async def _send_reminder(bot, user_id: int, task: str, days: int, admin_notify: bool) -> None:
+    """Отправляет напоминание пользователю (и админу) — задача scheduler."""
+    text = (
+        f"⏰ <b>Напоминание!</b>\n\n"
+        f"📋 {task}\n\n"
+        f"Вы просили напомнить об этом {days} дн. назад.\n\n"
+        f"⚖️ <i>Если вопрос актуален — обратитесь к юристам SOLIS Partners.</i>"
+    )
+    try:
+        await bot.send_message(user_id, text)
+    except Exception as e:
+        logger.error("Reminder send failed: %s", e)
+
+    if admin_notify:
+        try:
+            admin_text = (
+                f"⏰ <b>Напоминание для клиента</b>\n\n"
+                f"👤 User ID: {user_id}\n"
+                f"📋 {task}\n"
+                f"📅 Создано {days} дн. назад"
+            )
+            await bot.send_message(settings.ADMIN_ID, admin_text)
+        except Exception:
+            pass
+
+
 async def schedule_reminder(
     scheduler,
     bot,
@@ -293,10 +609,9 @@ async def schedule_reminder(
     Returns:
         Данные напоминания.
     """
-    from src.config import settings
-
     fire_time = datetime.now(timezone.utc) + timedelta(days=days)
-    reminder_id = f"reminder_{user_id}_{len(_reminders)}"
+    # Сквозной номер, а не len(_reminders): список чистится, ID не должны повторяться
+    reminder_id = f"reminder_{user_id}_{next(_reminder_seq)}"
 
     reminder = {
         "id": reminder_id,
@@ -308,35 +623,14 @@ async def schedule_reminder(
         "created_at": datetime.now(timezone.utc).isoformat(),
     }
     _reminders.append(reminder)
-
-    async def _send_reminder():
-        text = (
-            f"⏰ <b>Напоминание!</b>\n\n"
-            f"📋 {task}\n\n"
-            f"Вы просили напомнить об этом {days} дн. назад.\n\n"
-            f"⚖️ <i>Если вопрос актуален — обратитесь к юристам SOLIS Partners.</i>"
-        )
-        try:
-            await bot.send_message(user_id, text)
-        except Exception as e:
-            logger.error("Reminder send failed: %s", e)
-
-        if admin_notify:
-            try:
-                admin_text = (
-                    f"⏰ <b>Напоминание для клиента</b>\n\n"
-                    f"👤 User ID: {user_id}\n"
-                    f"📋 {task}\n"
-                    f"📅 Создано {days} дн. назад"
-                )
-                await bot.send_message(settings.ADMIN_ID, admin_text)
-            except Exception:
-                pass
+    if len(_reminders) > _REMINDERS_MAX:
+        _prune_fired_reminders()
 
     scheduler.add_job(
         _send_reminder,
         trigger="date",
         run_date=fire_time,
+        args=[bot, user_id, task, days, admin_notify],
         id=reminder_id,
         replace_existing=True,
         misfire_grace_time=86400,
@@ -346,6 +640,16 @@ async def schedule_reminder(
     return reminder
 
 
+def _prune_fired_reminders() -> None:
+    """Удаляет уже сработавшие напоминания.
+
+    Ожидающие остаются: у каждого есть задача в scheduler, так что
+    список не больше очереди самого scheduler.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    _reminders[:] = [r for r in _reminders if r["fire_at"] > now]
+
+
 def get_user_reminders(user_id: int) -> list[dict]:
     """Возвращает все напоминания пользователя."""
     return [r for r in _reminders if r["user_id"] == user_id]
@@ -12,6 +12,7 @@
 """
 
 import logging
+import math
 from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
 
@@ -20,6 +21,9 @@ logger = logging.getLogger(__name__)
 # Хранилище: {user_id: timezone_str}
 _user_timezones: dict[int, str] = {}
 
+# Готовые ZoneInfo по имени зоны (различных зон — единицы, кэш не растёт)
+_zoneinfo_cache: dict[str, ZoneInfo] = {}
+
 # Казахстанские часовые пояса
 KZ_TIMEZONES = {
     "Алматы": "Asia/Almaty",       # UTC+5 → +6 (зима → лето)
@@ -55,7 +59,8 @@ def set_user_timezone(user_id: int, tz_str: str) -> bool:
         True если часовой пояс валиден и установлен.
     """
     try:
-        ZoneInfo(tz_str)  # Проверяем валидность
+        zi = ZoneInfo(tz_str)  # Проверяем валидность
+        _zoneinfo_cache.setdefault(tz_str, zi)
         _user_timezones[user_id] = tz_str
         logger.info("Timezone set: user=%s -> %s", user_id, tz_str)
         return True
@@ -71,7 +76,11 @@ def get_user_tz(user_id: int) -> str:
 
 def get_user_zoneinfo(user_id: int) -> ZoneInfo:
     """Возвращает ZoneInfo объект для пользователя."""
-    return ZoneInfo(get_user_tz(user_id))
+    tz_str = _user_timezones.get(user_id, DEFAULT_TZ)
+    zi = _zoneinfo_cache.get(tz_str)
+    if zi is None:
+        zi = _zoneinfo_cache[tz_str] = ZoneInfo(tz_str)
+    return zi
 
 
 def get_user_local_time(user_id: int) -> datetime:
@@ -80,44 +89,177 @@ def get_user_local_time(user_id: int) -> datetime:
     return datetime.now(tz)
 
 
-def timezone_from_location(latitude: float, longitude: float) -> str:
-    """Определяет timezone по координатам (упрощённый метод).
-
-    Для Казахстана: если долгота > 64° → Алматы (UTC+6), иначе Актау (UTC+5).
-    Для остальных — примерная оценка по долготе.
-    """
-    # Казахстан: ~46-56°N, ~46-88°E
-    if 40 <= latitude <= 56 and 46 <= longitude <= 88:
-        if longitude >= 64:
-            return "Asia/Almaty"
-        else:
-            return "Asia/Aqtau"
+# Опорные города для определения timezone по геолокации: (широта, долгота, зона).
+# Берётся ближайший город, поэтому у границ поясов опорные точки стоят с обеих
+# сторон (юг России, Беларусь/Польша/Прибалтика, Испания/Португалия).
+_TZ_ANCHORS: tuple[tuple[float, float, str], ...] = (
+    # Казахстан
+    (43.24, 76.95, "Asia/Almaty"),        # Алматы
+    (51.17, 71.43, "Asia/Almaty"),        # Астана
+    (42.32, 69.59, "Asia/Almaty"),        # Шымкент
+    (42.90, 71.37, "Asia/Almaty"),        # Тараз
+    (49.81, 73.10, "Asia/Almaty"),        # Караганда
+    (52.29, 76.94, "Asia/Almaty"),        # Павлодар
+    (49.95, 82.61, "Asia/Almaty"),        # Усть-Каменогорск
+    (54.87, 69.14, "Asia/Almaty"),        # Петропавловск
+    (44.85, 65.51, "Asia/Qyzylorda"),     # Кызылорда
+    (53.21, 63.62, "Asia/Qostanay"),      # Костанай
+    (50.28, 57.17, "Asia/Aqtobe"),        # Актобе
+    (47.11, 51.92, "Asia/Atyrau"),        # Атырау
+    (43.65, 51.16, "Asia/Aqtau"),         # Актау
+    (51.23, 51.37, "Asia/Oral"),          # Уральск
+    # Центральная Азия и Закавказье
+    (42.87, 74.59, "Asia/Bishkek"),
+    (41.31, 69.24, "Asia/Tashkent"),
+    (39.65, 66.96, "Asia/Samarkand"),
+    (38.56, 68.77, "Asia/Dushanbe"),
+    (37.95, 58.38, "Asia/Ashgabat"),
+    (41.72, 44.79, "Asia/Tbilisi"),
+    (40.18, 44.51, "Asia/Yerevan"),
+    (40.41, 49.87, "Asia/Baku"),
+    # Россия: центр и северо-запад
+    (55.75, 37.62, "Europe/Moscow"),
+    (59.93, 30.34, "Europe/Moscow"),      # Санкт-Петербург
+    (54.78, 32.05, "Europe/Moscow"),      # Смоленск
+    (50.60, 36.59, "Europe/Moscow"),      # Белгород
+    (51.66, 39.20, "Europe/Moscow"),      # Воронеж
+    (56.33, 44.00, "Europe/Moscow"),      # Нижний Новгород
+    (53.20, 45.00, "Europe/Moscow"),      # Пенза
+    (55.79, 49.12, "Europe/Moscow"),      # Казань
+    (54.71, 20.51, "Europe/Kaliningrad"),
+    # Россия: юг и Кавказ
+    (47.23, 39.72, "Europe/Moscow"),      # Ростов-на-Дону
+    (45.04, 38.98, "Europe/Moscow"),      # Краснодар
+    (43.59, 39.73, "Europe/Moscow"),      # Сочи
+    (45.04, 41.97, "Europe/Moscow"),      # Ставрополь
+    (43.32, 45.69, "Europe/Moscow"),      # Грозный
+    (42.98, 47.50, "Europe/Moscow"),      # Махачкала
+    (48.71, 44.51, "Europe/Volgograd"),
+    # Россия: Поволжье (UTC+4), Урал и Сибирь
+    (51.53, 46.03, "Europe/Saratov"),
+    (46.35, 48.03, "Europe/Astrakhan"),
+    (54.31, 48.40, "Europe/Ulyanovsk"),
+    (53.20, 50.15, "Europe/Samara"),
+    (51.77, 55.10, "Asia/Yekaterinburg"), # Оренбург
+    (54.74, 55.97, "Asia/Yekaterinburg"), # Уфа
+    (55.16, 61.40, "Asia/Yekaterinburg"), # Челябинск
+    (56.84, 60.61, "Asia/Yekaterinburg"),
+    (57.15, 65.53, "Asia/Yekaterinburg"), # Тюмень
+    (54.99, 73.37, "Asia/Omsk"),
+    (53.35, 83.78, "Asia/Barnaul"),
+    (55.03, 82.92, "Asia/Novosibirsk"),
+    # Беларусь, Украина, Молдова
+    (53.90, 27.56, "Europe/Minsk"),
+    (52.10, 23.69, "Europe/Minsk"),       # Брест
+    (53.68, 23.83, "Europe/Minsk"),       # Гродно
+    (52.44, 30.98, "Europe/Minsk"),       # Гомель
+    (55.19, 30.20, "Europe/Minsk"),       # Витебск
+    (50.45, 30.52, "Europe/Kyiv"),
+    (49.84, 24.03, "Europe/Kyiv"),        # Львов
+    (49.99, 36.23, "Europe/Kyiv"),        # Харьков
+    (48.46, 35.05, "Europe/Kyiv"),        # Днепр
+    (46.48, 30.72, "Europe/Kyiv"),        # Одесса
+    (47.01, 28.86, "Europe/Chisinau"),
+    # Прибалтика и Скандинавия
+    (54.69, 25.28, "Europe/Vilnius"),
+    (54.90, 23.90, "Europe/Vilnius"),     # Каунас
+    (56.95, 24.11, "Europe/Riga"),
+    (59.44, 24.75, "Europe/Tallinn"),
+    (60.17, 24.94, "Europe/Helsinki"),
+    (59.33, 18.07, "Europe/Stockholm"),
+    (59.91, 10.75, "Europe/Oslo"),
+    (55.68, 12.57, "Europe/Copenhagen"),
+    # Центральная и Западная Европа (UTC+1)
+    (52.23, 21.01, "Europe/Warsaw"),
+    (53.13, 23.16, "Europe/Warsaw"),      # Белосток
+    (51.25, 22.57, "Europe/Warsaw"),      # Люблин
+    (54.35, 18.65, "Europe/Warsaw"),      # Гданьск
+    (53.78, 20.49, "Europe/Warsaw"),      # Ольштын
+    (52.52, 13.40, "Europe/Berlin"),
+    (53.55, 9.99, "Europe/Berlin"),       # Гамбург
+    (48.14, 11.58, "Europe/Berlin"),      # Мюнхен
+    (50.08, 14.44, "Europe/Prague"),
+    (48.21, 16.37, "Europe/Vienna"),
+    (47.50, 19.04, "Europe/Budapest"),
+    (44.79, 20.45, "Europe/Belgrade"),
+    (41.90, 12.50, "Europe/Rome"),
+    (45.46, 9.19, "Europe/Rome"),         # Милан
+    (46.95, 7.45, "Europe/Zurich"),
+    (48.86, 2.35, "Europe/Paris"),
+    (43.30, 5.37, "Europe/Paris"),        # Марсель
+    (52.37, 4.90, "Europe/Amsterdam"),
+    (50.85, 4.35, "Europe/Brussels"),
+    (40.42, -3.70, "Europe/Madrid"),
+    (41.39, 2.17, "Europe/Madrid"),       # Барселона
+    (37.39, -5.98, "Europe/Madrid"),      # Севилья
+    (38.88, -6.97, "Europe/Madrid"),      # Бадахос
+    (42.24, -8.72, "Europe/Madrid"),      # Виго
+    (43.26, -2.93, "Europe/Madrid"),      # Бильбао
+    # Западная Европа (UTC+0)
+    (51.51, -0.13, "Europe/London"),
+    (53.48, -2.24, "Europe/London"),      # Манчестер
+    (55.95, -3.19, "Europe/London"),      # Эдинбург
+    (53.35, -6.26, "Europe/Dublin"),
+    (38.72, -9.14, "Europe/Lisbon"),
+    (41.15, -8.61, "Europe/Lisbon"),      # Порту
+    (37.02, -7.93, "Europe/Lisbon"),      # Фару
+    (37.74, -25.67, "Atlantic/Azores"),   # Понта-Делгада
+    (28.12, -15.43, "Atlantic/Canary"),   # Лас-Пальмас
+    # Юго-Восточная Европа и Ближний Восток
+    (44.43, 26.10, "Europe/Bucharest"),
+    (42.70, 23.32, "Europe/Sofia"),
+    (37.98, 23.73, "Europe/Athens"),
+    (41.01, 28.98, "Europe/Istanbul"),
+    (39.93, 32.86, "Europe/Istanbul"),    # Анкара
+    (30.04, 31.24, "Africa/Cairo"),
+    (35.69, 51.39, "Asia/Tehran"),
+    (24.71, 46.68, "Asia/Riyadh"),
+    (25.20, 55.27, "Asia/Dubai"),
+    # Южная и Восточная Азия
+    (28.61, 77.21, "Asia/Kolkata"),
+    (13.76, 100.50, "Asia/Bangkok"),
+    (39.90, 116.40, "Asia/Shanghai"),
+    (1.35, 103.82, "Asia/Singapore"),
+    (37.57, 126.98, "Asia/Seoul"),
+    (35.68, 139.69, "Asia/Tokyo"),
+)
+# Дальше ~800 км от всех опорных городов — оценка по долготе
+_TZ_ANCHOR_MAX_DEG = 7.0
+_TZ_BY_UTC_OFFSET = {
+    -1: "Atlantic/Azores",
+    0: "Europe/London",
+    1: "Europe/Berlin",
+    2: "Europe/Kyiv",
+    3: "Europe/Moscow",
+    4: "Asia/Dubai",
+    5: "Asia/Almaty",
+    6: "Asia/Almaty",
+    8: "Asia/Singapore",
+}
 
-    # Россия
-    if 50 <= latitude <= 70 and 25 <= longitude <= 50:
-        return "Europe/Moscow"
 
-    # Европа
-    if 35 <= latitude <= 70 and -10 <= longitude <= 25:
-        return "Europe/Berlin"
+def timezone_from_location(latitude: float, longitude: float) -> str:
+    """Определяет timezone по координатам (ближайший опорный город).
 
-    # UAE/Gulf
-    if 20 <= latitude <= 30 and 45 <= longitude <= 60:
-        return "Asia/Dubai"
+    Расстояние — равнопромежуточная проекция (градусы долготы сжаты на
+    cos широты); для выбора ближайшего из десятков городов этого достаточно.
+    Если ни один город не ближе ``_TZ_ANCHOR_MAX_DEG`` — оценка по долготе.
+    """
+    lon_scale = math.cos(math.radians(latitude))
+    best_tz = None
+    best_dist = _TZ_ANCHOR_MAX_DEG * _TZ_ANCHOR_MAX_DEG
+    for lat, lon, tz in _TZ_ANCHORS:
+        dy = latitude - lat
+        dx = (longitude - lon) * lon_scale
+        dist = dx * dx + dy * dy
+        if dist < best_dist:
+            best_dist = dist
+            best_tz = tz
+    if best_tz is not None:
+        return best_tz
 
     # Fallback by longitude
-    offset_hours = round(longitude / 15)
-    zone_map = {
-        0: "Europe/London",
-        1: "Europe/Berlin",
-        2: "Europe/Kyiv",
-        3: "Europe/Moscow",
-        4: "Asia/Dubai",
-        5: "Asia/Almaty",
-        6: "Asia/Almaty",
-        8: "Asia/Singapore",
-    }
-    return zone_map.get(offset_hours, DEFAULT_TZ)
+    return _TZ_BY_UTC_OFFSET.get(round(longitude / 15), DEFAULT_TZ)
 
 
 def schedule_at_local_time(
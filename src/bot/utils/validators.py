@@ -23,27 +23,25 @@ from pydantic import BaseModel, Field, field_validator
 
 logger = logging.getLogger(__name__)
 
-# Паттерны мусорного текста
-_GARBAGE_PATTERNS = [
-    re.compile(r'^[a-z]{1,3}$', re.IGNORECASE),                    # 'a', 'ab'
-    re.compile(r'^(.)\1{3,}$'),                                      # 'aaaa', '1111'
-    re.compile(r'^[qwerty]{5,}$', re.IGNORECASE),                   # 'qwerty'
-    re.compile(r'^[asdfgh]{5,}$', re.IGNORECASE),                   # 'asdfgh'
-    re.compile(r'^[zxcvbn]{5,}$', re.IGNORECASE),                   # 'zxcvbn'
-    re.compile(r'^test\s*\d*$', re.IGNORECASE),                     # 'test', 'test123'
-    re.compile(r'^[!@#$%^&*()_+\-=\[\]{};:\'",.<>?/\\|`~\s]+$'),  # Только символы
-]
+# Паттерны мусорного текста — одна альтернация, один проход regex-движка.
+# IGNORECASE только на буквенных ветках (?i:...): повтор символа регистрозависим.
+_GARBAGE_RE = re.compile(
+    r'^(?:'
+    r'(?i:[a-z]{1,3})'                                   # 'a', 'ab'
+    r'|(.)\1{3,}'                                        # 'aaaa', '1111'
+    r'|(?i:[qwerty]{5,})'                                # 'qwerty'
+    r'|(?i:[asdfgh]{5,})'                                # 'asdfgh'
+    r'|(?i:[zxcvbn]{5,})'                                # 'zxcvbn'
+    r'|(?i:test\s*\d*)'                                  # 'test', 'test123'
+    r'|[!@#$%^&*()_+\-=\[\]{};:\'",.<>?/\\|`~\s]+'         # Только символы
+    r')$'
+)
 
 
 def is_garbage_text(text: str) -> bool:
     """Проверяет, является ли текст «мусорным»."""
     cleaned = text.strip()
-    if len(cleaned) < 2:
-        return True
-    for pattern in _GARBAGE_PATTERNS:
-        if pattern.match(cleaned):
-            return True
-    return False
+    return len(cleaned) < 2 or _GARBAGE_RE.match(cleaned) is not None
 
 
 # ═══════════════════════════════════════════════════════════════════════════
@@ -61,6 +59,9 @@ SQL_PATTERN = re.compile(
     r';\s*(DROP|DELETE|UPDATE|INSERT))\b',
     re.IGNORECASE,
 )
+# XSS + SQL одним проходом: одна альтернация вместо двух search()
+_INJECTION_RE = re.compile(f"{XSS_PATTERN.pattern}|{SQL_PATTERN.pattern}", re.IGNORECASE)
+_INJECTION_MIN_LEN = 4
 
 
 def contains_injection(text: str) -> bool:
@@ -69,9 +70,10 @@ def contains_injection(text: str) -> bool:
     Returns:
         True если найден опасный паттерн.
     """
-    if not text:
+    # Короче самого короткого срабатывания (``onx=``) — regex не запускаем
+    if len(text) < _INJECTION_MIN_LEN:
         return False
-    return bool(XSS_PATTERN.search(text) or SQL_PATTERN.search(text))
+    return _INJECTION_RE.search(text) is not None
 
 
 def sanitize_input(text: str) -> str:
@@ -300,16 +302,54 @@ def is_valid_bin(bin_str: str) -> bool:
 #  PII MASKING (маскировка персональных данных в логах)
 # ═══════════════════════════════════════════════════════════════════════════
 
-# Паттерны для PII
-_PHONE_PATTERN = re.compile(
+# Паттерны для PII (исходники отдельно — из них собирается общий _PII_RE)
+_PHONE_SRC = (
     r'(\+?\d{1,3}[\s\-]?)?'          # код страны
     r'(\(?\d{2,4}\)?[\s\-]?)?'       # код оператора
     r'\d{3}[\s\-]?\d{2}[\s\-]?\d{2}' # номер
 )
-_EMAIL_PATTERN = re.compile(
-    r'[a-zA-Z0-9._%+\-]+@[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,}'
+_EMAIL_SRC = r'[a-zA-Z0-9._%+\-]+@[a-zA-Z0-9.\-]+\.[a-zA-Z]{2,}'
+_BIN_LOG_SRC = r'\b\d{12}\b'
+_PHONE_PATTERN = re.compile(_PHONE_SRC)
+_EMAIL_PATTERN = re.compile(_EMAIL_SRC)
+_BIN_LOG_PATTERN = re.compile(_BIN_LOG_SRC)
+
+# Один проход по строке: ветка определяется по m.lastgroup.
+# БИН стоит раньше телефона — иначе 12 цифр целиком съедает телефонный паттерн.
+_PII_RE = re.compile(
+    f"(?P<email>{_EMAIL_SRC})|(?P<bin>{_BIN_LOG_SRC})|(?P<phone>{_PHONE_SRC})"
 )
-_BIN_LOG_PATTERN = re.compile(r'\b\d{12}\b')
+# Без БИН-ветки — когда в строке меньше 12 цифр, 12-значного числа там быть не может
+_PII_RE_LIGHT = re.compile(f"(?P<email>{_EMAIL_SRC})|(?P<phone>{_PHONE_SRC})")
+_PII_MIN_LEN = 6         # 'a@b.cc' — самое короткое совпадение
+_PHONE_MIN_DIGITS = 7
+_BIN_DIGITS = 12
+_NON_DIGIT_RE = re.compile(r'\D')
+
+
+# Маскируем email: оставляем 1-ю букву + домен
+def _mask_email(email: str) -> str:
+    local, domain = email.split("@", 1)
+    return f"{local[0]}***@{domain}"
+
+
+# Маскируем телефон: оставляем последние 2 цифры
+def _mask_phone(phone: str) -> str:
+    if len(_NON_DIGIT_RE.sub('', phone)) < 7:
+        return phone
+    return phone[:-4] + "**" + phone[-2:]
+
+
+# Маскируем БИН/ИИН: оставляем первые 4 и последние 4
+def _mask_bin(num: str) -> str:
+    return f"{num[:4]}****{num[-4:]}"
+
+
+_PII_MASKERS = {"email": _mask_email, "phone": _mask_phone, "bin": _mask_bin}
+
+
+def _mask_pii_match(match: re.Match) -> str:
+    return _PII_MASKERS[match.lastgroup](match.group())
 
 
 def mask_pii(text: str) -> str:
@@ -322,29 +362,14 @@ def mask_pii(text: str) -> str:
     Returns:
         Текст с замаскированными PII.
     """
-    # Маскируем email: оставляем 1-ю букву + домен
-    def _mask_email(match: re.Match) -> str:
-        email = match.group()
-        local, domain = email.split("@", 1)
-        return f"{local[0]}***@{domain}"
-
-    # Маскируем телефон: оставляем последние 2 цифры
-    def _mask_phone(match: re.Match) -> str:
-        phone = match.group()
-        digits = re.sub(r'\D', '', phone)
-        if len(digits) < 7:
-            return phone
-        return phone[:-4] + "**" + phone[-2:]
-
-    # Маскируем БИН/ИИН: оставляем первые 4 и последние 4
-    def _mask_bin(match: re.Match) -> str:
-        num = match.group()
-        return f"{num[:4]}****{num[-4:]}"
-
-    result = _EMAIL_PATTERN.sub(_mask_email, text)
-    result = _PHONE_PATTERN.sub(_mask_phone, result)
-    result = _BIN_LOG_PATTERN.sub(_mask_bin, result)
-    return result
+    if len(text) < _PII_MIN_LEN:
+        return text
+    # Подсчёт цифр — C-цикл; большинство строк лога отсекается без regex
+    digits = sum(map(str.isdigit, text))
+    if digits < _PHONE_MIN_DIGITS and "@" not in text:
+        return text
+    pattern = _PII_RE if digits >= _BIN_DIGITS else _PII_RE_LIGHT
+    return pattern.sub(_mask_pii_match, text)
 
 
 def check_config_sanity() -> list[str]:
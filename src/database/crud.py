@@ -432,12 +432,27 @@ async def get_due_tasks(limit: int = 50) -> list[ScheduledTaskDTO]:
         return [_to_task_dto(t) for t in result.scalars().all()]
 
 
-async def mark_task_done(task_id: int) -> None:
-    """Помечает задачу как выполненную."""
+async def get_next_run_at() -> datetime | None:
+    """Время ближайшей pending-задачи (None — очередь пуста)."""
+    async with async_session() as session:
+        stmt = select(sa_func.min(ScheduledTask.run_at)).where(
+            ScheduledTask.status == "pending",
+        )
+        run_at = await session.scalar(stmt)
+    if run_at is not None and run_at.tzinfo is None:
+        # SQLite не хранит tzinfo — все даты пишутся в UTC
+        run_at = run_at.replace(tzinfo=timezone.utc)
+    return run_at
+
+
+async def mark_tasks_done(task_ids: list[int]) -> None:
+    """Помечает задачи как выполненные (один UPDATE на всю пачку)."""
+    if not task_ids:
+        return
     async with async_session() as session:
         stmt = (
             update(ScheduledTask)
-            .where(ScheduledTask.id == task_id)
+            .where(ScheduledTask.id.in_(task_ids))
             .values(
                 status="done",
                 executed_at=datetime.now(timezone.utc),
@@ -447,19 +462,28 @@ async def mark_task_done(task_id: int) -> None:
         await session.commit()
 
 
-async def mark_task_failed(task_id: int, error: str = "") -> None:
-    """Помечает задачу как проваленную."""
+async def mark_tasks_failed(errors: list[tuple[int, str]]) -> None:
+    """Помечает задачи как проваленные (одна транзакция на всю пачку).
+
+    Args:
+        errors: Пары (task_id, текст ошибки).
+    """
+    if not errors:
+        return
+    now = datetime.now(timezone.utc)
     async with async_session() as session:
-        stmt = (
-            update(ScheduledTask)
-            .where(ScheduledTask.id == task_id)
-            .values(
-                status="failed",
-                executed_at=datetime.now(timezone.utc),
-                error=error[:500] if error else None,
-            )
+        await session.execute(
+            update(ScheduledTask),
+            [
+                {
+                    "id": task_id,
+                    "status": "failed",
+                    "executed_at": now,
+                    "error": error[:500] if error else None,
+                }
+                for task_id, error in errors
+            ],
         )
-        await session.execute(stmt)
         await session.commit()
 
 
@@ -38,6 +38,10 @@ class User(Base):
     last_activity: Mapped[datetime | None] = mapped_column(
         DateTime(timezone=True), nullable=True, index=True,
     )
+    # Последнее re-engagement сообщение (Retention Loop, cooldown)
+    last_reengaged_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True), nullable=True,
+    )
     created_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
         default=lambda: datetime.now(timezone.utc),
@@ -114,6 +118,8 @@ class ScheduledTask(Base):
     )
     error: Mapped[str | None] = mapped_column(Text, nullable=True)
 
+    # Покрывает get_due_tasks / get_next_run_at (status=pending, run_at <= now);
+    # init_db() досоздаёт его в старых БД
     __table_args__ = (
         Index("ix_scheduled_tasks_status_run_at", "status", "run_at"),
     )
@@ -349,6 +355,7 @@ async def init_db() -> None:
         ("users", "company_size", "VARCHAR(50)"),
         ("users", "company_stage", "VARCHAR(50)"),
         ("users", "bot_blocked", "BOOLEAN DEFAULT 0"),
+        ("users", "last_reengaged_at", "DATETIME"),
     ]
     async with engine.begin() as conn:
         for table, column, col_type in _migrations:
@@ -359,3 +366,14 @@ async def init_db() -> None:
                 _log.info("Migration applied: %s.%s", table, column)
             except Exception:
                 pass  # колонка уже существует
+
+    # Индексы для таблиц, созданных до их появления в моделях.
+    # create_all не добавляет индексы в уже существующие таблицы.
+    _indexes = [
+        index
+        for index in ScheduledTask.__table__.indexes
+        if index.name == "ix_scheduled_tasks_status_run_at"
+    ]
+    async with engine.begin() as conn:
+        for index in _indexes:
+            await conn.run_sync(index.create, checkfirst=True)
@@ -7,6 +7,15 @@ import pytest
 import pytest_asyncio
 
 
+# ── Security audit cache ─────────────────────────────────────────────────
+
+@pytest.fixture(autouse=True)
+def _isolated_audit_cache(tmp_path, monkeypatch):
+    """Кэш аудита безопасности — во временной папке, а не в data/cache рабочего дерева."""
+    from src.bot.utils import security_audit
+    monkeypatch.setattr(security_audit, "AUDIT_CACHE_DIR", tmp_path / "audit_cache")
+
+
 # ── Mock Bot ─────────────────────────────────────────────────────────────
 
 @pytest.fixture
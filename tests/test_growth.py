@@ -484,28 +484,46 @@ class TestRetentionLoop:
 
     @pytest.mark.asyncio
     async def test_generate_reengage_message(self):
-        from src.bot.utils.retention import _generate_reengage_message
+        from src.bot.utils.retention import _generate_reengage_messages
 
-        # Без AI и google — fallback
-        msg = await _generate_reengage_message(12345, "Test User")
-        assert msg is not None
-        assert "Давно не виделись" in msg or "Test User" in msg
+        # Без интересов — fallback без AI
+        [msg] = await _generate_reengage_messages([("Test User", [])])
+        assert "Давно не виделись" in msg
+        assert "Test User" in msg
 
     @pytest.mark.asyncio
     async def test_reengage_with_interests(self):
         """С AI mock генерирует персонализированное сообщение."""
-        from src.bot.utils.retention import _generate_reengage_message
+        from src.bot.utils.retention import _generate_reengage_messages, _load_interests
 
         mock_google = AsyncMock()
         mock_google.get_recent_leads = AsyncMock(return_value=[
             {"user_id": "100001", "guide": "it_law"},
         ])
+        interests = (await _load_interests(mock_google)).get("100001", [])
+        assert interests == ["it_law"]
 
         with patch("src.bot.utils.ai_client.ask_marketing", new_callable=AsyncMock) as mock_ai:
             mock_ai.return_value = "Появились обновления по IT-праву!"
-            msg = await _generate_reengage_message(100001, "Alice", mock_google)
-            assert msg is not None
-            assert "Alice" in msg or "обновлен" in msg.lower() or "Давно" in msg
+            [msg] = await _generate_reengage_messages([("Alice", interests)])
+            assert msg == "👋 Alice! Появились обновления по IT-праву!"
+
+    @pytest.mark.asyncio
+    async def test_load_interests_single_fetch(self):
+        """Интересы индексируются по user_id за один запрос к Sheets."""
+        from src.bot.utils.retention import _load_interests
+
+        mock_google = AsyncMock()
+        mock_google.get_recent_leads = AsyncMock(return_value=[
+            {"user_id": "100001", "guide": "it_law"},
+            {"user_id": 100002, "selected_guide": "tax"},
+            {"user_id": "100001", "guide": "labor"},
+            {"user_id": "100003", "guide": ""},
+        ])
+
+        index = await _load_interests(mock_google)
+        mock_google.get_recent_leads.assert_awaited_once()
+        assert index == {"100001": ["it_law", "labor"], "100002": ["tax"]}
 
     def test_sleep_threshold(self):
         from src.bot.utils.retention import SLEEP_THRESHOLD_DAYS
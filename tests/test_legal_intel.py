@@ -323,6 +323,162 @@ class TestTicketManager:
         t = get_ticket(ticket["id"])
         assert t["status"] == "in_progress"
 
+    @pytest.mark.asyncio
+    async def test_open_and_overdue_index(self):
+        from src.bot.utils import ticket_manager as tm
+
+        with patch.object(tm, "_tickets", {}), patch.object(tm, "_open_by_deadline", []):
+            late = await tm.create_ticket(title="Поздний", assignee="A", deadline_days=10)
+            early = await tm.create_ticket(title="Ранний", assignee="B", deadline_days=2)
+            overdue = await tm.create_ticket(title="Просрочен", assignee="A", deadline_days=-1)
+
+            assert [t["id"] for t in tm.get_open_tickets()] == [overdue["id"], early["id"], late["id"]]
+            assert [t["id"] for t in tm.get_open_tickets("A")] == [overdue["id"], late["id"]]
+            assert [t["id"] for t in tm.get_overdue_tickets()] == [overdue["id"]]
+
+            tm.update_ticket_status(overdue["id"], "review")
+            assert tm.get_overdue_tickets() == []
+            tm.update_ticket_status(early["id"], "done")
+            assert [t["id"] for t in tm.get_open_tickets()] == [overdue["id"], late["id"]]
+            tm.update_ticket_status(early["id"], "in_progress")
+            assert len(tm.get_open_tickets()) == 3
+
+    @pytest.mark.asyncio
+    async def test_closed_tickets_evicted_over_limit(self):
+        from collections import deque
+        from src.bot.utils import ticket_manager as tm
+
+        with patch.object(tm, "_tickets", {}), patch.object(tm, "_open_by_deadline", []), \
+             patch.object(tm, "_closed_ticket_ids", deque()), patch.object(tm, "_CLOSED_TICKETS_MAX", 2):
+            ids = [(await tm.create_ticket(title=f"Задача {i}"))["id"] for i in range(4)]
+            tm.update_ticket_status(ids[0], "done")
+            tm.update_ticket_status(ids[1], "cancelled")
+            tm.update_ticket_status(ids[0], "in_progress")  # переоткрыт — не вытесняется
+            tm.update_ticket_status(ids[2], "done")
+            assert set(tm._tickets) == set(ids)
+            tm.update_ticket_status(ids[3], "done")
+            assert ids[1] not in tm._tickets
+            assert tm.get_ticket(ids[0])["status"] == "in_progress"
+
+    @pytest.mark.asyncio
+    async def test_ticket_rows_written_in_one_batch(self):
+        from src.bot.utils import ticket_manager as tm
+
+        google = MagicMock()
+        ws = google._get_spreadsheet.return_value.worksheet.return_value
+        await tm.create_ticket(title="Пачка 1", google=google)
+        await tm.create_ticket(title="Пачка 2", google=google)
+        ws.append_rows.assert_not_called()
+
+        with patch.object(tm, "_tasks_ws", None):
+            await tm.flush_ticket_writes(google)
+        ws.append_rows.assert_called_once()
+        rows = ws.append_rows.call_args.args[0]
+        assert [r[1] for r in rows] == ["Пачка 1", "Пачка 2"]
+        assert tm._ticket_queue is None
+
+    @pytest.mark.asyncio
+    async def test_flush_waits_for_in_flight_batch(self):
+        import time as _time
+        from src.bot.utils import ticket_manager as tm
+
+        written = []
+        google = MagicMock()
+        ws = MagicMock()
+        ws.append_rows.side_effect = lambda rows, **_kw: written.extend(r[1] for r in rows)
+
+        def _slow_worksheet(_name):
+            _time.sleep(0.05)  # резолв листа ещё идёт, когда бот останавливается
+            return ws
+
+        google._get_spreadsheet.return_value.worksheet.side_effect = _slow_worksheet
+        with patch.object(tm, "_tasks_ws", None), patch.object(tm, "_TICKET_FLUSH_INTERVAL", 0):
+            await tm.create_ticket(title="Первый", google=google)
+            await tm.create_ticket(title="Второй", google=google)
+            await asyncio.sleep(0.01)  # flusher забрал пачку и пишет её
+            await tm.create_ticket(title="Третий", google=google)
+            await tm.flush_ticket_writes(google)
+        assert written == ["Первый", "Второй", "Третий"]
+
+    @pytest.mark.asyncio
+    async def test_tasks_worksheet_cached_until_error(self):
+        from src.bot.utils import ticket_manager as tm
+
+        google = MagicMock()
+        sp = google._get_spreadsheet.return_value
+        ws = sp.worksheet.return_value
+        with patch.object(tm, "_tasks_ws", None):
+            await tm._write_ticket_batch(google, [["T-1"]])
+            await tm._write_ticket_batch(google, [["T-2"]])
+            assert sp.worksheet.call_count == 1
+            assert ws.append_rows.call_count == 2
+
+            ws.append_rows.side_effect = RuntimeError("APIError")
+            await tm._write_ticket_batch(google, [["T-3"]])
+            assert tm._tasks_ws is None
+
+    @pytest.mark.asyncio
+    async def test_load_tickets_from_sheets(self):
+        from src.bot.utils import ticket_manager as tm
+
+        ws = MagicMock()
+        ws.get_all_values.return_value = [
+            list(tm._TASKS_HEADER),
+            ["T-0041", "Договор", "", "Юрист", "🟠 Высокий", "new", "77",
+             "2026-01-10 09:30", "2026-01-17"],
+            ["T-0007", "Закрыт", "", "", "🟡 Обычный", "done", "", "2026-01-01 10:00", "2026-01-08"],
+            ["мусор"],
+        ]
+        with patch.object(tm, "_tickets", {}), patch.object(tm, "_open_by_deadline", []), \
+             patch.object(tm, "_ticket_counter", 3), patch.object(tm, "_tasks_ws", ws):
+            assert await tm.load_tickets_from_sheets(MagicMock()) == 2
+            ticket = tm.get_ticket("T-0041")
+            assert ticket["priority"] == "high"
+            assert ticket["user_id"] == 77
+            assert [t["id"] for t in tm.get_open_tickets()] == ["T-0041"]
+            assert tm._gen_ticket_id() == "T-0042"
+
+    @pytest.mark.asyncio
+    async def test_status_survives_reload_from_sheets(self):
+        from collections import deque
+        from src.bot.utils import ticket_manager as tm
+
+        class _FakeTasksSheet:
+            def __init__(self):
+                self.rows = [list(tm._TASKS_HEADER)]
+
+            def append_rows(self, rows, **_kw):
+                self.rows.extend(list(r) for r in rows)
+
+            def col_values(self, col):
+                return [r[col - 1] for r in self.rows]
+
+            def batch_update(self, cells, **_kw):
+                for cell in cells:
+                    row_num = int(cell["range"][len(tm._TASKS_STATUS_COL):])
+                    self.rows[row_num - 1][5] = cell["values"][0][0]
+
+            def get_all_values(self):
+                return [list(r) for r in self.rows]
+
+        sheet = _FakeTasksSheet()
+        google = MagicMock()
+        state = dict(_tickets={}, _open_by_deadline=[], _closed_ticket_ids=deque())
+        with patch.object(tm, "_tasks_ws", sheet), patch.multiple(tm, **state):
+            closed = await tm.create_ticket(title="Закрыт", deadline_days=-3, google=google)
+            kept = await tm.create_ticket(title="Открыт", deadline_days=2, google=google)
+            tm.update_ticket_status(closed["id"], "done", google=google)
+            await tm.flush_ticket_writes(google)
+
+        state = dict(_tickets={}, _open_by_deadline=[], _closed_ticket_ids=deque())
+        with patch.object(tm, "_tasks_ws", sheet), patch.multiple(tm, **state):
+            assert await tm.load_tickets_from_sheets(google) == 2
+            assert tm.get_ticket(closed["id"])["status"] == "done"
+            assert [t["id"] for t in tm.get_open_tickets()] == [kept["id"]]
+            assert tm.get_overdue_tickets() == []
+            # Дедлайн восстанавливается с точностью до минуты, а не на полночь
+            assert abs(tm.get_ticket(kept["id"])["deadline_epoch"] - kept["deadline_epoch"]) < 60
+
     def test_format_ticket(self):
         from src.bot.utils.ticket_manager import format_ticket
         ticket = {
@@ -434,6 +590,31 @@ class TestDeadlineAssistant:
         assert reminder["days"] == 30
         mock_scheduler.add_job.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_fired_reminders_pruned(self):
+        from src.bot.utils import ticket_manager as tm
+
+        fired = {"id": "r_old", "user_id": 1, "fire_at": "2000-01-01T00:00:00+00:00"}
+        with patch.object(tm, "_reminders", [fired]), patch.object(tm, "_REMINDERS_MAX", 1):
+            first = await tm.schedule_reminder(MagicMock(), AsyncMock(), 1, "Первое", 1)
+            second = await tm.schedule_reminder(MagicMock(), AsyncMock(), 1, "Второе", 1)
+            assert tm._reminders == [first, second]
+            assert first["id"] != second["id"]
+
+    @pytest.mark.asyncio
+    async def test_reminder_job_uses_module_coroutine(self):
+        from src.bot.utils import ticket_manager as tm
+
+        scheduler = MagicMock()
+        bot = AsyncMock()
+        await tm.schedule_reminder(scheduler, bot, 4242, "Продлить лицензию", 3, admin_notify=False)
+        call = scheduler.add_job.call_args
+        assert call.args[0] is tm._send_reminder
+        await call.args[0](*call.kwargs["args"])
+        bot.send_message.assert_awaited_once()
+        assert bot.send_message.call_args.args[0] == 4242
+        assert "Продлить лицензию" in bot.send_message.call_args.args[1]
+
     def test_get_user_reminders(self):
         from src.bot.utils.ticket_manager import get_user_reminders
         # Должны быть reminder-ы от предыдущего теста
@@ -299,6 +299,38 @@ class TestStoriesPublisher:
         assert result is True
         mock_bot.send_photo.assert_called_once()
 
+    @pytest.mark.asyncio
+    async def test_auto_stories_check_concurrent(self):
+        from src.bot.utils import stories_publisher
+
+        articles = [
+            {"title": f"Статья {i}", "status": "published", "cover_url": "https://x/c.jpg"}
+            for i in range(6)
+        ]
+        articles.append({"title": "Старая", "status": "published", "story_sent": "true"})
+        articles.append({"title": "", "status": "published"})
+        google = MagicMock()
+        google.get_articles_list = AsyncMock(return_value=articles)
+
+        active = 0
+        peak = 0
+
+        async def fake_publish(**kwargs):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+            if kwargs["title"] == "Статья 0":
+                raise RuntimeError("boom")
+            return True
+
+        with patch.object(stories_publisher, "publish_story", side_effect=fake_publish):
+            stats = await stories_publisher.auto_stories_check(bot=AsyncMock(), google=google)
+
+        assert stats == {"checked": 8, "published": 5}
+        assert 1 < peak <= stories_publisher._STORIES_CONCURRENCY
+
 
 # ═══════════════════════════════════════════════════════════════════════════
 #  7. LIVE SUPPORT
@@ -371,6 +403,72 @@ class TestTimezoneManager:
         tz = timezone_from_location(55.75, 37.62)
         assert tz == "Europe/Moscow"
 
+    def test_timezone_from_location_west_kazakhstan(self):
+        from src.bot.utils.timezone_manager import timezone_from_location
+        # Уральск и Атырау — свои зоны, а не общий «Актау»
+        assert timezone_from_location(51.20, 51.40) == "Asia/Oral"
+        assert timezone_from_location(47.10, 51.90) == "Asia/Atyrau"
+        # Лондон — не Берлин, хоть и внутри «европейского прямоугольника»
+        assert timezone_from_location(51.50, -0.10) == "Europe/London"
+        # Далеко от опорных городов — оценка по долготе
+        assert timezone_from_location(-33.90, 18.40) == "Europe/Berlin"
+
+    def test_timezone_from_location_border_cities(self):
+        from zoneinfo import ZoneInfo
+
+        from src.bot.utils.timezone_manager import timezone_from_location
+        cases = {
+            # Юг России — UTC+3, а не Закавказье и не Атырау
+            "Краснодар": (45.03, 38.97, "Europe/Moscow"),
+            "Сочи": (43.60, 39.72, "Europe/Moscow"),
+            "Новороссийск": (44.72, 37.77, "Europe/Moscow"),
+            "Таганрог": (47.22, 38.90, "Europe/Moscow"),
+            "Элиста": (46.31, 44.26, "Europe/Moscow"),
+            "Владикавказ": (43.02, 44.68, "Europe/Moscow"),
+            "Волгоград": (48.70, 44.50, "Europe/Volgograd"),
+            "Волжский": (48.79, 44.75, "Europe/Volgograd"),
+            "Энгельс": (51.48, 46.11, "Europe/Saratov"),
+            # Беларусь и Прибалтика
+            "Минск": (53.90, 27.56, "Europe/Minsk"),
+            "Могилёв": (53.90, 30.33, "Europe/Minsk"),
+            "Кобрин": (52.21, 24.36, "Europe/Minsk"),
+            "Вильнюс": (54.69, 25.28, "Europe/Vilnius"),
+            "Тарту": (58.38, 26.72, "Europe/Tallinn"),
+            "Ольштын": (53.78, 20.49, "Europe/Warsaw"),
+            # Западная Европа
+            "Амстердам": (52.37, 4.89, "Europe/Amsterdam"),
+            "Роттердам": (51.92, 4.48, "Europe/Amsterdam"),
+            "Барселона": (41.39, 2.17, "Europe/Madrid"),
+            "Валенсия": (39.47, -0.38, "Europe/Madrid"),
+            "Уэльва": (37.26, -6.95, "Europe/Madrid"),
+            "Лиссабон": (38.72, -9.14, "Europe/Lisbon"),
+            "Брага": (41.55, -8.42, "Europe/Lisbon"),
+            "Корк": (51.90, -8.47, "Europe/Dublin"),
+        }
+        winter, summer = datetime(2026, 1, 15, 12), datetime(2026, 7, 15, 12)
+        for city, (lat, lon, expected) in cases.items():
+            tz = timezone_from_location(lat, lon)
+            for moment in (winter, summer):
+                assert ZoneInfo(tz).utcoffset(moment) == ZoneInfo(expected).utcoffset(moment), city
+
+    def test_timezone_from_location_atlantic_fallback(self):
+        from src.bot.utils.timezone_manager import timezone_from_location
+        # Открытый океан западнее Португалии — UTC-1, а не DEFAULT_TZ
+        assert timezone_from_location(40.0, -20.0) == "Atlantic/Azores"
+
+    def test_zoneinfo_cached_by_name(self):
+        from src.bot.utils.timezone_manager import (
+            _user_timezones,
+            get_user_zoneinfo,
+            set_user_timezone,
+        )
+        set_user_timezone(444, "Asia/Dubai")
+        set_user_timezone(445, "Asia/Dubai")
+        assert get_user_zoneinfo(444) is get_user_zoneinfo(445)
+        assert str(get_user_zoneinfo(444)) == "Asia/Dubai"
+        _user_timezones.pop(444)
+        assert str(get_user_zoneinfo(444)) == "Asia/Almaty"
+
     def test_local_time(self):
         from src.bot.utils.timezone_manager import (
             get_user_local_time,
@@ -0,0 +1,75 @@
+"""Тесты генерации промо-материалов для гайдов."""
+
+from src.bot.utils.promo import _esc, build_guide_promo, build_guide_promos
+
+
+GUIDES = [
+    {
+        "id": "taxes",
+        "title": "Налоги для IT <2024>",
+        "description": "Льготы & режимы",
+        "highlights": "Ставки\nЛьготы\nЧек-лист",
+        "category": "Налоги",
+        "pages": 12,
+    },
+    {
+        "id": "labor",
+        "title": "Трудовые споры",
+        "highlights": "Увольнение, аттестация, штрафы",
+        "category": "Трудовое право",
+    },
+]
+
+
+class TestEscape:
+    """Тесты HTML-экранирования."""
+
+    def test_plain_text_unchanged(self):
+        assert _esc("Налоги для IT") == "Налоги для IT"
+
+    def test_matches_html_escape(self):
+        import html
+        raw = "<a href=\"x\">'M&A'</a>"
+        assert _esc(raw) == html.escape(raw)
+
+    def test_non_string(self):
+        assert _esc(12) == "12"
+
+
+class TestBuildGuidePromo:
+    """Тесты одиночной и пакетной генерации."""
+
+    def test_deep_links(self):
+        promo = build_guide_promo(GUIDES[0], "solis_bot", utm_source="channel")
+        assert promo["deep_link"] == "https://t.me/solis_bot?start=guide_taxes--channel"
+        assert "guide_taxes--linkedin" in promo["linkedin_post"]
+        assert "guide_taxes--email" in promo["email_snippet"]
+        assert "&lt;2024&gt;" in promo["channel_post"]
+
+    def test_batch_matches_single(self):
+        downloads = {"taxes": 42}
+        batch = build_guide_promos(
+            GUIDES, "solis_bot", utm_source="email", downloads=downloads,
+        )
+        assert set(batch) == {"taxes", "labor"}
+        for guide in GUIDES:
+            single = build_guide_promo(
+                guide, "solis_bot",
+                utm_source="email",
+                download_count=downloads.get(guide["id"], 0),
+            )
+            assert batch[guide["id"]] == single
+
+    def test_empty_sheet_values_are_omitted(self):
+        # get_all_records отдаёт пустые числовые ячейки как 0, а пропуски — как None
+        guide = {
+            "id": "empty",
+            "title": "Пустой гайд",
+            "description": None,
+            "preview": None,
+            "pages": 0,
+        }
+        promo = build_guide_promo(guide, "solis_bot")
+        for key in ("channel_post", "article_block", "telegraph_cta", "email_snippet"):
+            assert "None" not in promo[key], key
+            assert "0 стр" not in promo[key], key
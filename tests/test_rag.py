@@ -4,7 +4,13 @@ from unittest.mock import AsyncMock
 
 import pytest
 
-from src.bot.utils.rag import find_relevant_context, _tokenize, _score_entry
+from src.bot.utils.rag import (
+    _build_index,
+    _score_index,
+    _tokenize,
+    _tokenize_query,
+    find_relevant_context,
+)
 
 
 class TestTokenize:
@@ -27,19 +33,32 @@ class TestTokenize:
     def test_empty_string(self):
         assert _tokenize("") == set()
 
+    @pytest.mark.parametrize("query", [
+        "аттестация увольнение",
+        "Что такое ТОО и как его открыть",
+        "ст. 52 ТК РК — увольнение?",
+        "IT-компания, налоги 2024",
+    ])
+    def test_query_tokenize_matches_tokenize(self, query):
+        assert _tokenize_query(query) == _tokenize(query)
 
-class TestScoreEntry:
+
+class TestScoreIndex:
     """Тесты скоринга."""
 
     def test_matching_score(self):
+        index = _build_index([("Процедура увольнение и аттестация работника по трудовой", "запись")])
         query_tokens = _tokenize("увольнение аттестация трудовой")
-        score = _score_entry(query_tokens, "Процедура увольнение и аттестация работника по трудовой")
-        assert score >= 1
+        assert _score_index(index, query_tokens, set()) == [(6, "запись")]
+
+    def test_extra_tokens_weigh_less(self):
+        index = _build_index([("увольнение работника", "a"), ("аттестация работника", "b")])
+        scored = _score_index(index, {"увольнение"}, {"аттестация"})
+        assert scored == [(2, "a"), (1, "b")]
 
     def test_no_match(self):
-        query_tokens = _tokenize("налоговый вычет")
-        score = _score_entry(query_tokens, "Регистрация ТОО")
-        assert score == 0
+        index = _build_index([("Регистрация ТОО", "запись")])
+        assert _score_index(index, _tokenize("налоговый вычет"), set()) == []
 
 
 class TestFindRelevantContext:
@@ -86,3 +105,57 @@ class TestFindRelevantContext:
         # Не должен упасть
         result = await find_relevant_context("тест", mock_google, cache)
         assert result == ""
+
+    @pytest.mark.asyncio
+    async def test_data_room_index_refreshes_with_data(self):
+        from src.bot.utils.cache import TTLCache
+
+        mock_google = AsyncMock()
+        mock_google.get_data_room = AsyncMock(return_value=[
+            {"title": "Аттестация сотрудников", "content": "Процедура", "category": "HR"},
+        ])
+        mock_google.get_articles_list = AsyncMock(return_value=[])
+        cache = TTLCache(ttl_seconds=3600)
+
+        assert "Аттестация" in await find_relevant_context("аттестация", mock_google, cache, expand=False)
+        assert "Аттестация" in await find_relevant_context("аттестация", mock_google, cache, expand=False)
+        mock_google.get_data_room.assert_awaited_once()
+
+        # Сброс Data Room сбрасывает и индекс — одна запись кеша
+        mock_google.get_data_room.return_value = [
+            {"title": "Увольнение", "content": "Новая запись", "category": "HR"},
+        ]
+        cache.invalidate("data_room")
+        assert await find_relevant_context("аттестация", mock_google, cache, expand=False) == ""
+
+
+class TestQueryExpansionCache:
+    """Тесты кеша AI query expansion."""
+
+    @pytest.mark.asyncio
+    async def test_repeated_query_hits_cache(self, monkeypatch):
+        from src.bot.utils import ai_client, rag
+
+        rag._EXPANSION_CACHE.clear()
+        ai = AsyncMock()
+        ai.call_gemini = AsyncMock(return_value="трудовой кодекс, увольнение")
+        monkeypatch.setattr(ai_client, "get_orchestrator", lambda: ai)
+
+        first = await rag._expand_query_with_ai("Аттестация")
+        second = await rag._expand_query_with_ai("  аттестация ")
+
+        assert first == second == {"трудовой", "кодекс", "увольнение"}
+        assert ai.call_gemini.await_count == 1
+        rag._EXPANSION_CACHE.clear()
+
+    @pytest.mark.asyncio
+    async def test_failure_not_cached(self, monkeypatch):
+        from src.bot.utils import ai_client, rag
+
+        rag._EXPANSION_CACHE.clear()
+        ai = AsyncMock()
+        ai.call_gemini = AsyncMock(side_effect=RuntimeError("API error"))
+        monkeypatch.setattr(ai_client, "get_orchestrator", lambda: ai)
+
+        assert await rag._expand_query_with_ai("аттестация") == set()
+        assert "аттестация" not in rag._EXPANSION_CACHE
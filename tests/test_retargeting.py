@@ -0,0 +1,124 @@
+"""Тесты retargeting: UTM deep links и Facebook Conversions API."""
+
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.bot.utils import retargeting
+
+
+@pytest.fixture
+def fb_configured(monkeypatch):
+    """Включает Conversions API и подменяет HTTP-отправку."""
+    monkeypatch.setenv("FB_PIXEL_ID", "123")
+    monkeypatch.setenv("FB_ACCESS_TOKEN", "token")
+    retargeting.reload_fb_config()
+    post = AsyncMock(return_value=True)
+    monkeypatch.setattr(retargeting, "_post_fb_events", post)
+    yield post
+    retargeting.reload_fb_config()
+
+
+class TestFacebookEvents:
+    """Тесты пакетной отправки событий."""
+
+    @pytest.mark.asyncio
+    async def test_disabled_without_config(self, monkeypatch):
+        monkeypatch.delenv("FB_PIXEL_ID", raising=False)
+        monkeypatch.delenv("FB_ACCESS_TOKEN", raising=False)
+        retargeting.reload_fb_config()
+        assert await retargeting.send_fb_event("Lead", email="a@b.kz") is False
+
+    @pytest.mark.asyncio
+    async def test_events_sent_in_one_batch(self, fb_configured):
+        for i in range(5):
+            assert await retargeting.send_fb_event(
+                "Lead", email=f"user{i}@mail.kz", guide_id="taxes",
+            )
+        await retargeting.flush_fb_events()
+
+        fb_configured.assert_awaited_once()
+        events = fb_configured.await_args.args[0]
+        assert len(events) == 5
+        assert events[0]["custom_data"]["content_ids"] == ["taxes"]
+        assert events[0]["user_data"]["em"] == [
+            retargeting._hash_for_fb("user0@mail.kz"),
+        ]
+
+    @pytest.mark.asyncio
+    async def test_flush_keeps_events_collected_by_flusher(self, fb_configured):
+        import asyncio
+
+        for i in range(3):
+            await retargeting.send_fb_event("Schedule", user_id=i + 1)
+            await asyncio.sleep(0)
+        await retargeting.flush_fb_events()
+
+        sent = [e for call in fb_configured.await_args_list for e in call.args[0]]
+        assert len(sent) == 3
+
+    @pytest.mark.asyncio
+    async def test_flush_does_not_abort_in_flight_post(self, fb_configured, monkeypatch):
+        import asyncio
+
+        monkeypatch.setattr(retargeting, "_FB_MAX_LINGER", 0)
+        sent: list[dict] = []
+
+        async def _slow_post(events):
+            await asyncio.sleep(0.05)  # запрос ещё идёт, когда бот останавливается
+            sent.extend(events)
+            return True
+
+        fb_configured.side_effect = _slow_post
+        await retargeting.send_fb_event("Lead", user_id=1)
+        await asyncio.sleep(0.01)
+        await retargeting.send_fb_event("Lead", user_id=2)
+        await retargeting.flush_fb_events()
+
+        assert [e["user_data"]["external_id"] for e in sent] == [
+            [retargeting._hash_for_fb("1")], [retargeting._hash_for_fb("2")],
+        ]
+
+
+class TestAudienceCSV:
+    """Тесты выгрузки аудиторий."""
+
+    EMAILS = {" B@Mail.kz", "a@mail.kz "}
+
+    def test_plain_csv(self):
+        assert retargeting.build_audience_csv(self.EMAILS) == "email\nb@mail.kz\na@mail.kz"
+
+    def test_csv_to_file_matches_string(self, tmp_path):
+        for hashed, expected in (
+            (False, retargeting.build_audience_csv(self.EMAILS)),
+            (True, retargeting.build_audience_csv_hashed(self.EMAILS)),
+        ):
+            path = tmp_path / f"audience_{hashed}.csv"
+            retargeting.build_audience_csv_to_file(self.EMAILS, path, hashed=hashed)
+            assert path.read_text(encoding="utf-8") == expected + "\n"
+
+
+class TestDeepLinks:
+    """Тесты генерации UTM deep links."""
+
+    def test_full_utm(self):
+        link = retargeting.make_deep_link(
+            "guide_taxes", source="email", medium="newsletter",
+            campaign="feb2026", bot_username="SolisBot",
+        )
+        assert link == (
+            "https://t.me/SolisBot?start=guide_taxes"
+            "--src_email--med_newsletter--cmp_feb2026"
+        )
+
+    def test_payload_only(self):
+        link = retargeting.make_deep_link("start", bot_username="SolisBot")
+        assert link == "https://t.me/SolisBot?start=start"
+
+    def test_cache_reset_on_username_change(self, monkeypatch):
+        monkeypatch.setattr(retargeting, "_bot_username", "")
+        retargeting.set_bot_username("FirstBot")
+        assert "FirstBot" in retargeting.make_guide_deep_link("taxes")
+        retargeting.set_bot_username("SecondBot")
+        assert "SecondBot" in retargeting.make_guide_deep_link("taxes")
+        retargeting.make_deep_link.cache_clear()
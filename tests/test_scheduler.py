@@ -0,0 +1,89 @@
+"""Тесты TaskRunner: исполнение due-задач из БД."""
+
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.bot.utils.scheduler import TaskRunner
+
+
+def _task(task_id: int, task_type: str = "followup") -> SimpleNamespace:
+    return SimpleNamespace(id=task_id, task_type=task_type, user_id=task_id, payload={})
+
+
+class TestTaskRunner:
+    """Тесты polling-цикла."""
+
+    @pytest.mark.asyncio
+    async def test_tasks_run_concurrently(self):
+        runner = TaskRunner(max_concurrency=3)
+        active = 0
+        peak = 0
+
+        async def handler(task):
+            nonlocal active, peak
+            active += 1
+            peak = max(peak, active)
+            await asyncio.sleep(0.01)
+            active -= 1
+
+        runner.register("followup", handler)
+        tasks = [_task(i) for i in range(10)]
+
+        with patch("src.bot.utils.scheduler.get_due_tasks", AsyncMock(return_value=tasks)), \
+             patch("src.bot.utils.scheduler.mark_tasks_done", AsyncMock()) as done, \
+             patch("src.bot.utils.scheduler.mark_tasks_failed", AsyncMock()) as failed:
+            await runner._poll_and_execute()
+
+        assert peak == 3
+        done.assert_awaited_once()
+        assert sorted(done.await_args.args[0]) == list(range(10))
+        failed.assert_awaited_once_with([])
+
+    @pytest.mark.asyncio
+    async def test_failed_and_unknown_tasks(self):
+        runner = TaskRunner()
+
+        async def handler(task):
+            if task.id == 2:
+                raise RuntimeError("boom")
+
+        runner.register("followup", handler)
+        tasks = [_task(1), _task(2), _task(3, "unknown")]
+
+        with patch("src.bot.utils.scheduler.get_due_tasks", AsyncMock(return_value=tasks)), \
+             patch("src.bot.utils.scheduler.mark_tasks_done", AsyncMock()) as done, \
+             patch("src.bot.utils.scheduler.mark_tasks_failed", AsyncMock()) as failed:
+            await runner._poll_and_execute()
+
+        done.assert_awaited_once_with([1])
+        errors = dict(failed.await_args.args[0])
+        assert errors == {2: "boom", 3: "No handler for 'unknown'"}
+
+    @pytest.mark.asyncio
+    async def test_notify_wakes_sleeping_runner(self):
+        from src.bot.utils.scheduler import notify_task_runner
+
+        runner = TaskRunner(poll_interval=60)
+        handled = asyncio.Event()
+
+        async def handler(task):
+            handled.set()
+
+        runner.register("followup", handler)
+        due = AsyncMock(side_effect=[[], [_task(1)], [], []])
+
+        with patch("src.bot.utils.scheduler.get_due_tasks", due), \
+             patch("src.bot.utils.scheduler.get_next_run_at", AsyncMock(return_value=None)), \
+             patch("src.bot.utils.scheduler.mark_tasks_done", AsyncMock()), \
+             patch("src.bot.utils.scheduler.mark_tasks_failed", AsyncMock()):
+            runner.start()
+            try:
+                await asyncio.sleep(0.05)
+                assert not handled.is_set()
+                notify_task_runner()
+                await asyncio.wait_for(handled.wait(), timeout=1)
+            finally:
+                runner.stop()
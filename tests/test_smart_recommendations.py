@@ -0,0 +1,154 @@
+"""Тесты SmartRecommender: «часто скачивают вместе» + сфера бизнеса."""
+
+import copy
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from src.bot.utils.smart_recommendations import SmartRecommender
+
+_BASIC = {
+    "tax": [("ip", 5), ("labor", 3), ("it", 2)],
+    "ip": [("tax", 5), ("it", 4)],
+    "labor": [("tax", 3)],
+    "it": [("ip", 4), ("tax", 2)],
+    "solo": [("tax", 2)],
+}
+_WEIGHTED = {
+    "tax": [("ip", 7.5), ("labor", 6.0), ("it", 2.4)],
+    "ip": [("tax", 7.5), ("it", 4.8)],
+    "labor": [("tax", 6.0)],
+    "it": [("ip", 4.8), ("tax", 2.4)],
+}
+_SPHERE = {
+    "ip": {"retail": 1, "it": 9},
+    "labor": {"retail": 8, "it": 2},
+    "it": {"it": 5},
+}
+
+
+def _loader(data):
+    # invalidate() очищает словари на месте — отдаём копию, как свежий ответ БД
+    return AsyncMock(side_effect=lambda **_kw: copy.deepcopy(data))
+
+
+@pytest.fixture
+def recommender():
+    rec = SmartRecommender()
+    with patch("src.database.crud.get_codownload_matrix", _loader(_BASIC)), \
+         patch("src.database.crud.get_codownload_matrix_weighted", _loader(_WEIGHTED)), \
+         patch("src.database.crud.get_guide_sphere_affinity", _loader(_SPHERE)):
+        yield rec
+
+
+class TestRecommendation:
+    """Тесты базовой рекомендации."""
+
+    @pytest.mark.asyncio
+    async def test_best_weighted_pair(self, recommender):
+        assert await recommender.get_recommendation("tax") == "ip"
+
+    @pytest.mark.asyncio
+    async def test_exclude(self, recommender):
+        assert await recommender.get_recommendation("tax", exclude={"ip"}) == "labor"
+        assert await recommender.get_recommendation("labor", exclude={"tax"}) is None
+
+    @pytest.mark.asyncio
+    async def test_falls_back_to_basic_matrix(self, recommender):
+        assert await recommender.get_recommendation("solo") == "tax"
+
+    @pytest.mark.asyncio
+    async def test_neighbours_sorted_at_refresh(self, recommender):
+        unsorted = {"a": [("b", 1.0), ("c", 3.0), ("d", 2.0)]}
+        with patch("src.database.crud.get_codownload_matrix_weighted", _loader(unsorted)):
+            assert await recommender.get_recommendation("a", exclude={"c"}) == "d"
+        assert recommender._candidates["a"] == (("c", "d", "b"), (3.0, 2.0, 1.0))
+
+    @pytest.mark.asyncio
+    async def test_unknown_guide(self, recommender):
+        assert await recommender.get_recommendation("unknown") is None
+        stats = recommender.get_stats()
+        assert stats["requests"] == 1
+        assert stats["misses"] == 1
+
+
+class TestPersonalizedRecommendation:
+    """Тесты рекомендации с учётом сферы."""
+
+    @pytest.mark.asyncio
+    async def test_sphere_boost_changes_order(self, recommender):
+        # 7.5 * (1 + 0.1 * 1.5) = 8.625 < 6.0 * (1 + 0.8 * 1.5) = 13.2
+        result = await recommender.get_personalized_recommendation(
+            "tax", 1, user_sphere="retail",
+        )
+        assert result == "labor"
+
+    @pytest.mark.asyncio
+    async def test_sphere_boost_keeps_leader(self, recommender):
+        result = await recommender.get_personalized_recommendation(
+            "tax", 1, user_sphere="it",
+        )
+        assert result == "ip"
+
+    @pytest.mark.asyncio
+    async def test_exclude_and_miss(self, recommender):
+        result = await recommender.get_personalized_recommendation(
+            "tax", 1, user_sphere="retail", exclude={"labor"},
+        )
+        assert result == "ip"
+        result = await recommender.get_personalized_recommendation(
+            "labor", 1, user_sphere="retail", exclude={"tax"},
+        )
+        assert result is None
+        stats = recommender.get_stats()
+        assert stats["personalized_requests"] == 2
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+
+    @pytest.mark.asyncio
+    async def test_top1_precomputed_per_sphere(self, recommender):
+        await recommender.get_recommendation("tax")
+        assert recommender._top1["tax"] == "ip"
+        assert recommender._top1_by_sphere[("tax", "retail")] == "labor"
+        assert recommender._top1_by_sphere[("tax", "")] == "ip"
+
+    @pytest.mark.asyncio
+    async def test_sphere_ratio_precomputed(self, recommender):
+        await recommender.get_recommendation("tax")
+        assert recommender._sphere_ratio[("labor", "retail")] == 0.8
+        assert recommender._sphere_ratio[("it", "it")] == 1.0
+        assert ("it", "retail") not in recommender._sphere_ratio
+
+    @pytest.mark.asyncio
+    async def test_rank_cached_until_refresh(self, recommender):
+        # Топ-1 для retail исключён — идём в полное ранжирование
+        for _ in range(3):
+            result = await recommender.get_personalized_recommendation(
+                "tax", 1, user_sphere="retail", exclude={"labor"},
+            )
+        assert result == "ip"
+        info = recommender._rank.cache_info()
+        assert (info.hits, info.misses) == (2, 1)
+
+        recommender.invalidate()
+        assert recommender._rank.cache_info().currsize == 0
+        result = await recommender.get_personalized_recommendation(
+            "tax", 1, user_sphere="retail", exclude={"labor"},
+        )
+        assert result == "ip"
+        assert recommender._rank.cache_info().misses == 1
+
+
+class TestTopPairs:
+    """Тесты отчётов для админки."""
+
+    @pytest.mark.asyncio
+    async def test_top_pairs_unique(self, recommender):
+        pairs = await recommender.get_top_pairs(limit=3)
+        assert [p[2] for p in pairs] == [5, 4, 3]
+        assert len({frozenset(p[:2]) for p in pairs}) == 3
+
+    @pytest.mark.asyncio
+    async def test_top_weighted_pairs(self, recommender):
+        pairs = await recommender.get_top_weighted_pairs(limit=2)
+        assert [p[2] for p in pairs] == [7.5, 6.0]
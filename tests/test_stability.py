@@ -145,6 +145,97 @@ class TestThrottlingMiddleware:
         assert "total_tracked" in stats
 
 
+class TestRateLimiter:
+    """P2: Тесты скользящего окна и лимитера «дорогих» действий."""
+
+    def test_sliding_window_drops_expired(self):
+        from src.bot.utils.throttle import _SlidingWindow
+        window = _SlidingWindow(max_size=5)
+        for t in (1.0, 2.0, 3.0, 10.0):
+            window.add(t)
+        # Окно 5 с на момент 11: 1,2,3 < 6 — отсекаются, 10 остаётся
+        assert window.count_in_window(11.0, 5) == 1
+        for t in range(11, 20):
+            window.add(float(t))
+        assert window.count_in_window(19.0, 100) == 5
+
+    def test_critical_limiter_blocks_after_rate(self):
+        from src.bot.utils.throttle import CriticalRateLimiter
+        limiter = CriticalRateLimiter(rate=2, period=60)
+        assert limiter.allow(555, "email")
+        assert limiter.allow(555, "email")
+        assert not limiter.allow(555, "email")
+        assert limiter.allow(555, "download")
+        assert limiter.total_blocked == 1
+
+    def test_critical_limiter_lru_cap(self):
+        from src.bot.utils import throttle
+        limiter = throttle.CriticalRateLimiter(rate=5, period=60)
+        with patch.object(throttle, "_CRITICAL_MAX_KEYS", 2):
+            limiter.allow(101, "email")
+            limiter.allow(102, "email")
+            limiter.allow(101, "email")  # 101 снова свежий — вытесняется 102
+            limiter.allow(103, "email")
+        assert list(limiter._windows) == [(101, "email"), (103, "email")]
+
+    @pytest.mark.asyncio
+    async def test_throttle_warning_sent_in_background(self):
+        from src.bot.utils import throttle
+        from aiogram.types import Message
+
+        mw = throttle.ThrottleMiddleware(rate=1, period=60, silent=False)
+        event = MagicMock(spec=Message)
+        event.from_user = MagicMock()
+        event.from_user.id = 778
+        sent = asyncio.Event()
+        event.answer = AsyncMock(side_effect=lambda *a, **kw: sent.set())
+        handler = AsyncMock(return_value="ok")
+
+        assert await mw(handler, event, {}) == "ok"
+        assert await mw(handler, event, {}) is None
+        # Middleware вернулся до отправки — предупреждение уходит фоновой задачей
+        assert not sent.is_set()
+        await asyncio.wait_for(sent.wait(), timeout=1)
+        event.answer.assert_called_once()
+
+    def test_extract_user_id(self):
+        from src.bot.utils.throttle import _extract_user_id
+        from aiogram.types import CallbackQuery, Message, User
+
+        user = User.model_construct(id=42)
+        assert _extract_user_id(Message.model_construct(from_user=user)) == 42
+        assert _extract_user_id(CallbackQuery.model_construct(from_user=user)) == 42
+        assert _extract_user_id(Message.model_construct(from_user=None)) is None
+        assert _extract_user_id(object()) is None
+
+    def test_critical_limiter_admin_bypass(self):
+        from src.bot.utils.throttle import CriticalRateLimiter
+        from src.config import settings
+        limiter = CriticalRateLimiter(rate=1, period=60)
+        assert all(limiter.allow(settings.ADMIN_ID, "email") for _ in range(5))
+
+    @pytest.mark.asyncio
+    async def test_throttle_window_created_lazily_and_cleaned(self):
+        from src.bot.utils import throttle
+        from aiogram.types import Message
+
+        mw = throttle.ThrottleMiddleware(rate=1, period=60, silent=True)
+        event = MagicMock(spec=Message)
+        event.from_user = MagicMock()
+        event.from_user.id = 777
+        handler = AsyncMock(return_value="ok")
+
+        assert mw._windows == {}
+        assert await mw(handler, event, {}) == "ok"
+        assert await mw(handler, event, {}) is None
+        assert list(mw._windows) == [777]
+
+        with patch.object(throttle, "_CLEANUP_MIN_KEYS", 0), \
+             patch.object(throttle.time, "monotonic", return_value=time.monotonic() + 3600):
+            mw.cleanup()
+        assert mw._windows == {}
+
+
 # ═══════════════════════════════════════════════════════════════════════════
 #  P3. Pydantic Validators
 # ═══════════════════════════════════════════════════════════════════════════
@@ -177,6 +268,31 @@ class TestPydanticValidators:
         assert is_garbage_text("test")
         assert not is_garbage_text("Чингис")
 
+    def test_garbage_repeat_is_case_sensitive(self):
+        from src.bot.utils.validators import is_garbage_text
+        assert is_garbage_text("1111")
+        assert is_garbage_text("QWERTY")
+        assert is_garbage_text("TEST 42")
+        assert not is_garbage_text("Анна")
+        assert not is_garbage_text("aAAA")
+
+    def test_contains_injection(self):
+        from src.bot.utils.validators import contains_injection
+        assert contains_injection("<script>alert(1)</script>")
+        assert contains_injection("1 UNION SELECT password FROM users")
+        assert contains_injection("javascript:void")
+        assert not contains_injection("Иван")
+        assert not contains_injection("ab")
+        assert not contains_injection("")
+
+    def test_mask_pii_single_pass(self):
+        from src.bot.utils.validators import mask_pii
+        masked = mask_pii("ИИН 990101300123, email ivan.petrov@mail.kz, тел +7 701 123 45 67")
+        assert "9901****0123" in masked
+        assert "i***@mail.kz" in masked
+        assert masked.endswith("**67")
+        assert mask_pii("без персональных данных") == "без персональных данных"
+
     def test_valid_article(self):
         from src.bot.utils.validators import validate_article
         ok, err = validate_article(
@@ -236,6 +352,17 @@ class TestSentryIntegration:
         from src.bot.utils.sentry_integration import set_user_context
         set_user_context(12345, "testuser")
 
+    def test_capture_uses_bound_sdk(self):
+        from src.bot.utils import sentry_integration
+        sdk = MagicMock()
+        with patch.object(sentry_integration, "_sentry_sdk", sdk):
+            exc = ValueError("test")
+            sentry_integration.capture_exception(exc, user_id=1)
+            sentry_integration.set_user_context(12345, "testuser")
+        sdk.capture_exception.assert_called_once_with(exc)
+        sdk.push_scope.return_value.__enter__.return_value.set_extra.assert_called_once_with("user_id", 1)
+        sdk.set_user.assert_called_once_with({"id": "12345", "username": "testuser"})
+
 
 # ═══════════════════════════════════════════════════════════════════════════
 #  P5. Telemetry & Funnel
@@ -277,6 +404,135 @@ class TestTelemetry:
             track_event_sync(i, "test_event", {"i": i})
         events = get_recent_events(5)
         assert len(events) == 5
+        assert events[-1]["metadata"] == {"i": 9}
+        assert events[-1]["timestamp"].endswith("+00:00")
+
+    @pytest.mark.asyncio
+    async def test_flush_to_sheets(self):
+        from src.bot.utils.telemetry import track_event_sync, flush_to_sheets, _events
+        _events.clear()
+        for i in range(3):
+            track_event_sync(i, "test_event")
+
+        ws = MagicMock()
+        google = MagicMock()
+        google._open_worksheet = MagicMock(return_value=ws)
+        assert await flush_to_sheets(google) == 3
+        rows = ws.append_rows.call_args[0][0]
+        assert [r[1] for r in rows] == ["0", "1", "2"]
+        assert rows[0][0].endswith("+00:00")
+        assert len(_events) == 0
+
+    @pytest.mark.asyncio
+    async def test_events_tracked_during_flush_survive(self):
+        from src.bot.utils.telemetry import track_event_sync, flush_to_sheets, _events
+        _events.clear()
+        for i in range(3):
+            track_event_sync(i, "test_event")
+
+        ws = MagicMock()
+        # Пока идёт запись в Sheets, хендлеры продолжают писать события
+        ws.append_rows = MagicMock(side_effect=lambda rows: track_event_sync(99, "late_event"))
+        google = MagicMock()
+        google._open_worksheet = MagicMock(return_value=ws)
+        assert await flush_to_sheets(google) == 3
+        assert [ev.user_id for ev in _events] == [99]
+
+    @pytest.mark.asyncio
+    async def test_background_flusher_wakes_on_watermark(self):
+        from src.bot.utils import telemetry
+        telemetry._events.clear()
+
+        ws = MagicMock()
+        google = MagicMock()
+        google._open_worksheet = MagicMock(return_value=ws)
+        with patch.object(telemetry, "_FLUSH_HIGH_WATERMARK", 3), \
+             patch.object(telemetry, "_FLUSH_DEBOUNCE", 60.0):
+            telemetry.start_telemetry_flusher(google)
+            for i in range(3):
+                telemetry.track_event_sync(i, "test_event")
+            for _ in range(50):
+                await asyncio.sleep(0.01)
+                if ws.append_rows.called:
+                    break
+            assert ws.append_rows.call_count == 1
+            assert len(ws.append_rows.call_args[0][0]) == 3
+
+            # Остаток ниже порога выгружается при остановке
+            telemetry.track_event_sync(99, "late_event")
+            await telemetry.stop_telemetry_flusher(google)
+        assert ws.append_rows.call_count == 2
+        assert telemetry._flusher_task is None
+        assert len(telemetry._events) == 0
+
+    @pytest.mark.asyncio
+    async def test_stop_during_write_does_not_duplicate_rows(self):
+        import threading
+
+        from src.bot.utils import telemetry
+        telemetry._events.clear()
+
+        gate = threading.Event()
+        written: list[str] = []
+
+        def _slow_append(rows):
+            gate.wait(5)
+            written.extend(r[1] for r in rows)
+
+        ws = MagicMock()
+        ws.append_rows = MagicMock(side_effect=_slow_append)
+        google = MagicMock()
+        google._open_worksheet = MagicMock(return_value=ws)
+        with patch.object(telemetry, "_FLUSH_HIGH_WATERMARK", 3), \
+             patch.object(telemetry, "_FLUSH_DEBOUNCE", 60.0):
+            telemetry.start_telemetry_flusher(google)
+            for i in range(3):
+                telemetry.track_event_sync(i, "test_event")
+            for _ in range(50):
+                await asyncio.sleep(0.01)
+                if ws.append_rows.called:
+                    break
+            telemetry.track_event_sync(99, "late_event")
+
+            # Остановка приходит, пока append_rows висит в потоке
+            stop = asyncio.create_task(telemetry.stop_telemetry_flusher(google))
+            await asyncio.sleep(0.05)
+            gate.set()
+            await stop
+        assert written == ["0", "1", "2", "99"]
+        assert len(telemetry._events) == 0
+
+    @pytest.mark.asyncio
+    async def test_flush_failure_keeps_events_in_order(self):
+        from src.bot.utils.telemetry import track_event_sync, flush_to_sheets, _events
+        _events.clear()
+        for i in range(3):
+            track_event_sync(i, "test_event")
+
+        google = MagicMock()
+        google._open_worksheet = MagicMock(side_effect=RuntimeError("sheets down"))
+        assert await flush_to_sheets(google) == 0
+        assert [ev.user_id for ev in _events] == [0, 1, 2]
+
+    @pytest.mark.asyncio
+    async def test_flush_failure_on_full_buffer_drops_oldest(self):
+        from collections import deque
+
+        from src.bot.utils import telemetry
+
+        def _sheets_down(name):
+            # Пока Sheets отвечает ошибкой, буфер успевает снова заполниться
+            telemetry.track_event_sync(5, "late_event")
+            telemetry.track_event_sync(6, "late_event")
+            raise RuntimeError("sheets down")
+
+        google = MagicMock()
+        google._open_worksheet = MagicMock(side_effect=_sheets_down)
+        with patch.object(telemetry, "_events", deque(maxlen=5)):
+            for i in range(5):
+                telemetry.track_event_sync(i, "test_event")
+            assert await telemetry.flush_to_sheets(google) == 0
+            assert [ev.user_id for ev in telemetry._events] == [2, 3, 4, 5, 6]
 
     def test_funnel_stages_defined(self):
         from src.bot.utils.telemetry import FUNNEL_STAGES
@@ -310,6 +566,14 @@ class TestDBBackup:
         assert callable(vacuum_database)
         assert callable(daily_backup)
 
+    def test_db_path_from_url(self):
+        from src.backup import _to_db_path
+
+        assert _to_db_path("sqlite+aiosqlite:///data/legal_bot.db") == "data/legal_bot.db"
+        assert _to_db_path("sqlite:///x.db") == "x.db"
+        assert _to_db_path("sqlite+pysqlite:////abs/x.db") == "/abs/x.db"
+        assert _to_db_path("postgresql+asyncpg://u@h/db") is None
+
     @pytest.mark.asyncio
     async def test_send_backup_to_admin(self):
         from src.backup import send_backup_to_admin
@@ -491,6 +755,105 @@ class TestSecurityAudit:
         assert any(i["vuln_id"] == "EXEC_EVAL" for i in issues)
         test_file.unlink(missing_ok=True)
 
+    def test_scan_cache(self, tmp_path, monkeypatch):
+        """Повторный скан неизменённого файла берётся из кэша."""
+        from src.bot.utils import security_audit
+
+        monkeypatch.setattr(security_audit, "AUDIT_CACHE_DIR", tmp_path / "cache")
+        test_file = tmp_path / "vuln.py"
+        test_file.write_text("result = eval(x)\n", encoding="utf-8")
+
+        first = security_audit.scan_file(test_file)
+        assert [i["vuln_id"] for i in first] == ["EXEC_EVAL"]
+
+        with patch.object(security_audit, "_scan_content", side_effect=AssertionError):
+            assert security_audit.scan_file(test_file) == first
+
+        test_file.write_text("result = 1\n", encoding="utf-8")
+        assert security_audit.scan_file(test_file) == []
+
+    def test_scan_case_insensitive_keywords(self, tmp_path, monkeypatch):
+        """Ключевые слова ищутся без учёта регистра, как IGNORECASE в re."""
+        from src.bot.utils import security_audit
+
+        monkeypatch.setattr(security_audit, "AUDIT_CACHE_DIR", tmp_path)
+        test_file = Path("data/case_folds.py")
+        test_file.parent.mkdir(parents=True, exist_ok=True)
+        test_file.write_text(
+            'paſſword = "ABCDEFGHIJKLMNOPQRSTUVWX"\n'
+            'LOGGER.INFO("TOKEN %s", t)\n'
+            'x = EXEC(1)\n',
+            encoding="utf-8",
+        )
+        issues = security_audit.scan_file(test_file)
+        test_file.unlink(missing_ok=True)
+        assert [(i["line"], i["vuln_id"]) for i in issues] == [
+            (1, "HARDCODED_SECRET"), (2, "LOG_SENSITIVE"),
+        ]
+
+    def test_scan_long_log_line_linear(self, tmp_path, monkeypatch):
+        """Длинная строка логирования не вызывает квадратичный перебор."""
+        from src.bot.utils import security_audit
+
+        monkeypatch.setattr(security_audit, "AUDIT_CACHE_DIR", tmp_path / "cache")
+        test_file = tmp_path / "log.py"
+        test_file.write_text(
+            'logger.info("token ' + "token " * 20_000 + '"\n'
+            'self.logger.info("key %s", api_key)\n',
+            encoding="utf-8",
+        )
+        start = time.perf_counter()
+        issues = security_audit.scan_file(test_file)
+        assert time.perf_counter() - start < 1.0
+        assert [(i["line"], i["vuln_id"]) for i in issues] == [(2, "LOG_SENSITIVE")]
+
+    def test_scan_line_numbers(self):
+        """Номера строк как у splitlines(), комментарии пропускаются."""
+        from src.bot.utils.security_audit import scan_file
+        test_file = Path("data/test_lines.py")
+        test_file.parent.mkdir(parents=True, exist_ok=True)
+        test_file.write_text(
+            "x = 1\n# exec(x)\ny = eval(x)\f\nz = 2\nexec(y); eval(z)",
+            encoding="utf-8",
+        )
+        issues = scan_file(test_file)
+        test_file.unlink(missing_ok=True)
+        assert [(i["line"], i["vuln_id"]) for i in issues] == [
+            (3, "EXEC_EVAL"), (6, "EXEC_EVAL"),
+        ]
+
+    def test_format_report_layout(self):
+        """Отчёт без удвоенных переводов строк, самые критичные — первыми."""
+        from src.bot.utils.security_audit import format_audit_report
+        issues = [
+            {"severity": "LOW", "sev_rank": 3, "file": "a.py", "line": 3, "description": "low"},
+            {"severity": "CRITICAL", "sev_rank": 0, "file": "b.py", "line": 1, "description": "crit"},
+        ]
+        report = format_audit_report(
+            {"grade": "B", "total_files": 2, "total_issues": 2, "issues": issues},
+        )
+        assert report.splitlines() == [
+            "🔒 <b>Аудит безопасности</b>",
+            "",
+            "Статус: B",
+            "📂 Файлов: 2 | ⚠️ Проблем: 2",
+            "",
+            "<b>Найденные проблемы:</b>",
+            "🔴 <code>b.py:1</code>",
+            "   crit",
+            "🟢 <code>a.py:3</code>",
+            "   low",
+        ]
+
+    def test_should_skip_by_path_part(self):
+        """Пропуск по целым компонентам пути и по расширению."""
+        from src.bot.utils.security_audit import _should_skip
+        assert _should_skip(os.path.join("src", "__pycache__", "a.py"))
+        assert _should_skip(os.path.join("src", "bot", "utils", "security_audit.py"))
+        assert _should_skip("a.pyc")
+        assert not _should_skip(Path("src") / "main.py")
+        assert not _should_skip(os.path.join("tests", "test_security_audit.py"))
+
 
 # ═══════════════════════════════════════════════════════════════════════════
 #  INTEGRATION: Full Simulation
@@ -15,6 +15,15 @@ def mock_settings(monkeypatch):
     monkeypatch.setenv("GOOGLE_SPREADSHEET_ID", "test_spreadsheet_id")
 
 
+@pytest.fixture(autouse=True)
+def clear_subscription_cache():
+    """Кеш подписок не должен переживать тест."""
+    from src.bot.utils.subscription_check import _sub_cache
+    _sub_cache.clear()
+    yield
+    _sub_cache.clear()
+
+
 @pytest.mark.asyncio
 async def test_check_subscription_member(monkeypatch):
     """Пользователь-участник канала -> True."""
@@ -67,3 +76,25 @@ async def test_check_subscription_api_error(monkeypatch):
 
     result = await check_subscription(123456, bot)
     assert result is False
+
+
+@pytest.mark.asyncio
+async def test_check_subscription_cached(monkeypatch):
+    """Подтверждённая подписка кешируется, отказ — нет."""
+    from src.bot.utils.subscription_check import check_subscription, invalidate_subscription
+
+    bot = AsyncMock()
+    member_mock = MagicMock()
+    member_mock.status = ChatMemberStatus.LEFT
+    bot.get_chat_member.return_value = member_mock
+
+    assert await check_subscription(123456, bot) is False
+    member_mock.status = ChatMemberStatus.MEMBER
+    assert await check_subscription(123456, bot) is True
+    assert await check_subscription(123456, bot) is True
+    assert bot.get_chat_member.call_count == 2
+
+    invalidate_subscription(123456)
+    member_mock.status = ChatMemberStatus.LEFT
+    assert await check_subscription(123456, bot) is False
+    assert bot.get_chat_member.call_count == 3